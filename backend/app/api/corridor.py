@@ -1,16 +1,95 @@
-from fastapi import APIRouter, HTTPException
+from datetime import datetime, timezone
+from typing import List
 
-from app.schemas.corridor import CorridorPlanRequest, CorridorPlanResponse
-from app.services.corridor_planner import plan_corridor
+from fastapi import APIRouter, HTTPException, Query
+
+from app.schemas.corridor import (
+    CorridorPlanRequest,
+    CorridorPlanResponse,
+    CorridorUpdateRequest,
+    JunctionClaimOut,
+    JunctionConflictOut,
+)
+from app.services.corridor_planner import compute_plan, plan_response
+from app.services.corridor_store import corridor_store
+from app.services.junction_conflicts import junction_index
 
 router = APIRouter(prefix="/api/corridor", tags=["corridor"])
 
 
 @router.post("/plan", response_model=CorridorPlanResponse)
 def generate_corridor_plan(payload: CorridorPlanRequest):
-    if len(payload.route_geometry) < 2:
-        raise HTTPException(status_code=400, detail="route_geometry must contain at least 2 points")
     if payload.final_eta_seconds <= 0:
         raise HTTPException(status_code=400, detail="final_eta_seconds must be > 0")
 
-    return plan_corridor(payload)
+    # route_geometry / route_polyline / route_coords are checked while decoding
+    try:
+        plan = compute_plan(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Plans with a trip_id are kept for /{trip_id}/update and the traffic dashboard,
+    # and checked against every other active corridor's junction windows
+    resp = plan_response(payload, plan)
+    if payload.trip_id:
+        resp.conflicts = corridor_store.put(payload.trip_id, payload, plan)
+    return resp
+
+
+def _epoch(dt: datetime) -> float:
+    # naive datetimes are UTC (as everywhere else in the API)
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+
+@router.get("/junctions/claims", response_model=List[JunctionClaimOut])
+def junction_claims(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    window_start: datetime = Query(...),
+    window_end: datetime = Query(...),
+):
+    """Which trips hold the junction at (lat, lon) at some point in [window_start, window_end]."""
+    t1, t2 = _epoch(window_start), _epoch(window_end)
+    if t2 < t1:
+        raise HTTPException(status_code=400, detail="window_end must not be before window_start")
+
+    return [
+        JunctionClaimOut(
+            trip_id=c.trip_id,
+            index=c.index,
+            lat=c.lat,
+            lon=c.lon,
+            priority=c.priority,
+            window_start=datetime.fromtimestamp(c.start, timezone.utc),
+            window_end=datetime.fromtimestamp(c.end, timezone.utc),
+            distance_m=round(d, 1),
+        )
+        for c, d in junction_index.claims(lat, lon, t1, t2)
+    ]
+
+
+@router.get("/{trip_id}", response_model=CorridorPlanResponse)
+def get_corridor_plan(trip_id: str):
+    resp = corridor_store.response(trip_id)
+    if resp is None:
+        raise HTTPException(status_code=404, detail="No corridor plan for trip_id")
+    return resp
+
+
+@router.post("/{trip_id}/update", response_model=CorridorPlanResponse)
+def update_corridor_plan(trip_id: str, payload: CorridorUpdateRequest):
+    if (payload.lat is None) != (payload.lon is None):
+        raise HTTPException(status_code=400, detail="lat and lon must be given together")
+
+    resp = corridor_store.update(trip_id, payload.final_eta_seconds, payload.lat, payload.lon)
+    if resp is None:
+        raise HTTPException(status_code=404, detail="No corridor plan for trip_id")
+    return resp
+
+
+@router.get("/{trip_id}/conflicts", response_model=List[JunctionConflictOut])
+def corridor_conflicts(trip_id: str):
+    resp = corridor_store.response(trip_id)
+    if resp is None:
+        raise HTTPException(status_code=404, detail="No corridor plan for trip_id")
+    return resp.conflicts
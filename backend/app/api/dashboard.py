@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from app.schemas.dashboard import HospitalDashboardResponse, TrafficDashboardResponse
+from app.services.corridor_store import corridor_store
 from app.services.dashboard_service import build_hospital_dashboard, build_traffic_dashboard
+from app.services.latest_cache import latest_cache
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
@@ -21,13 +23,15 @@ def get_latest_prediction(trip_id: str):
 
 def get_latest_corridor_plan(trip_id: str):
     """
-    Expected return: list of junction dicts:
+    Remaining junctions of the trip's stored corridor plan (POST /api/corridor/plan
+    with a trip_id, re-timed by /api/corridor/{trip_id}/update), in route order:
     [
       {"name":"J1","lat":12.97,"lon":77.59,"priority":"high","window_start":dt,"window_end":dt},
       ...
     ]
+    Empty when the trip has no plan.
     """
-    raise NotImplementedError("Wire to your corridor store/service")
+    return corridor_store.dashboard_junctions(trip_id)
 
 
 @router.get("/hospital/{trip_id}", response_model=HospitalDashboardResponse)
@@ -41,12 +45,15 @@ def hospital_dashboard(trip_id: str):
     if not p or "eta_final_sec" not in p:
         raise HTTPException(status_code=404, detail="No prediction found for trip_id")
 
+    pos = latest_cache.get(trip_id)
+    lat, lon = (pos.lat, pos.lon) if pos is not None else (None, None)
     payload = build_hospital_dashboard(
         trip_id,
         eta_final_sec=p["eta_final_sec"],
         eta_baseline_sec=p.get("eta_baseline_sec"),
         delay_pred_sec=p.get("delay_pred_sec"),
         delay_risk=p.get("delay_risk", "low"),
+        countdown_sec=corridor_store.countdown_seconds(trip_id, lat, lon),
     )
 
     try:
@@ -0,0 +1,188 @@
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.db import models
+from app.api.predict import get_optional_predictor
+from app.ml.predictor import Predictor
+from app.schemas.eta import (
+    BaselineEtaResponse,
+    EtaMatrixRequest,
+    EtaMatrixResponse,
+    NearestHospitalItem,
+    NearestHospitalsResponse,
+)
+from app.services.eta_matrix import table_matrix
+from app.services.feature_builder import build_features
+from app.services.hospital_index import hospital_index
+from app.services.isochrones import isochrone_store
+from app.services.osrm_service import OSRMError
+from app.services.route_cache import route_cache
+from app.utils.route_utils import classify_route_type
+
+router = APIRouter(prefix="/api/eta", tags=["eta"])
+
+# The table service has no steps, so junction_count for candidates is estimated from distance.
+NEAREST_JUNCTIONS_PER_KM = float(os.getenv("NEAREST_JUNCTIONS_PER_KM", "2.0"))
+HISTORICAL_DELAY_FACTOR = 1.2  # simulated initially, same as /api/predict/eta
+
+
+def _load_hospitals(db: Session, hospital_ids: Optional[List[str]]) -> List[models.Hospital]:
+    if hospital_ids is None:
+        return db.query(models.Hospital).order_by(models.Hospital.id).all()
+
+    by_id = {h.id: h for h in db.query(models.Hospital).filter(models.Hospital.id.in_(hospital_ids)).all()}
+    missing = [h for h in hospital_ids if h not in by_id]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Unknown hospital_ids: {missing[:20]}")
+    return [by_id[h] for h in hospital_ids]
+
+
+def _round(row):
+    return [None if v is None else int(round(v)) for v in row]
+
+
+@router.post("/matrix", response_model=EtaMatrixResponse)
+async def eta_matrix(payload: EtaMatrixRequest, db: Session = Depends(get_db)):
+    hospitals = await run_in_threadpool(_load_hospitals, db, payload.hospital_ids)
+    if not hospitals:
+        raise HTTPException(status_code=400, detail="No hospitals to route to")
+
+    # One OSRM table call per block instead of one /route call per pair
+    try:
+        durations, distances = await table_matrix(
+            [(o.lat, o.lon) for o in payload.origins],
+            [(h.lat, h.lon) for h in hospitals],
+        )
+    except OSRMError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    return EtaMatrixResponse(
+        origin_ids=[o.id for o in payload.origins],
+        hospital_ids=[h.id for h in hospitals],
+        durations_sec=[_round(r) for r in durations],
+        distances_m=[_round(r) for r in distances],
+    )
+
+
+@router.get("/nearest-hospitals", response_model=NearestHospitalsResponse)
+async def nearest_hospitals(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(default=3, ge=1, le=50),
+    candidates: int = Query(default=20, ge=1, le=200, description="Straight-line candidates sent to OSRM"),
+    db: Session = Depends(get_db),
+    predictor: Optional[Predictor] = Depends(get_optional_predictor),
+):
+    """
+    K best destinations ranked by final ETA (OSRM + predicted delay):
+    grid index -> one OSRM table call -> one batched model call.
+    """
+    if hospital_index.is_stale():
+        await run_in_threadpool(hospital_index.ensure_loaded, db)
+
+    cands = hospital_index.nearest(lat, lon, max(k, candidates))
+    if not cands:
+        raise HTTPException(status_code=404, detail="No hospitals")
+
+    try:
+        durations, distances = await table_matrix([(lat, lon)], [(c[2], c[3]) for c in cands])
+    except OSRMError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    reachable = []
+    features_list = []
+    for c, dur, dist in zip(cands, durations[0], distances[0]):
+        if dur is None:
+            continue
+        dist_km = (dist if dist is not None else c[4]) / 1000.0
+        route_type = classify_route_type(dist_km, dur)
+        features = build_features(
+            distance_km=dist_km,
+            route_type=route_type,
+            junction_count=int(round(dist_km * NEAREST_JUNCTIONS_PER_KM)),
+            historical_delay_factor=HISTORICAL_DELAY_FACTOR,
+        )
+        reachable.append((c, dur, dist_km, route_type))
+        features_list.append(features)
+
+    preds = None
+    if predictor is not None and features_list:
+        try:
+            preds = await run_in_threadpool(predictor.predict_delay_sec_batch, features_list)
+        except (RuntimeError, ValueError):
+            preds = None
+
+    items = []
+    for n, (c, dur, dist_km, route_type) in enumerate(reachable):
+        pred = preds[n] if preds is not None else None
+        delay = pred["predicted_delay_sec"] if pred is not None else None
+        items.append(
+            NearestHospitalItem(
+                hospital_id=c[0],
+                name=c[1],
+                lat=c[2],
+                lon=c[3],
+                straight_line_m=int(round(c[4])),
+                distance_km=round(dist_km, 3),
+                eta_osrm_sec=int(round(dur)),
+                route_type=route_type,
+                predicted_delay_sec=delay,
+                risk_level=pred["risk_level"] if pred is not None else None,
+                eta_final_sec=int(round(dur)) + (delay or 0),
+            )
+        )
+    items.sort(key=lambda it: it.eta_final_sec)
+
+    return NearestHospitalsResponse(
+        lat=lat,
+        lon=lon,
+        model_available=preds is not None,
+        candidates_considered=len(cands),
+        hospitals=items[:k],
+    )
+
+
+@router.get("/baseline", response_model=BaselineEtaResponse)
+async def baseline_eta(
+    hospital_id: str = Query(...),
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    refine: bool = Query(default=False, description="Ask OSRM (route cache) instead of the precomputed grid"),
+    db: Session = Depends(get_db),
+):
+    """
+    Approximate ETA to a hospital from the precomputed isochrone grid (no OSRM call).
+    Falls back to OSRM when refine=true or the grid has no value for this point.
+    """
+    if not refine:
+        eta = isochrone_store.baseline_eta(hospital_id, lat, lon)
+        if eta is not None:
+            return BaselineEtaResponse(
+                hospital_id=hospital_id,
+                eta_baseline_sec=int(round(eta)),
+                source="isochrone",
+                time_bucket=isochrone_store.bucket_label(),
+            )
+
+    if hospital_index.is_stale():
+        await run_in_threadpool(hospital_index.ensure_loaded, db)
+    hospital = hospital_index.get(hospital_id)
+    if hospital is None:
+        raise HTTPException(status_code=404, detail="Hospital not found")
+
+    try:
+        route = await route_cache.get_route(lat, lon, hospital_id, hospital[1], hospital[2])
+    except OSRMError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    return BaselineEtaResponse(
+        hospital_id=hospital_id,
+        eta_baseline_sec=int(round(route.duration_s)),
+        source=route.source,
+        distance_km=round(route.distance_m / 1000.0, 3),
+    )
@@ -1,21 +1,70 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from ..db import get_db
 from ..models import GPSPoint, Trip, TripStatus
-from ..schemas import GPSUpdateIn, GPSUpdateOut
+from ..realtime.publish import publish_trip_changed
+from ..schemas import GPSBatchIn, GPSBatchOut, GPSBatchTripResult, GPSUpdateIn, GPSUpdateOut
+from ..services.corridor_store import corridor_store
 from ..services.geo import haversine_m
+from ..services.gps_buffer import GPS_WRITE_BEHIND, GPSBufferFull, gps_buffer
+from ..services.latest_cache import LatestState, latest_cache
+from .hospital import publish_hospital_trip
 
 router = APIRouter(prefix="/api/gps", tags=["gps"])
 
 # Tunable thresholds
 NEAR_ARRIVAL_METERS = 300.0
+ARRIVED_METERS = 50.0
 LOW_SPEED_MPS = 2.0  # optional rule if speed provided
 
+INACTIVE_STATUSES = (TripStatus.ARRIVED, TripStatus.STOPPED)
+
+
+def _recorded_at(ts: Optional[datetime], now: datetime) -> datetime:
+    """
+    Device timestamp as naive UTC, like every other datetime stored here (now if
+    missing). Clients may send offsets or none; mixing the two can't be compared.
+    """
+    if ts is None:
+        return now
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _apply_arrival_rules(trip: Trip, lat: float, lon: float, speed_mps: Optional[float]) -> None:
+    """
+    NEAR_ARRIVAL / ARRIVED transitions for one fix (mutates trip in place).
+    Only applies if destination coordinates are known.
+    """
+    if trip.dest_lat is None or trip.dest_lon is None:
+        return
+
+    d = haversine_m(lat, lon, float(trip.dest_lat), float(trip.dest_lon))
+    if d <= NEAR_ARRIVAL_METERS and trip.status == TripStatus.EN_ROUTE:
+        trip.status = TripStatus.NEAR_ARRIVAL
+
+    # Optional: auto ARRIVED if very close AND speed low (if speed known)
+    if d <= ARRIVED_METERS and speed_mps is not None and float(speed_mps) <= LOW_SPEED_MPS:
+        trip.status = TripStatus.ARRIVED
+        trip.arrived_at = datetime.utcnow()
+
+
+def _trip_arrived(trip_id: str) -> None:
+    """
+    A fix moved the trip to ARRIVED: same teardown as POST /api/trip/{id}/arrive
+    (corridor plan, junction claims and pre-emption windows go away).
+    """
+    latest_cache.set_status(trip_id, TripStatus.ARRIVED.value)
+    corridor_store.remove(trip_id)
+
 
 @router.post("/update", response_model=GPSUpdateOut)
 def gps_update(payload: GPSUpdateIn, db: Session = Depends(get_db)):
@@ -23,10 +72,35 @@ def gps_update(payload: GPSUpdateIn, db: Session = Depends(get_db)):
     if not trip:
         raise HTTPException(status_code=404, detail="trip_not_found")
 
-    if trip.status in (TripStatus.ARRIVED, TripStatus.STOPPED):
+    if trip.status in INACTIVE_STATUSES:
         raise HTTPException(status_code=409, detail="trip_not_active")
 
-    ts = payload.timestamp or datetime.utcnow()
+    now = datetime.utcnow()
+    ts = _recorded_at(payload.timestamp, now)
+
+    if GPS_WRITE_BEHIND:
+        # Point + freshness timestamp are written by the background flusher;
+        # only status transitions (rare) are committed inline, and only once the
+        # fix that caused them is queued (a 503 must leave the trip as it was).
+        prev_status = trip.status
+        _apply_arrival_rules(trip, payload.lat, payload.lon, payload.speed_mps)
+
+        try:
+            gps_buffer.put(payload.trip_id, payload.lat, payload.lon, payload.speed_mps, ts, now)
+        except GPSBufferFull:
+            db.rollback()
+            raise HTTPException(status_code=503, detail="gps_buffer_full", headers={"Retry-After": "1"})
+
+        if trip.status != prev_status:
+            trip.updated_at = now
+            db.commit()
+            if trip.status == TripStatus.ARRIVED:
+                _trip_arrived(payload.trip_id)
+
+        st = latest_cache.update(payload.trip_id, payload.lat, payload.lon, payload.speed_mps, ts, trip.status.value)
+        publish_trip_changed(payload.trip_id, "gps", state=st)
+        publish_hospital_trip(db, trip)
+        return GPSUpdateOut(trip_id=payload.trip_id, status=trip.status.value, updated_at=now)
 
     point = GPSPoint(
         trip_id=payload.trip_id,
@@ -38,20 +112,116 @@ def gps_update(payload: GPSUpdateIn, db: Session = Depends(get_db)):
     db.add(point)
 
     # Update freshness timestamp
-    trip.updated_at = datetime.utcnow()
-
-    # Optional: auto NEAR_ARRIVAL if destination coordinates exist
-    if trip.dest_lat is not None and trip.dest_lon is not None:
-        d = haversine_m(payload.lat, payload.lon, float(trip.dest_lat), float(trip.dest_lon))
-        if d <= NEAR_ARRIVAL_METERS and trip.status == TripStatus.EN_ROUTE:
-            trip.status = TripStatus.NEAR_ARRIVAL
+    trip.updated_at = now
 
-        # Optional: auto ARRIVED if very close AND speed low (if speed known)
-        if d <= 50.0 and payload.speed_mps is not None and float(payload.speed_mps) <= LOW_SPEED_MPS:
-            trip.status = TripStatus.ARRIVED
-            trip.arrived_at = datetime.utcnow()
+    prev_status = trip.status
+    _apply_arrival_rules(trip, payload.lat, payload.lon, payload.speed_mps)
 
     db.commit()
     db.refresh(trip)
+    if trip.status == TripStatus.ARRIVED and prev_status != TripStatus.ARRIVED:
+        _trip_arrived(payload.trip_id)
 
+    st = latest_cache.update(payload.trip_id, payload.lat, payload.lon, payload.speed_mps, ts, trip.status.value)
+    publish_trip_changed(payload.trip_id, "gps", state=st)
+    publish_hospital_trip(db, trip)
     return GPSUpdateOut(trip_id=trip.trip_id, status=trip.status.value, updated_at=trip.updated_at)
+
+
+@router.post("/batch", response_model=GPSBatchOut)
+def gps_batch(payload: GPSBatchIn, db: Session = Depends(get_db)):
+    """
+    Bulk ingestion for many fixes across many trips:
+    - one query to resolve all trips
+    - one bulk INSERT into gps_points
+    - one commit
+    Per-trip results are returned so a device can tell which fixes were kept.
+    Fixes received after a trip became ARRIVED/STOPPED are rejected, same as /update.
+    """
+    now = datetime.utcnow()
+
+    by_trip: Dict[str, List[GPSUpdateIn]] = {}
+    for fix in payload.fixes:
+        by_trip.setdefault(fix.trip_id, []).append(fix)
+
+    trips = {t.trip_id: t for t in db.query(Trip).filter(Trip.trip_id.in_(list(by_trip))).all()}
+
+    rows: List[dict] = []
+    results: List[GPSBatchTripResult] = []
+    states: Dict[str, LatestState] = {}
+
+    for trip_id, fixes in by_trip.items():
+        trip = trips.get(trip_id)
+        if not trip:
+            results.append(GPSBatchTripResult(trip_id=trip_id, ok=False, rejected=len(fixes), error="trip_not_found"))
+            continue
+
+        if trip.status in INACTIVE_STATUSES:
+            results.append(
+                GPSBatchTripResult(
+                    trip_id=trip_id,
+                    ok=False,
+                    rejected=len(fixes),
+                    status=trip.status.value,
+                    updated_at=trip.updated_at,
+                    error="trip_not_active",
+                )
+            )
+            continue
+
+        # Replay in recorded order so arrival rules see the same sequence as live updates.
+        timed = sorted(((_recorded_at(f.timestamp, now), f) for f in fixes), key=lambda tf: tf[0])
+
+        accepted = 0
+        last: Optional[GPSUpdateIn] = None
+        last_ts = now
+        for ts, fix in timed:
+            if trip.status in INACTIVE_STATUSES:
+                break
+            rows.append(
+                {
+                    "trip_id": trip_id,
+                    "lat": fix.lat,
+                    "lon": fix.lon,
+                    "speed_mps": fix.speed_mps,
+                    "recorded_at": ts,
+                }
+            )
+            _apply_arrival_rules(trip, fix.lat, fix.lon, fix.speed_mps)
+            accepted += 1
+            last, last_ts = fix, ts
+
+        trip.updated_at = now
+        if last is not None:
+            states[trip_id] = latest_cache.update(
+                trip_id, last.lat, last.lon, last.speed_mps, last_ts, trip.status.value
+            )
+        results.append(
+            GPSBatchTripResult(
+                trip_id=trip_id,
+                accepted=accepted,
+                rejected=len(fixes) - accepted,
+                status=trip.status.value,
+                updated_at=trip.updated_at,
+            )
+        )
+
+    if rows:
+        db.execute(insert(GPSPoint), rows)
+    db.commit()
+
+    for r in results:
+        if r.accepted:
+            # Trips already inactive were rejected above, so ARRIVED here is new.
+            if trips[r.trip_id].status == TripStatus.ARRIVED:
+                _trip_arrived(r.trip_id)
+            publish_trip_changed(r.trip_id, "gps", state=states.get(r.trip_id))
+            publish_hospital_trip(db, trips[r.trip_id])
+
+    accepted_total = sum(r.accepted for r in results)
+    return GPSBatchOut(
+        ok=all(r.ok for r in results),
+        accepted=accepted_total,
+        rejected=len(payload.fixes) - accepted_total,
+        trips=results,
+    )
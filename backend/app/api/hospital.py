@@ -1,65 +1,111 @@
 from __future__ import annotations
 
-from datetime import datetime
+from typing import List, Tuple
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import desc
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import desc, func, select
 from sqlalchemy.orm import Session
 
 from ..db import get_db
 from ..models import GPSPoint, Trip, TripStatus
-from ..schemas import HospitalActiveTripItem, HospitalActiveTripsOut, LatestGPS
-from ..services.snapshot import get_prediction_stub
+from ..realtime.publish import publish_hospital_event
+from ..schemas import HospitalActiveTripItem, HospitalActiveTripsOut
+from ..services.latest_cache import latest_cache
+from ..services.snapshot import hospital_trip_item
 
 router = APIRouter(prefix="/api/hospital", tags=["hospital"])
 
+ACTIVE_STATUSES = (TripStatus.EN_ROUTE, TripStatus.NEAR_ARRIVAL)
 
-@router.get("/{hospital_id}/active-trips", response_model=HospitalActiveTripsOut)
-def hospital_active_trips(hospital_id: str, db: Session = Depends(get_db)):
-    # NON-NEGOTIABLE VISIBILITY RULE:
-    # destination_hospital_id == hospital_id AND status IN (EN_ROUTE, NEAR_ARRIVAL)
-    trips = (
-        db.query(Trip)
-        .filter(
+
+def active_trips_with_latest_gps(db: Session, hospital_id: str, *, limit: int, offset: int):
+    """
+    One statement for the whole page: trips + their latest GPS fix + total count.
+    The latest fix is picked by a correlated (trip_id, recorded_at DESC) LIMIT 1
+    subquery in the join condition, which is served by idx_gps_trip_time.
+    """
+    latest_gps_id = (
+        select(GPSPoint.id)
+        .where(GPSPoint.trip_id == Trip.trip_id)
+        .order_by(GPSPoint.recorded_at.desc(), GPSPoint.id.desc())
+        .limit(1)
+        .correlate(Trip)
+        .scalar_subquery()
+    )
+
+    stmt = (
+        select(
+            Trip,
+            GPSPoint.lat,
+            GPSPoint.lon,
+            GPSPoint.speed_mps,
+            GPSPoint.recorded_at,
+            func.count().over().label("total"),
+        )
+        .outerjoin(GPSPoint, GPSPoint.id == latest_gps_id)
+        .where(
             Trip.destination_hospital_id == hospital_id,
-            Trip.status.in_([TripStatus.EN_ROUTE, TripStatus.NEAR_ARRIVAL]),
+            Trip.status.in_(ACTIVE_STATUSES),
         )
         .order_by(desc(Trip.updated_at))
-        .all()
+        .limit(limit)
+        .offset(offset)
     )
+    return db.execute(stmt).all()
+
+
+def count_active_trips(db: Session, hospital_id: str) -> int:
+    stmt = select(func.count()).select_from(Trip).where(
+        Trip.destination_hospital_id == hospital_id,
+        Trip.status.in_(ACTIVE_STATUSES),
+    )
+    return int(db.execute(stmt).scalar_one())
+
+
+def list_active_trip_items(
+    db: Session, hospital_id: str, *, limit: int = 50, offset: int = 0
+) -> Tuple[List[HospitalActiveTripItem], int]:
+    # NON-NEGOTIABLE VISIBILITY RULE:
+    # destination_hospital_id == hospital_id AND status IN (EN_ROUTE, NEAR_ARRIVAL)
+    rows = active_trips_with_latest_gps(db, hospital_id, limit=limit, offset=offset)
 
     items = []
-    for t in trips:
-        gp = (
-            db.query(GPSPoint)
-            .filter(GPSPoint.trip_id == t.trip_id)
-            .order_by(desc(GPSPoint.recorded_at))
-            .first()
-        )
-        if gp:
-            latest = LatestGPS(
-                lat=gp.lat,
-                lon=gp.lon,
-                recorded_at=gp.recorded_at,
-                speed_mps=float(gp.speed_mps or 0.0),
-            )
-            last_time = gp.recorded_at
-        else:
-            latest = LatestGPS()  # safe defaults
-            last_time = t.updated_at or datetime.utcnow()
-
-        eta_final, risk = get_prediction_stub(db, t)
-
-        items.append(
-            HospitalActiveTripItem(
-                trip_id=t.trip_id,
-                ambulance_id=t.ambulance_id,
-                status=t.status.value,
-                latest_gps=latest,
-                last_update_time=last_time,
-                eta_final_seconds=int(eta_final),
-                risk_level=str(risk),
-            )
-        )
+    for row in rows:
+        t = row.Trip
+        if row.recorded_at is not None:
+            # No-op if the cache already holds a newer (write-behind, not yet flushed) fix.
+            latest_cache.update(t.trip_id, row.lat, row.lon, row.speed_mps, row.recorded_at, t.status.value)
+        items.append(hospital_trip_item(db, t, latest_cache.get(t.trip_id)))
 
-    return HospitalActiveTripsOut(hospital_id=hospital_id, trips=items)
+    if rows:
+        total = int(rows[0].total)
+    elif offset > 0:
+        # Page past the end: the window count came back with no rows to carry it.
+        total = count_active_trips(db, hospital_id)
+    else:
+        total = 0
+    return items, total
+
+
+def publish_hospital_trip(db: Session, trip: Trip, event: str = "trip_updated") -> None:
+    """
+    Push a trip's hospital-view row to /ws/hospital/{destination}.
+    Trips that left the visibility rule are sent as trip_removed.
+    """
+    hospital_id = trip.destination_hospital_id
+    if trip.status not in ACTIVE_STATUSES:
+        publish_hospital_event(hospital_id, "trip_removed", trip.trip_id)
+        return
+    item = hospital_trip_item(db, trip, latest_cache.get(trip.trip_id))
+    publish_hospital_event(hospital_id, event, trip.trip_id, item.model_dump(mode="json"))
+
+
+@router.get("/{hospital_id}/active-trips", response_model=HospitalActiveTripsOut)
+def hospital_active_trips(
+    hospital_id: str,
+    limit: int = Query(default=50, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_db),
+):
+    items, total = list_active_trip_items(db, hospital_id, limit=limit, offset=offset)
+    return HospitalActiveTripsOut(hospital_id=hospital_id, trips=items, total=total, limit=limit, offset=offset)
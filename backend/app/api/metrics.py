@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+
+from .ws_router import snapshot_hub
+from ..realtime.encoding import encoder_stats
+from ..realtime.publish import get_broker
+from ..realtime.ws_manager import hospital_ws_manager, preemption_ws_manager, ws_manager
+from ..services.corridor_store import corridor_store
+from ..services.gps_buffer import gps_buffer
+from ..services.hospital_index import hospital_index
+from ..services.junction_conflicts import junction_index
+from ..services.isochrones import isochrone_store
+from ..services.latest_cache import latest_cache
+from ..services.offline_router import offline_router
+from ..services.osrm_service import osrm_client
+from ..services.preemption_scheduler import preemption_scheduler
+from ..services.route_cache import route_cache
+from ..services.route_tracker import route_tracker
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+
+@router.get("")
+def metrics():
+    """
+    In-process hot-path counters (per worker).
+    """
+    return {
+        "latest_cache": latest_cache.stats(),
+        "gps_buffer": gps_buffer.stats(),
+        "snapshot_hub": snapshot_hub.stats(),
+        "osrm": osrm_client.stats(),
+        "route_cache": route_cache.stats(),
+        "offline_router": offline_router.stats(),
+        "route_tracker": route_tracker.stats(),
+        "hospital_index": hospital_index.stats(),
+        "isochrones": isochrone_store.stats(),
+        "corridor_store": corridor_store.stats(),
+        "junction_conflicts": junction_index.stats(),
+        "preemption": preemption_scheduler.stats(),
+        "ws": {
+            "trip_updates": ws_manager.stats(),
+            "snapshot_poll": snapshot_hub.manager.stats(),
+            "snapshot_push": snapshot_hub.push_manager.stats(),
+            "hospital": hospital_ws_manager.stats(),
+            "preemption": preemption_ws_manager.stats(),
+            "encoder": encoder_stats(),
+            "broker": get_broker().stats(),
+        },
+    }
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 
@@ -56,6 +58,13 @@ def get_predictor() -> Predictor:
     return predictor_instance
 
 
+def get_optional_predictor() -> Optional[Predictor]:
+    # For endpoints that still answer (OSRM-only) without the delay models.
+    from app.main import predictor_instance
+
+    return predictor_instance
+
+
 @router.get("/eta")
 def predict_eta(trip_id: str, db: Session = Depends(get_db), predictor: Predictor = Depends(get_predictor)):
     try:
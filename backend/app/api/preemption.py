@@ -0,0 +1,19 @@
+from typing import Optional
+
+from fastapi import APIRouter, Query
+
+from app.services.preemption_scheduler import preemption_scheduler
+
+router = APIRouter(prefix="/api/preemption", tags=["preemption"])
+
+
+@router.get("/pending")
+def pending_windows(trip_id: Optional[str] = Query(None)):
+    """Junction windows the scheduler still holds (active = currently pre-empted)."""
+    return {"windows": preemption_scheduler.pending(trip_id)}
+
+
+@router.get("/events")
+def recent_events(limit: int = Query(100, ge=1, le=1000)):
+    """Last activate / release events fired by this worker (same payload as /ws/preemption)."""
+    return {"events": preemption_scheduler.recent.recent(limit)}
@@ -1,17 +1,28 @@
+import dataclasses
+from typing import List, Literal, Optional, Tuple
+
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
 from app.db import models
 from app.schemas import RouteResponse
-from app.services.osrm_service import get_route_driving, OSRMError
-from app.utils.route_utils import classify_route_type
+from app.schemas.route import RouteStepItem
+from app.services.latest_cache import latest_cache
+from app.services.osrm_service import OSRMError
+from app.services.route_tracker import RouteProgress, route_tracker
+from app.utils.polyline import encode_polyline, simplify_indices
 
 router = APIRouter(tags=["route"])
 
 
-@router.get("/route", response_model=RouteResponse)
-def get_route(trip_id: str = Query(...), db: Session = Depends(get_db)):
+def _route_endpoints(db: Session, trip_id: str) -> Tuple[float, float, str, float, float]:
+    """
+    DB part of /route (sync; runs in the threadpool).
+    Returns (start_lat, start_lon, hospital_id, end_lat, end_lon).
+    """
     # 1) Validate trip
     trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
     if not trip:
@@ -20,16 +31,18 @@ def get_route(trip_id: str = Query(...), db: Session = Depends(get_db)):
     if getattr(trip, "status", None) != "active":
         raise HTTPException(status_code=409, detail="Trip is not active")
 
-    # 2) Latest GPS (O(1) query: order + limit 1)
-    gps_q = db.query(models.GPSPoint).filter(models.GPSPoint.trip_id == trip_id)
+    # 2) Latest GPS: in-memory latest-state cache first, DB (order + limit 1) on a miss
+    latest_gps = latest_cache.get(trip_id)
+    if latest_gps is None:
+        gps_q = db.query(models.GPSPoint).filter(models.GPSPoint.trip_id == trip_id)
 
-    # Prefer a timestamp field if exists; fallback to id desc
-    if hasattr(models.GPSPoint, "timestamp"):
-        latest_gps = gps_q.order_by(models.GPSPoint.timestamp.desc()).first()
-    elif hasattr(models.GPSPoint, "recorded_at"):
-        latest_gps = gps_q.order_by(models.GPSPoint.recorded_at.desc()).first()
-    else:
-        latest_gps = gps_q.order_by(models.GPSPoint.id.desc()).first()
+        # Prefer a timestamp field if exists; fallback to id desc
+        if hasattr(models.GPSPoint, "timestamp"):
+            latest_gps = gps_q.order_by(models.GPSPoint.timestamp.desc()).first()
+        elif hasattr(models.GPSPoint, "recorded_at"):
+            latest_gps = gps_q.order_by(models.GPSPoint.recorded_at.desc()).first()
+        else:
+            latest_gps = gps_q.order_by(models.GPSPoint.id.desc()).first()
 
     if not latest_gps:
         raise HTTPException(status_code=400, detail="No GPS data for this trip")
@@ -43,29 +56,62 @@ def get_route(trip_id: str = Query(...), db: Session = Depends(get_db)):
     if not hospital:
         raise HTTPException(status_code=400, detail="Hospital not found for this trip")
 
-    # 4) OSRM call (single request)
+    return latest_gps.lat, latest_gps.lon, hospital_id, hospital.lat, hospital.lon
+
+
+def _segment_durations(route: RouteProgress, keep: Optional[np.ndarray] = None) -> Optional[List[float]]:
+    # One value per segment of the returned geometry (summed over simplified-away vertices)
+    if route.profile is None:
+        return None
+    return np.round(route.profile.segment_durations(keep), 2).tolist()
+
+
+@router.get("/route", response_model=RouteResponse, response_model_exclude_none=True)
+async def get_route(
+    trip_id: str = Query(...),
+    geometry: Literal["geojson", "polyline", "polyline6"] = Query("geojson"),
+    simplify_m: Optional[float] = Query(None, ge=0.0, le=500.0, description="Douglas-Peucker tolerance in metres"),
+    steps: bool = Query(False, description="Include the OSRM maneuvers still ahead (for /api/corridor/plan route_steps)"),
+    durations: bool = Query(False, description="Include OSRM seconds per geometry segment (for route_durations)"),
+    db: Session = Depends(get_db),
+):
+    start_lat, start_lon, hospital_id, end_lat, end_lon = await run_in_threadpool(_route_endpoints, db, trip_id)
+
+    # 4) Progress along the trip's stored route; OSRM (via the route cache) only when
+    #    the unit is off route, the route expired or the destination changed
     try:
-        data = get_route_driving(
-            start_lat=latest_gps.lat,
-            start_lon=latest_gps.lon,
-            end_lat=hospital.lat,
-            end_lon=hospital.lon,
-        )
+        route = await route_tracker.route_for(trip_id, start_lat, start_lon, hospital_id, end_lat, end_lon)
     except OSRMError as e:
         raise HTTPException(status_code=502, detail=str(e))
 
-    route0 = data["routes"][0]
-    dist_m = float(route0["distance"])
-    dur_s = int(route0["duration"])
-    geom = route0["geometry"]  # GeoJSON LineString
-    dist_km = dist_m / 1000.0
-
-    route_type = classify_route_type(dist_km, dur_s)
-
-    return RouteResponse(
+    resp = RouteResponse(
         trip_id=trip_id,
-        distance_km=round(dist_km, 3),
-        duration_sec=dur_s,
-        polyline_geojson=geom,
-        route_type=route_type,
+        distance_km=round(route.distance_m / 1000.0, 3),
+        duration_sec=int(route.duration_s),
+        route_type=route.route_type,
     )
+    if steps:
+        resp.steps = [RouteStepItem(**dataclasses.asdict(st)) for st in route.steps]
+
+    # 5) Geometry: the tracked GeoJSON as-is, or simplified / encoded for mobile clients
+    coords = (route.geometry or {}).get("coordinates") or []  # [lon, lat]
+    if not simplify_m and geometry == "geojson":
+        resp.polyline_geojson = route.geometry
+        if durations:
+            resp.segment_durations_s = _segment_durations(route)
+        return resp
+
+    points = [(c[1], c[0]) for c in coords]
+    keep = None
+    if simplify_m and len(points) > 2:
+        arr = np.asarray(points, dtype=float)
+        keep = simplify_indices(arr[:, 0], arr[:, 1], simplify_m)
+        points = [points[i] for i in keep.tolist()]
+    if durations:
+        resp.segment_durations_s = _segment_durations(route, keep)
+    if geometry == "geojson":
+        resp.polyline_geojson = {"type": "LineString", "coordinates": [[lon, lat] for lat, lon in points]}
+    else:
+        resp.polyline_precision = 6 if geometry == "polyline6" else 5
+        resp.polyline = encode_polyline(points, resp.polyline_precision)
+    return resp
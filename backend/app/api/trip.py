@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 
 from ..db import get_db
 from ..models import Trip, TripAck, TripStatus
+from ..realtime.publish import publish_hospital_event, publish_trip_changed
 from ..schemas import (
     AckIn,
     AckOut,
@@ -16,6 +17,9 @@ from ..schemas import (
     TripStartIn,
     TripStartOut,
 )
+from ..services.corridor_store import corridor_store
+from ..services.latest_cache import latest_cache
+from .hospital import ACTIVE_STATUSES, publish_hospital_trip
 
 router = APIRouter(prefix="/api/trip", tags=["trip"])
 
@@ -38,6 +42,7 @@ def start_trip(payload: TripStartIn, db: Session = Depends(get_db)):
     db.add(trip)
     db.commit()
     db.refresh(trip)
+    publish_hospital_trip(db, trip, "trip_added")
 
     return TripStartOut(trip_id=trip.trip_id, started_at=trip.started_at)
 
@@ -48,6 +53,8 @@ def update_destination(trip_id: str, payload: DestinationUpdateIn, db: Session =
     if not trip:
         raise HTTPException(status_code=404, detail="trip_not_found")
 
+    prev_hospital_id = trip.destination_hospital_id
+
     # Preserve same trip_id; visibility updates naturally via filters.
     trip.destination_hospital_id = payload.destination_hospital_id
     if payload.dest_lat is not None:
@@ -57,6 +64,15 @@ def update_destination(trip_id: str, payload: DestinationUpdateIn, db: Session =
 
     trip.updated_at = datetime.utcnow()
     db.commit()
+    publish_trip_changed(trip_id, "destination")
+
+    # Reassignment: leaves the old ER screen, shows up on the new one.
+    if prev_hospital_id != trip.destination_hospital_id:
+        if trip.status in ACTIVE_STATUSES:
+            publish_hospital_event(prev_hospital_id, "trip_removed", trip_id)
+        publish_hospital_trip(db, trip, "trip_added")
+    else:
+        publish_hospital_trip(db, trip)
 
     return {"ok": True, "trip_id": trip_id, "destination_hospital_id": trip.destination_hospital_id}
 
@@ -71,6 +87,10 @@ def arrive_trip(trip_id: str, db: Session = Depends(get_db)):
     trip.arrived_at = datetime.utcnow()
     trip.updated_at = trip.arrived_at
     db.commit()
+    latest_cache.set_status(trip_id, TripStatus.ARRIVED.value)
+    corridor_store.remove(trip_id)
+    publish_trip_changed(trip_id, "arrived", status=TripStatus.ARRIVED.value)
+    publish_hospital_event(trip.destination_hospital_id, "trip_removed", trip_id)
 
     return TripArriveOut(trip_id=trip.trip_id, status=trip.status.value, arrived_at=trip.arrived_at)
 
@@ -86,6 +106,7 @@ def ack_trip(trip_id: str, payload: AckIn, db: Session = Depends(get_db)):
     db.add(row)
     db.commit()
     db.refresh(row)
+    publish_trip_changed(trip_id, "ack")
     return AckOut(trip_id=trip_id, hospital_id=row.hospital_id, acked_at=row.acked_at)
 
 
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import asyncio
 from typing import Dict, Any
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from app.db import SessionLocal
 from app.models import Trip
+from app.realtime.publish import add_trip_change_listener
+from app.realtime.snapshot_hub import MODE_POLL, MODE_PUSH, SnapshotHub
 from app.schemas import TripSnapshotOut, LatestGPS, CorridorSummary
 from app.services.snapshot import get_latest_gps, get_prediction_stub, get_corridor_stub, get_acks
 
@@ -45,30 +46,38 @@ def _build_snapshot(trip_id: str) -> Dict[str, Any]:
             corridor=corridor,
             acks=acks,
         )
-        return snap.model_dump()
+        return snap.model_dump(mode="json")
     finally:
         db.close()
 
 
+snapshot_hub = SnapshotHub(_build_snapshot)
+add_trip_change_listener(snapshot_hub.notify_changed)
+
+
 @ws_router.websocket("/ws/trip/{trip_id}")
-async def ws_trip_stream(websocket: WebSocket, trip_id: str):
+async def ws_trip_stream(websocket: WebSocket, trip_id: str, mode: str = MODE_POLL):
     """
     EXPERIMENTAL (Section 6):
     - READ-ONLY transport
-    - Streams EXACT snapshot JSON (same as GET /api/trip/{trip_id}/snapshot)
+    - mode=poll (default): streams EXACT snapshot JSON (same as GET /api/trip/{trip_id}/snapshot) every second
+    - mode=push: {"type": "snapshot", "version", "data"} on connect, then
+      {"type": "delta", "version", "changes"} only when the trip changes
     - NO business logic here
+    - One shared producer per trip (SnapshotHub), however many viewers are attached
     """
-    await websocket.accept()
-
+    mode = MODE_PUSH if mode == MODE_PUSH else MODE_POLL
+    await snapshot_hub.subscribe(trip_id, websocket, mode)
     try:
+        # Nothing is expected from the client; this just detects disconnects.
         while True:
-            snapshot = await asyncio.to_thread(_build_snapshot, trip_id)
-            await websocket.send_json(snapshot)
-            await asyncio.sleep(1.0)
+            await websocket.receive_text()
     except WebSocketDisconnect:
-        return
+        pass
     except Exception:
         try:
-          await websocket.close()
+            await websocket.close()
         except Exception:
-          pass
+            pass
+    finally:
+        await snapshot_hub.unsubscribe(trip_id, websocket, mode)
@@ -1,6 +1,10 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
 
-from app.realtime.ws_manager import ws_manager
+from app.api.hospital import list_active_trip_items
+from app.db import SessionLocal
+from app.realtime.ws_manager import PREEMPTION_WS_KEY, hospital_ws_manager, preemption_ws_manager, ws_manager
+from app.services.preemption_scheduler import preemption_scheduler
 
 router = APIRouter(tags=["realtime"])
 
@@ -16,3 +20,66 @@ async def ws_trip_updates(ws: WebSocket, trip_id: str):
         await ws_manager.disconnect(trip_id, ws)
     except Exception:
         await ws_manager.disconnect(trip_id, ws)
+
+
+HOSPITAL_SNAPSHOT_LIMIT = 500
+
+
+def _hospital_snapshot(hospital_id: str) -> dict:
+    db = SessionLocal()
+    try:
+        items, total = list_active_trip_items(db, hospital_id, limit=HOSPITAL_SNAPSHOT_LIMIT)
+        return {
+            "type": "snapshot",
+            "hospital_id": hospital_id,
+            "total": total,
+            "trips": [i.model_dump(mode="json") for i in items],
+        }
+    finally:
+        db.close()
+
+
+@router.websocket("/ws/hospital/{hospital_id}")
+async def ws_hospital_updates(ws: WebSocket, hospital_id: str):
+    """
+    One socket per ER screen:
+    - {"type": "snapshot", "trips": [...]} right after connect (same rows as active-trips)
+    - then {"type": "trip_added" | "trip_updated" | "trip_removed", "trip_id", "trip"?}
+    Events published while the snapshot loads are held back and sent after it,
+    in order, so none is overwritten by the snapshot. Held events the snapshot
+    already reflects carry the same row again; clients reset their list on
+    "snapshot" and apply every event after it as an upsert / removal.
+    """
+    await hospital_ws_manager.connect(hospital_id, ws, hold=True)
+    try:
+        while True:
+            snapshot = await run_in_threadpool(_hospital_snapshot, hospital_id)
+            if hospital_ws_manager.release(ws, snapshot):
+                break
+        while True:
+            await ws.receive_text()
+    except WebSocketDisconnect:
+        await hospital_ws_manager.disconnect(hospital_id, ws)
+    except Exception:
+        await hospital_ws_manager.disconnect(hospital_id, ws)
+
+
+@router.websocket("/ws/preemption")
+async def ws_preemption(ws: WebSocket):
+    """
+    Traffic-control feed for every corridor:
+    - {"type": "pending", "windows": [...]} right after connect
+    - then {"type": "preemption", "event": "activate" | "release", "trip_id", "junction_index", ...}
+      as junction windows open and close (or are moved / cancelled by a re-plan)
+    """
+    await preemption_ws_manager.connect(PREEMPTION_WS_KEY, ws)
+    try:
+        await preemption_ws_manager.send(
+            PREEMPTION_WS_KEY, ws, {"type": "pending", "windows": preemption_scheduler.pending()}
+        )
+        while True:
+            await ws.receive_text()
+    except WebSocketDisconnect:
+        await preemption_ws_manager.disconnect(PREEMPTION_WS_KEY, ws)
+    except Exception:
+        await preemption_ws_manager.disconnect(PREEMPTION_WS_KEY, ws)
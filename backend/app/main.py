@@ -1,20 +1,89 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import FastAPI
 
-from .db import Base, engine
+from .db import Base, SessionLocal, engine
 from .api.trip import router as trip_router
 from .api.gps import router as gps_router
 from .api.hospital import router as hospital_router
 from .api.snapshot import router as snapshot_router
 from .api.ws_routes import router as ws_routes_router
-from .api.ws_router import ws_router as ws_snapshot_router
+from .api.ws_router import snapshot_hub, ws_router as ws_snapshot_router
 from .api.dashboard import router as dashboard_router
 from .api.route import router as route_router
+from .api.eta import router as eta_router
 from .api.corridor import router as corridor_router
 from .api.predict import router as predict_router
+from .api.metrics import router as metrics_router
+from .api.preemption import router as preemption_router
+from .ml.model_store import ModelStore, ModelStoreError
+from .ml.predictor import Predictor
+from .realtime.publish import bind_event_loop, start_broker, stop_broker
+from .services.gps_buffer import GPS_WRITE_BEHIND, gps_buffer
+from .services.latest_cache import latest_cache
+from .services.offline_router import offline_router
+from .services.osrm_service import osrm_client
+from .services.preemption_scheduler import preemption_scheduler
+from .utils.compression import CompressionMiddleware
+
+log = logging.getLogger(__name__)
+
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+
+# Set at startup; stays None when the model files are missing (ETA endpoints degrade to OSRM-only).
+predictor_instance: Optional[Predictor] = None
+
+
+def _load_predictor() -> Optional[Predictor]:
+    try:
+        return Predictor(ModelStore(MODEL_DIR).load())
+    except (ModelStoreError, ImportError) as e:
+        log.warning("Delay models not loaded: %s", e)
+        return None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global predictor_instance
+
+    # Lets sync endpoints (threadpool) publish realtime events onto this loop.
+    bind_event_loop(asyncio.get_running_loop())
+    await start_broker()
+
+    predictor_instance = _load_predictor()
+
+    # Rebuild the latest-position cache for active trips before serving reads.
+    with SessionLocal() as db:
+        latest_cache.warm(db)
+
+    # Map the offline road graph now (if configured) rather than on the first OSRM outage.
+    if offline_router.graph_dir and not offline_router.available:
+        log.warning("Offline road graph not loaded from %s", offline_router.graph_dir)
+
+    if GPS_WRITE_BEHIND:
+        gps_buffer.start()
+    preemption_scheduler.start(asyncio.get_running_loop())
+    try:
+        yield
+    finally:
+        await preemption_scheduler.stop()
+        await snapshot_hub.close()
+        await osrm_client.close()
+        await stop_broker()
+        # Drain buffered GPS points before the process exits.
+        gps_buffer.stop()
+
+
+app = FastAPI(title="AI-Assisted Ambulance Delay Prediction API", lifespan=lifespan)
 
-app = FastAPI(title="AI-Assisted Ambulance Delay Prediction API")
+# gzip / brotli for large bodies (route geometry, matrices); small bodies and WebSockets untouched
+app.add_middleware(CompressionMiddleware)
 
 # DB init (safe for demo; for prod prefer alembic migrations)
 Base.metadata.create_all(bind=engine)
@@ -27,9 +96,12 @@ app.include_router(snapshot_router)
 app.include_router(ws_routes_router)
 app.include_router(dashboard_router)
 app.include_router(route_router)
+app.include_router(eta_router)
 app.include_router(corridor_router)
+app.include_router(preemption_router)
 app.include_router(predict_router)
 app.include_router(ws_snapshot_router)
+app.include_router(metrics_router)
 
 
 @app.get("/health")
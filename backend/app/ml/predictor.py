@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, List
 
 import numpy as np
 
@@ -35,3 +35,32 @@ class Predictor:
             "predicted_delay_sec": int(round(delay)),
             "risk_level": classify_risk(delay),
         }
+
+    def predict_delay_sec_batch(self, features_list: List[Dict]) -> List[Dict]:
+        """
+        Same as predict_delay_sec for many rows, with a single rf_model.predict call.
+        """
+        if not self.store.is_loaded():
+            raise RuntimeError("Models not loaded")
+        if not features_list:
+            return []
+
+        cols = self.store.schema["model_features"]
+
+        rows = []
+        for features in features_list:
+            for c in cols:
+                if c not in features:
+                    raise ValueError(f"Missing feature: {c}")
+            rows.append([features[c] for c in cols])
+
+        X = np.array(rows, dtype=float)
+        delays = np.maximum(self.store.rf_model.predict(X), 0.0)
+
+        return [
+            {
+                "predicted_delay_sec": int(round(float(d))),
+                "risk_level": classify_risk(float(d)),
+            }
+            for d in delays
+        ]
@@ -0,0 +1,308 @@
+# backend/app/realtime/broker.py
+# SECTION 6 ONLY: Pub/sub transport behind realtime/publish.py.
+# - InProcessBroker: single worker (default)
+# - RedisBroker: any Redis-protocol (RESP) server over TCP or a Unix socket,
+#   so several uvicorn workers share realtime updates.
+# Workers only SUBSCRIBE to channels they have local clients for.
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+log = logging.getLogger(__name__)
+
+REALTIME_BROKER_URL = os.getenv("REALTIME_BROKER_URL", "")
+BROKER_PUBLISH_QUEUE_SIZE = int(os.getenv("BROKER_PUBLISH_QUEUE_SIZE", "10000"))
+
+# (channel, data) -> None, always called on the event loop thread
+MessageHandler = Callable[[str, str], None]
+
+
+class BrokerError(RuntimeError):
+    pass
+
+
+class Broker(ABC):
+    """
+    Channel refcounting lives here: the transport only sees the first
+    subscribe and the last unsubscribe of a channel.
+    """
+
+    def __init__(self, on_message: MessageHandler) -> None:
+        self._on_message = on_message
+        self._refs: Dict[str, int] = {}
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, channel: str) -> None:
+        n = self._refs.get(channel, 0)
+        self._refs[channel] = n + 1
+        if n == 0:
+            self._subscribe(channel)
+
+    def unsubscribe(self, channel: str) -> None:
+        n = self._refs.get(channel, 0)
+        if n <= 1:
+            if self._refs.pop(channel, None) is not None:
+                self._unsubscribe(channel)
+        else:
+            self._refs[channel] = n - 1
+
+    def _deliver(self, channel: str, data: str) -> None:
+        self.received += 1
+        try:
+            self._on_message(channel, data)
+        except Exception:
+            log.exception("realtime handler failed for %s", channel)
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    def publish(self, channel: str, data: str) -> None:
+        """Fire-and-forget; must be called on the event loop thread."""
+
+    @abstractmethod
+    def _subscribe(self, channel: str) -> None: ...
+
+    @abstractmethod
+    def _unsubscribe(self, channel: str) -> None: ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "channels": len(self._refs),
+            "published": self.published,
+            "received": self.received,
+        }
+
+
+class InProcessBroker(Broker):
+    def publish(self, channel: str, data: str) -> None:
+        self.published += 1
+        if channel in self._refs:
+            self._deliver(channel, data)
+
+    def _subscribe(self, channel: str) -> None:
+        pass
+
+    def _unsubscribe(self, channel: str) -> None:
+        pass
+
+
+# ---- RESP (Redis protocol) ----
+def _resp_command(*parts: Any) -> bytes:
+    out = [b"*%d\r\n" % len(parts)]
+    for p in parts:
+        b = p if isinstance(p, bytes) else str(p).encode("utf-8")
+        out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+    return b"".join(out)
+
+
+async def _resp_read(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("broker connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode("utf-8")
+    if kind == b"-":
+        raise BrokerError(rest.decode("utf-8"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        n = int(rest)
+        if n < 0:
+            return None
+        return (await reader.readexactly(n + 2))[:-2]
+    if kind == b"*":
+        n = int(rest)
+        if n < 0:
+            return None
+        return [await _resp_read(reader) for _ in range(n)]
+    raise BrokerError(f"bad RESP reply: {line!r}")
+
+
+class RedisBroker(Broker):
+    """
+    Minimal RESP2 client: one connection pipelines PUBLISH, one holds the
+    SUBSCRIBE session. Both reconnect with jittered backoff; subscriptions
+    are replayed after a reconnect. Publishes queued while the connection is
+    down go out once it is back (up to queue_size); a batch in flight when it
+    drops is lost (realtime data is superseded by the next update anyway).
+
+    URLs: redis://[:password@]host[:port], unix:///path/to/redis.sock
+    (no /db: pub/sub channels are shared by all databases, so one is rejected)
+    """
+
+    def __init__(self, url: str, on_message: MessageHandler, *, queue_size: int = BROKER_PUBLISH_QUEUE_SIZE) -> None:
+        super().__init__(on_message)
+        u = urlparse(url)
+        self._unix_path = u.path if u.scheme in ("unix", "redis+unix") else None
+        if self._unix_path is None and u.path not in ("", "/"):
+            raise ValueError(f"REALTIME_BROKER_URL must not select a database: {u.path!r}")
+        self._host = u.hostname or "localhost"
+        self._port = u.port or 6379
+        self._password = unquote(u.password) if u.password else None
+
+        self._outbox: Optional[asyncio.Queue] = None
+        self._queue_size = queue_size
+        self._sub_writer: Optional[asyncio.StreamWriter] = None
+        self._tasks: List[asyncio.Task] = []
+        self._closing = False
+
+        self.connected_pub = False
+        self.connected_sub = False
+        self.dropped = 0
+        self.reconnects = 0
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self._unix_path:
+            reader, writer = await asyncio.open_unix_connection(self._unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(self._host, self._port)
+        if self._password:
+            try:
+                writer.write(_resp_command("AUTH", self._password))
+                await writer.drain()
+                await _resp_read(reader)
+            except BaseException:
+                writer.close()
+                raise
+        return reader, writer
+
+    async def _backoff(self, attempt: int) -> None:
+        self.reconnects += 1
+        delay = min(5.0, 0.1 * (2 ** min(attempt, 6)))
+        await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def start(self) -> None:
+        self._closing = False
+        self._outbox = asyncio.Queue(maxsize=self._queue_size)
+        self._tasks = [
+            asyncio.create_task(self._publisher()),
+            asyncio.create_task(self._subscriber()),
+        ]
+
+    async def close(self) -> None:
+        self._closing = True
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def publish(self, channel: str, data: str) -> None:
+        if self._outbox is None:
+            self.dropped += 1
+            return
+        try:
+            self._outbox.put_nowait((channel, data))
+            self.published += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _publisher(self) -> None:
+        assert self._outbox is not None
+        attempt = 0
+        batch: List[Tuple[str, str]] = []  # taken from the outbox, not written yet
+        while not self._closing:
+            try:
+                reader, writer = await self._open()
+            except Exception as e:
+                log.debug("realtime broker connect failed: %r", e)
+                await self._backoff(attempt)
+                attempt += 1
+                continue
+            attempt = 0
+            self.connected_pub = True
+            try:
+                while True:
+                    if not batch:
+                        batch = [await self._outbox.get()]
+                        while not self._outbox.empty() and len(batch) < 512:
+                            batch.append(self._outbox.get_nowait())
+                    if reader.at_eof():
+                        # Server went away while we were idle: keep the batch for the next connection.
+                        raise ConnectionError("broker connection closed")
+                    sent, batch = batch, []
+                    writer.write(b"".join(_resp_command("PUBLISH", ch, data) for ch, data in sent))
+                    await writer.drain()
+                    for _ in sent:
+                        await _resp_read(reader)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Socket errors, truncated or malformed replies: drop the connection, start over.
+                log.warning("realtime broker publisher disconnected (%r); reconnecting", e)
+            finally:
+                self.connected_pub = False
+                writer.close()
+            await self._backoff(0)
+
+    async def _subscriber(self) -> None:
+        attempt = 0
+        while not self._closing:
+            try:
+                reader, writer = await self._open()
+            except Exception as e:
+                log.debug("realtime broker connect failed: %r", e)
+                await self._backoff(attempt)
+                attempt += 1
+                continue
+            attempt = 0
+            self._sub_writer = writer
+            self.connected_sub = True
+            try:
+                if self._refs:
+                    writer.write(_resp_command("SUBSCRIBE", *self._refs.keys()))
+                while True:
+                    reply = await _resp_read(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        self._deliver(reply[1].decode("utf-8"), reply[2].decode("utf-8"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("realtime broker subscriber disconnected (%r); reconnecting", e)
+            finally:
+                self.connected_sub = False
+                self._sub_writer = None
+                writer.close()
+            await self._backoff(0)
+
+    def _subscribe(self, channel: str) -> None:
+        if self._sub_writer is not None:
+            self._sub_writer.write(_resp_command("SUBSCRIBE", channel))
+
+    def _unsubscribe(self, channel: str) -> None:
+        if self._sub_writer is not None:
+            self._sub_writer.write(_resp_command("UNSUBSCRIBE", channel))
+
+    def stats(self) -> Dict[str, Any]:
+        out = super().stats()
+        out.update(
+            {
+                "connected": self.connected_pub and self.connected_sub,
+                "dropped": self.dropped,
+                "reconnects": self.reconnects,
+                "outbox": self._outbox.qsize() if self._outbox is not None else 0,
+            }
+        )
+        return out
+
+
+def make_broker(on_message: MessageHandler, url: str = REALTIME_BROKER_URL) -> Broker:
+    if not url:
+        return InProcessBroker(on_message)
+    scheme = urlparse(url).scheme
+    if scheme in ("redis", "unix", "redis+unix"):
+        return RedisBroker(url, on_message)
+    raise ValueError(f"Unsupported REALTIME_BROKER_URL scheme: {scheme}")
@@ -0,0 +1,66 @@
+# backend/app/realtime/encoding.py
+# SECTION 6 ONLY: Encode-once JSON frames for realtime fan-out.
+# orjson when installed, stdlib json otherwise (same output shape).
+
+from __future__ import annotations
+
+import json
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Union
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    return str(o)
+
+
+_encodes = 0
+_encode_ns = 0
+
+
+class EncodedFrame:
+    """
+    A payload serialized exactly once. The same str object is handed to every
+    client's send_text, however many viewers there are.
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+
+def encode_json(payload: Any) -> str:
+    global _encodes, _encode_ns
+    t0 = time.perf_counter_ns()
+    if orjson is not None:
+        text = orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    else:
+        text = json.dumps(payload, default=_default, separators=(",", ":"), ensure_ascii=False)
+    _encodes += 1
+    _encode_ns += time.perf_counter_ns() - t0
+    return text
+
+
+def encode_frame(payload: Union[Dict[str, Any], EncodedFrame]) -> EncodedFrame:
+    if isinstance(payload, EncodedFrame):
+        return payload
+    return EncodedFrame(encode_json(payload))
+
+
+def encoder_stats() -> Dict[str, Any]:
+    return {
+        "backend": "orjson" if orjson is not None else "json",
+        "encodes": _encodes,
+        "encode_ms_total": round(_encode_ns / 1e6, 3),
+    }
@@ -1,13 +1,167 @@
 # backend/app/realtime/publish.py
 # SECTION 6 ONLY: Safe publish hook
 # Goal: allow REST endpoints to "fire and forget" a WS update.
+# Everything goes through the broker (in-process by default, Redis protocol when
+# REALTIME_BROKER_URL is set) so updates reach clients attached to any worker.
 
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Literal, Optional
 
-from app.realtime.ws_manager import ws_manager
+from app.realtime.broker import Broker, make_broker
+from app.realtime.encoding import EncodedFrame, encode_json
+from app.realtime.ws_manager import PREEMPTION_WS_KEY, hospital_ws_manager, preemption_ws_manager, ws_manager
+from app.services.latest_cache import LatestState, latest_cache
+
+# Loop that owns the WebSockets. Sync (def) endpoints run in the threadpool where
+# there is no running loop, so publishes from there are handed over to this loop.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+TripChangeListener = Callable[[str, str], None]
+_change_listeners: List[TripChangeListener] = []
+
+TRIP_UPDATES_PREFIX = "trip:"
+TRIP_CHANGES_PREFIX = "trip-changed:"
+HOSPITAL_PREFIX = "hospital:"
+PREEMPTION_CHANNEL = "preemption"
+
+HospitalEvent = Literal["trip_added", "trip_updated", "trip_removed"]
+
+
+def trip_updates_channel(trip_id: str) -> str:
+    return f"{TRIP_UPDATES_PREFIX}{trip_id}"
+
+
+def trip_changes_channel(trip_id: str) -> str:
+    return f"{TRIP_CHANGES_PREFIX}{trip_id}"
+
+
+def hospital_channel(hospital_id: str) -> str:
+    return f"{HOSPITAL_PREFIX}{hospital_id}"
+
+
+def _on_broker_message(channel: str, data: str) -> None:
+    if channel.startswith(TRIP_UPDATES_PREFIX):
+        trip_id = channel[len(TRIP_UPDATES_PREFIX):]
+        # Already encoded by the publishing worker: fan out as-is.
+        asyncio.get_running_loop().create_task(ws_manager.broadcast(trip_id, EncodedFrame(data)))
+    elif channel.startswith(TRIP_CHANGES_PREFIX):
+        trip_id = channel[len(TRIP_CHANGES_PREFIX):]
+        _notify_changed(trip_id, _apply_trip_change(trip_id, data))
+    elif channel.startswith(HOSPITAL_PREFIX):
+        hospital_id = channel[len(HOSPITAL_PREFIX):]
+        asyncio.get_running_loop().create_task(hospital_ws_manager.broadcast(hospital_id, EncodedFrame(data)))
+    elif channel == PREEMPTION_CHANNEL:
+        asyncio.get_running_loop().create_task(preemption_ws_manager.broadcast(PREEMPTION_WS_KEY, EncodedFrame(data)))
+
+
+_broker: Broker = make_broker(_on_broker_message)
+
+
+def get_broker() -> Broker:
+    return _broker
+
+
+async def start_broker() -> None:
+    await _broker.start()
+
+
+async def stop_broker() -> None:
+    await _broker.close()
+
+
+def subscribe_channel(channel: str) -> None:
+    """Refcounted; must be called on the event loop thread."""
+    _broker.subscribe(channel)
+
+
+def unsubscribe_channel(channel: str) -> None:
+    _broker.unsubscribe(channel)
+
+
+# This worker listens to a trip / hospital channel only while it has clients for it.
+ws_manager.on_group_opened = lambda trip_id: subscribe_channel(trip_updates_channel(trip_id))
+ws_manager.on_group_closed = lambda trip_id: unsubscribe_channel(trip_updates_channel(trip_id))
+hospital_ws_manager.on_group_opened = lambda hospital_id: subscribe_channel(hospital_channel(hospital_id))
+hospital_ws_manager.on_group_closed = lambda hospital_id: unsubscribe_channel(hospital_channel(hospital_id))
+preemption_ws_manager.on_group_opened = lambda _: subscribe_channel(PREEMPTION_CHANNEL)
+preemption_ws_manager.on_group_closed = lambda _: unsubscribe_channel(PREEMPTION_CHANNEL)
+
+
+def bind_event_loop(loop: asyncio.AbstractEventLoop) -> None:
+    global _loop
+    _loop = loop
+
+
+def add_trip_change_listener(listener: TripChangeListener) -> None:
+    """
+    Register a callback(trip_id, reason). Always invoked on the event loop thread.
+    Listeners only hear trips whose trip_changes_channel is subscribed.
+    """
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+
+def _call_soon(fn: Callable[..., Any], *args: Any) -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if loop is not None:
+        loop.call_soon(fn, *args)
+        return
+
+    if _loop is None or _loop.is_closed():
+        return
+    _loop.call_soon_threadsafe(fn, *args)
+
+
+def _encode_trip_change(reason: str, state: Optional[LatestState], status: Optional[str]) -> str:
+    msg: Dict[str, Any] = {"reason": reason}
+    if state is not None:
+        msg["state"] = {
+            "lat": state.lat,
+            "lon": state.lon,
+            "speed_mps": state.speed_mps,
+            "recorded_at": state.recorded_at.isoformat(),
+            "status": state.status,
+        }
+    elif status is not None:
+        msg["status"] = status
+    return json.dumps(msg)
+
+
+def _apply_trip_change(trip_id: str, data: str) -> str:
+    """
+    Brings this worker's latest_cache up to date with the change (the writing
+    worker may be another process) before listeners rebuild from it. Returns the reason.
+    """
+    try:
+        msg = json.loads(data)
+    except ValueError:
+        return data
+    if not isinstance(msg, dict):
+        return data
+    st = msg.get("state")
+    if st is not None:
+        latest_cache.update(
+            trip_id, st["lat"], st["lon"], st["speed_mps"], datetime.fromisoformat(st["recorded_at"]), st.get("status")
+        )
+    elif msg.get("status") is not None:
+        latest_cache.set_status(trip_id, msg["status"])
+    return str(msg.get("reason", ""))
+
+
+def _notify_changed(trip_id: str, reason: str) -> None:
+    for listener in list(_change_listeners):
+        try:
+            listener(trip_id, reason)
+        except Exception:
+            pass
 
 
 def publish_trip_update(trip_id: str, payload: Dict[str, Any]) -> None:
@@ -16,8 +170,58 @@ def publish_trip_update(trip_id: str, payload: Dict[str, Any]) -> None:
     Never raises to caller (REST must remain stable).
     """
     try:
-        loop = asyncio.get_running_loop()
-        loop.create_task(ws_manager.broadcast(trip_id, payload))
+        _call_soon(_broker.publish, trip_updates_channel(trip_id), encode_json(payload))
+    except Exception:
+        # If there's no loop to hand over to or anything fails, do nothing.
+        pass
+
+
+def publish_trip_changed(
+    trip_id: str,
+    reason: str,
+    *,
+    state: Optional[LatestState] = None,
+    status: Optional[str] = None,
+) -> None:
+    """
+    Change event from the write path (gps, arrive, ack, destination).
+    Push-mode snapshot subscribers get a delta; idle trips cost nothing.
+    state / status (the writer's latest_cache entry) travel with the event so
+    subscribers on other workers don't rebuild from their own older entry.
+    Never raises to caller.
+    """
+    try:
+        _call_soon(_broker.publish, trip_changes_channel(trip_id), _encode_trip_change(reason, state, status))
+    except Exception:
+        pass
+
+
+def publish_hospital_event(
+    hospital_id: str,
+    event: HospitalEvent,
+    trip_id: str,
+    trip: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Hospital-wide feed (/ws/hospital/{hospital_id}). `trip` is the
+    active-trips row for added/updated events.
+    Never raises to caller.
+    """
+    try:
+        payload: Dict[str, Any] = {"type": event, "hospital_id": hospital_id, "trip_id": trip_id}
+        if trip is not None:
+            payload["trip"] = trip
+        _call_soon(_broker.publish, hospital_channel(hospital_id), encode_json(payload))
+    except Exception:
+        pass
+
+
+def publish_preemption_event(event: Dict[str, Any]) -> None:
+    """
+    Signal pre-emption activate / release (/ws/preemption).
+    Never raises to caller.
+    """
+    try:
+        _call_soon(_broker.publish, PREEMPTION_CHANNEL, encode_json(event))
     except Exception:
-        # If there's no running loop (rare) or anything fails, do nothing.
         pass
@@ -0,0 +1,241 @@
+# backend/app/realtime/snapshot_hub.py
+# SECTION 6 ONLY: Shared snapshot producers for /ws/trip/{trip_id}.
+# Non-negotiable: NO ML, NO routing, NO corridor computation here.
+# The snapshot builder is injected by the API layer.
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import WebSocket
+
+from app.realtime.encoding import EncodedFrame, encode_frame
+from app.realtime.publish import subscribe_channel, trip_changes_channel, unsubscribe_channel
+from app.realtime.ws_manager import SlowConsumerPolicy, TripWSManager
+
+SNAPSHOT_TICK_SEC = float(os.getenv("SNAPSHOT_TICK_SEC", "1.0"))
+SNAPSHOT_DB_WORKERS = int(os.getenv("SNAPSHOT_DB_WORKERS", "4"))
+
+SnapshotBuilder = Callable[[str], Dict[str, Any]]
+
+MODE_POLL = "poll"  # full snapshot every tick (original contract)
+MODE_PUSH = "push"  # full snapshot on connect, then field-level deltas on change events
+
+_MISSING = object()
+
+
+def snapshot_delta(old: Dict[str, Any], new: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """
+    Field-level diff; nested objects are flattened to dotted paths
+    (e.g. "latest_gps.lat"), lists are replaced whole.
+    """
+    changes: Dict[str, Any] = {}
+    for k, v in new.items():
+        key = f"{prefix}{k}"
+        ov = old.get(k, _MISSING)
+        if isinstance(v, dict) and isinstance(ov, dict):
+            changes.update(snapshot_delta(ov, v, key + "."))
+        elif ov is _MISSING or ov != v:
+            changes[key] = v
+    for k in old.keys() - new.keys():
+        changes[f"{prefix}{k}"] = None
+    return changes
+
+
+class _TripProducer:
+    def __init__(self) -> None:
+        self.poll_subs = 0
+        self.push_subs = 0
+        self.version = 0
+        self.last: Optional[Dict[str, Any]] = None
+        # Encoded once per version, reused for every viewer / tick / late joiner.
+        self.frame: Optional[EncodedFrame] = None
+        self.full_frame: Optional[EncodedFrame] = None
+        self.dirty = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+class SnapshotHub:
+    """
+    One producer task per watched trip:
+    - builds the snapshot once per tick (poll viewers) or once per change event
+      (push viewers) on a bounded, dedicated executor
+    - fans it out to every subscriber of that trip
+    - stops when the last subscriber leaves
+    """
+
+    def __init__(
+        self,
+        build: SnapshotBuilder,
+        *,
+        manager: Optional[TripWSManager] = None,
+        push_manager: Optional[TripWSManager] = None,
+        tick_sec: float = SNAPSHOT_TICK_SEC,
+        max_workers: int = SNAPSHOT_DB_WORKERS,
+    ) -> None:
+        self._build = build
+        self.manager = manager or TripWSManager()
+        # A dropped delta would silently corrupt client state, so slow push
+        # viewers are disconnected instead and resync from a fresh snapshot.
+        self.push_manager = push_manager or TripWSManager(policy=SlowConsumerPolicy.DISCONNECT)
+        self.tick_sec = tick_sec
+        self._max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self._producers: Dict[str, _TripProducer] = {}
+
+        self.builds = 0
+        self.build_errors = 0
+        self.deltas_sent = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="snapshot-db")
+        return self._executor
+
+    def _manager_for(self, mode: str) -> TripWSManager:
+        return self.push_manager if mode == MODE_PUSH else self.manager
+
+    async def subscribe(self, trip_id: str, ws: WebSocket, mode: str = MODE_POLL) -> None:
+        await self._manager_for(mode).connect(trip_id, ws)
+
+        p = self._producers.get(trip_id)
+        if p is None:
+            p = self._producers[trip_id] = _TripProducer()
+            # Change events for this trip may be published by any worker.
+            subscribe_channel(trip_changes_channel(trip_id))
+
+        if mode == MODE_PUSH:
+            p.push_subs += 1
+            if p.last is not None:
+                # Registered before any await below, so the next delta (version + 1) follows this.
+                await self.push_manager.send(trip_id, ws, self._full_frame(trip_id, p))
+        else:
+            p.poll_subs += 1
+            if p.poll_subs == 1:
+                # A push-only producer is parked on change events; switch it to ticking.
+                p.dirty.set()
+            if p.last is not None:
+                # Late joiner: don't wait for the next tick.
+                await self.manager.send(trip_id, ws, self._frame(p))
+
+        if p.task is None:
+            p.task = asyncio.create_task(self._produce(trip_id, p))
+
+    async def unsubscribe(self, trip_id: str, ws: WebSocket, mode: str = MODE_POLL) -> None:
+        await self._manager_for(mode).disconnect(trip_id, ws)
+
+        p = self._producers.get(trip_id)
+        if p is None:
+            return
+        if mode == MODE_PUSH:
+            p.push_subs = max(0, p.push_subs - 1)
+        else:
+            p.poll_subs = max(0, p.poll_subs - 1)
+
+        if p.poll_subs + p.push_subs == 0:
+            self._producers.pop(trip_id, None)
+            unsubscribe_channel(trip_changes_channel(trip_id))
+            if p.task is not None:
+                p.task.cancel()
+
+    def notify_changed(self, trip_id: str, reason: str = "") -> None:
+        """
+        Change-event hook (see realtime.publish.add_trip_change_listener).
+        Coalesces bursts: one rebuild per producer cycle.
+        """
+        p = self._producers.get(trip_id)
+        if p is not None:
+            p.dirty.set()
+
+    @staticmethod
+    def _frame(p: _TripProducer) -> EncodedFrame:
+        if p.frame is None:
+            p.frame = encode_frame(p.last)
+        return p.frame
+
+    @staticmethod
+    def _full_frame(trip_id: str, p: _TripProducer) -> EncodedFrame:
+        if p.full_frame is None:
+            p.full_frame = encode_frame({"type": "snapshot", "trip_id": trip_id, "version": p.version, "data": p.last})
+        return p.full_frame
+
+    async def _produce(self, trip_id: str, p: _TripProducer) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = time.monotonic()
+        first = True
+        while True:
+            if not first:
+                if p.poll_subs > 0:
+                    try:
+                        await asyncio.wait_for(p.dirty.wait(), timeout=max(0.0, next_tick - time.monotonic()))
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    # Push-only: idle until something actually changes.
+                    await p.dirty.wait()
+            first = False
+            p.dirty.clear()
+
+            try:
+                snap = await loop.run_in_executor(self._get_executor(), self._build, trip_id)
+                self.builds += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.build_errors += 1
+                snap = None
+
+            if snap is not None:
+                prev = p.last
+                if prev is None or snap != prev:
+                    p.version += 1
+                    p.last = snap
+                    p.frame = None
+                    p.full_frame = None
+                    if p.push_subs > 0:
+                        if prev is None:
+                            await self.push_manager.broadcast(trip_id, self._full_frame(trip_id, p))
+                        else:
+                            await self.push_manager.broadcast(
+                                trip_id,
+                                {
+                                    "type": "delta",
+                                    "trip_id": trip_id,
+                                    "version": p.version,
+                                    "changes": snapshot_delta(prev, snap),
+                                },
+                            )
+                            self.deltas_sent += 1
+
+                if p.poll_subs > 0 and time.monotonic() >= next_tick:
+                    await self.manager.broadcast(trip_id, self._frame(p))
+
+            if time.monotonic() >= next_tick:
+                next_tick = time.monotonic() + self.tick_sec
+
+    async def close(self) -> None:
+        tasks = [p.task for p in self._producers.values() if p.task is not None]
+        self._producers.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "producers": len(self._producers),
+            "poll_subscribers": sum(p.poll_subs for p in self._producers.values()),
+            "push_subscribers": sum(p.push_subs for p in self._producers.values()),
+            "builds": self.builds,
+            "build_errors": self.build_errors,
+            "deltas_sent": self.deltas_sent,
+            "db_workers": self._max_workers,
+            "tick_sec": self.tick_sec,
+        }
@@ -5,51 +5,260 @@
 from __future__ import annotations
 
 import asyncio
-import json
-from typing import Any, Dict, Set
+import enum
+import logging
+import os
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Union
 
 from fastapi import WebSocket
 
+from app.realtime.encoding import EncodedFrame, encode_frame
+
+log = logging.getLogger(__name__)
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "32"))
+WS_SEND_TIMEOUT_SEC = float(os.getenv("WS_SEND_TIMEOUT_SEC", "10"))
+
+
+class SlowConsumerPolicy(str, enum.Enum):
+    DROP_OLDEST = "drop_oldest"  # evict the oldest queued frame
+    COALESCE = "coalesce"  # throw away the backlog, keep only the newest frame
+    DISCONNECT = "disconnect"  # close the socket; client reconnects and resyncs
+
+
+WS_SLOW_CONSUMER_POLICY = SlowConsumerPolicy(os.getenv("WS_SLOW_CONSUMER_POLICY", SlowConsumerPolicy.DROP_OLDEST.value))
+
+# "Try again later": the server gave up on a client that could not keep up.
+WS_CLOSE_SLOW_CONSUMER = 1013
+
+
+class _Connection:
+    """
+    One client: bounded outbound queue + its own writer task, so a stalled
+    socket only ever delays itself.
+    """
+
+    __slots__ = ("key", "ws", "queue", "wakeup", "task", "closed", "sent", "dropped", "held", "held_overflow")
+
+    def __init__(self, key: str, ws: WebSocket) -> None:
+        self.key = key
+        self.ws = ws
+        self.queue: Deque[str] = deque()
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        # While a snapshot is loading: frames kept back until it has been queued.
+        self.held: Optional[List[str]] = None
+        self.held_overflow = False
+
 
 class TripWSManager:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        *,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        policy: SlowConsumerPolicy = WS_SLOW_CONSUMER_POLICY,
+        send_timeout_sec: float = WS_SEND_TIMEOUT_SEC,
+    ) -> None:
+        self.queue_size = max(1, queue_size)
+        self.policy = SlowConsumerPolicy(policy)
+        self.send_timeout_sec = send_timeout_sec
+
         self._clients: Dict[str, Set[WebSocket]] = {}
-        self._lock = asyncio.Lock()
+        self._conns: Dict[WebSocket, _Connection] = {}
+        # Close tasks of slow consumers dropped under DISCONNECT (referenced until done)
+        self._closing: Set[asyncio.Task] = set()
+
+        # Called with the key when its first client joins / last client leaves
+        # (used to (un)subscribe broker channels).
+        self.on_group_opened: Optional[Callable[[str], None]] = None
+        self.on_group_closed: Optional[Callable[[str], None]] = None
+
+        self.messages_enqueued = 0
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.slow_disconnects = 0
+        self.send_errors = 0
 
-    async def connect(self, trip_id: str, ws: WebSocket) -> None:
+    async def connect(self, trip_id: str, ws: WebSocket, *, hold: bool = False) -> None:
+        """
+        hold=True: broadcasts to this client are kept back until release(), so a
+        snapshot loaded after subscribing goes out ahead of them.
+        """
         await ws.accept()
-        async with self._lock:
-            self._clients.setdefault(trip_id, set()).add(ws)
+        conn = _Connection(trip_id, ws)
+        if hold:
+            conn.held = []
+        conn.task = asyncio.create_task(self._writer(conn))
+        self._conns[ws] = conn
+        group = self._clients.get(trip_id)
+        if group is None:
+            group = self._clients[trip_id] = set()
+            if self.on_group_opened is not None:
+                self.on_group_opened(trip_id)
+        group.add(ws)
 
     async def disconnect(self, trip_id: str, ws: WebSocket) -> None:
-        async with self._lock:
-            if trip_id in self._clients:
-                self._clients[trip_id].discard(ws)
-                if not self._clients[trip_id]:
-                    del self._clients[trip_id]
+        self._remove(ws)
+
+    def _remove(self, ws: WebSocket) -> Optional[_Connection]:
+        conn = self._conns.pop(ws, None)
+        if conn is None:
+            return None
+        conn.closed = True
+        conn.wakeup.set()
+        if conn.task is not None and conn.task is not asyncio.current_task():
+            conn.task.cancel()
+
+        group = self._clients.get(conn.key)
+        if group is not None:
+            group.discard(ws)
+            if not group:
+                del self._clients[conn.key]
+                if self.on_group_closed is not None:
+                    self.on_group_closed(conn.key)
+        return conn
 
-    async def broadcast(self, trip_id: str, payload: Dict[str, Any]) -> None:
+    def release(self, ws: WebSocket, snapshot: Union[Dict[str, Any], EncodedFrame]) -> bool:
+        """
+        Queue the snapshot, then the frames held since connect(hold=True), in
+        order. False if more than queue_size frames came in meanwhile: they are
+        discarded and still held from now on, and the caller should load a
+        fresh snapshot and release again.
+        """
+        conn = self._conns.get(ws)
+        if conn is None or conn.held is None:
+            return True
+        if conn.held_overflow:
+            conn.held = []
+            conn.held_overflow = False
+            return False
+        held, conn.held = conn.held, None
+        self._offer(conn, encode_frame(snapshot).text)
+        for msg in held:
+            self._offer(conn, msg)
+        return True
+
+    def _offer(self, conn: _Connection, msg: str) -> None:
+        if conn.closed:
+            return
+
+        if conn.held is not None:
+            if len(conn.held) >= self.queue_size:
+                conn.held.clear()
+                conn.held_overflow = True
+            if not conn.held_overflow:
+                conn.held.append(msg)
+            return
+
+        if len(conn.queue) >= self.queue_size:
+            if self.policy is SlowConsumerPolicy.DISCONNECT:
+                self.slow_disconnects += 1
+                self._remove(conn.ws)
+                task = asyncio.create_task(self._close(conn.ws, WS_CLOSE_SLOW_CONSUMER))
+                self._closing.add(task)
+                task.add_done_callback(self._close_done)
+                return
+            if self.policy is SlowConsumerPolicy.COALESCE:
+                n = len(conn.queue)
+                conn.queue.clear()
+            else:
+                n = 1
+                conn.queue.popleft()
+            conn.dropped += n
+            self.messages_dropped += n
+
+        conn.queue.append(msg)
+        self.messages_enqueued += 1
+        conn.wakeup.set()
+
+    async def _writer(self, conn: _Connection) -> None:
+        try:
+            while not conn.closed:
+                await conn.wakeup.wait()
+                conn.wakeup.clear()
+                while conn.queue and not conn.closed:
+                    msg = conn.queue.popleft()
+                    await asyncio.wait_for(conn.ws.send_text(msg), timeout=self.send_timeout_sec)
+                    conn.sent += 1
+                    self.messages_sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Dead or stalled past the send timeout: drop it, others are unaffected.
+            self.send_errors += 1
+            self._remove(conn.ws)
+            await self._close(conn.ws, WS_CLOSE_SLOW_CONSUMER)
+
+    def _close_done(self, task: asyncio.Task) -> None:
+        self._closing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("websocket close task failed", exc_info=task.exception())
+
+    @staticmethod
+    async def _close(ws: WebSocket, code: int) -> None:
+        try:
+            await ws.close(code=code)
+        except Exception:
+            # Usually the client is already gone; nothing left to clean up.
+            log.debug("websocket close failed", exc_info=True)
+
+    async def send(self, trip_id: str, ws: WebSocket, payload: Union[Dict[str, Any], EncodedFrame]) -> None:
+        """
+        Queue for a single already-connected client (e.g. catch-up for a late joiner).
+        """
+        conn = self._conns.get(ws)
+        if conn is not None:
+            self._offer(conn, encode_frame(payload).text)
+
+    async def broadcast(self, trip_id: str, payload: Union[Dict[str, Any], EncodedFrame]) -> None:
         """
         Read-only broadcast of already computed outputs.
         This must never affect REST correctness.
+        Encodes once (or reuses a pre-encoded frame) and only enqueues;
+        per-connection writers send the same buffer concurrently, so this
+        never waits on a client.
         """
-        async with self._lock:
-            conns = list(self._clients.get(trip_id, set()))
-
+        conns = self._clients.get(trip_id)
         if not conns:
             return
 
-        msg = json.dumps(payload, default=str)
-        dead: list[WebSocket] = []
+        msg = encode_frame(payload).text
+        for ws in tuple(conns):
+            conn = self._conns.get(ws)
+            if conn is not None:
+                self._offer(conn, msg)
 
-        for ws in conns:
-            try:
-                await ws.send_text(msg)
-            except Exception:
-                dead.append(ws)
+    def client_count(self, trip_id: Optional[str] = None) -> int:
+        if trip_id is None:
+            return len(self._conns)
+        return len(self._clients.get(trip_id, ()))
 
-        for ws in dead:
-            await self.disconnect(trip_id, ws)
+    def stats(self) -> Dict[str, Any]:
+        depths = [len(c.queue) for c in self._conns.values()]
+        return {
+            "connections": len(self._conns),
+            "channels": len(self._clients),
+            "policy": self.policy.value,
+            "queue_size": self.queue_size,
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "messages_enqueued": self.messages_enqueued,
+            "messages_sent": self.messages_sent,
+            "messages_dropped": self.messages_dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "send_errors": self.send_errors,
+        }
 
 
 ws_manager = TripWSManager()
+
+# /ws/hospital/{hospital_id}: keyed by hospital_id instead of trip_id.
+hospital_ws_manager = TripWSManager()
+
+# /ws/preemption: signal pre-emption activate / release events, one group (PREEMPTION_WS_KEY).
+preemption_ws_manager = TripWSManager()
+PREEMPTION_WS_KEY = "all"
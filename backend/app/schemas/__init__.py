@@ -33,6 +33,9 @@ from .trip import (
     TripStartOut,
     GPSUpdateIn,
     GPSUpdateOut,
+    GPSBatchIn,
+    GPSBatchTripResult,
+    GPSBatchOut,
     DestinationUpdateIn,
     TripArriveOut,
     AckIn,
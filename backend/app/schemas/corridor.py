@@ -1,8 +1,11 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 
+from .route import RouteStepItem
+
 
 class LatLon(BaseModel):
     lat: float
@@ -12,12 +15,27 @@ class LatLon(BaseModel):
 class CorridorPlanRequest(BaseModel):
     """
     Section 4 input:
-    - route_geometry: list of points from OSRM route polyline decoded to lat/lon
+    - the route, as exactly one of
+        route_geometry: list of points from OSRM route polyline decoded to lat/lon
+        route_polyline: the encoded polyline itself (precision 5 or 6)
+        route_coords: flat [lat, lon, lat, lon, ...]
+      (the last two skip per-point model validation on long routes)
+    - route_steps (optional): OSRM maneuvers from /route?steps=true; junctions then
+      come from the maneuvers and their times from per-step durations, and the
+      geometry (if any) is only kept for progress tracking
+    - route_durations (optional): OSRM seconds per route segment (/route?durations=true,
+      one per pair of consecutive route points); junction times then follow the
+      per-segment profile instead of one average speed
     - final_eta_seconds: OSRM ETA + predicted delay (Section 3 output)
     """
 
     trip_id: Optional[str] = Field(default=None, description="Optional trip reference")
-    route_geometry: List[LatLon] = Field(..., min_items=2)
+    route_geometry: Optional[List[LatLon]] = Field(default=None, min_length=2)
+    route_polyline: Optional[str] = Field(default=None, min_length=2)
+    route_polyline_precision: Literal[5, 6] = 5
+    route_coords: Optional[List[float]] = Field(default=None, min_length=4)
+    route_steps: Optional[List[RouteStepItem]] = None
+    route_durations: Optional[List[float]] = None
     final_eta_seconds: int = Field(..., ge=1)
 
     # planner tuning knobs (safe defaults)
@@ -42,6 +60,17 @@ class CorridorPlanRequest(BaseModel):
     )
 
 
+class CorridorUpdateRequest(BaseModel):
+    """
+    Re-time a stored plan: new final ETA (seconds from now) and, optionally, the
+    unit's current position (junctions it has passed are dropped).
+    """
+
+    final_eta_seconds: int = Field(..., ge=1)
+    lat: Optional[float] = Field(default=None, ge=-90, le=90)
+    lon: Optional[float] = Field(default=None, ge=-180, le=180)
+
+
 class CorridorJunctionOut(BaseModel):
     index: int
     lat: float
@@ -53,9 +82,33 @@ class CorridorJunctionOut(BaseModel):
     priority: str  # low | medium | high
 
 
+class JunctionConflictOut(BaseModel):
+    """Another active corridor holding the same intersection at an overlapping time."""
+
+    index: int  # this plan's junction
+    other_trip_id: str
+    other_index: int
+    distance_m: float
+    overlap_start: datetime
+    overlap_end: datetime
+
+
+class JunctionClaimOut(BaseModel):
+    trip_id: str
+    index: int
+    lat: float
+    lon: float
+    priority: str
+    window_start: datetime
+    window_end: datetime
+    distance_m: float
+
+
 class CorridorPlanResponse(BaseModel):
     trip_id: Optional[str] = None
     total_distance_m: float
     final_eta_seconds: int
     junctions: List[CorridorJunctionOut]
     meta: dict
+    # only for plans stored under a trip_id
+    conflicts: List[JunctionConflictOut] = []
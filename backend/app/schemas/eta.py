@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class EtaOrigin(BaseModel):
+    id: str = Field(..., description="Caller's reference (ambulance / trip id)")
+    lat: float
+    lon: float
+
+
+class EtaMatrixRequest(BaseModel):
+    origins: List[EtaOrigin] = Field(..., min_length=1, max_length=5000)
+    # Defaults to every row of the Hospital table.
+    hospital_ids: Optional[List[str]] = Field(default=None, min_length=1, max_length=1000)
+
+
+class EtaMatrixResponse(BaseModel):
+    """
+    Compact row-major matrices: durations_sec[i][j] is origin_ids[i] -> hospital_ids[j].
+    null = no route.
+    """
+
+    origin_ids: List[str]
+    hospital_ids: List[str]
+    durations_sec: List[List[Optional[int]]]
+    distances_m: List[List[Optional[int]]]
+
+
+class NearestHospitalItem(BaseModel):
+    hospital_id: str
+    name: str
+    lat: float
+    lon: float
+    straight_line_m: int
+    distance_km: float
+    eta_osrm_sec: int
+    route_type: Literal["urban", "highway", "mixed"]
+    # null when the delay models are not loaded
+    predicted_delay_sec: Optional[int] = None
+    risk_level: Optional[Literal["low", "medium", "high"]] = None
+    eta_final_sec: int
+
+
+class NearestHospitalsResponse(BaseModel):
+    lat: float
+    lon: float
+    model_available: bool
+    candidates_considered: int
+    hospitals: List[NearestHospitalItem]
+
+
+class BaselineEtaResponse(BaseModel):
+    hospital_id: str
+    eta_baseline_sec: int
+    source: Literal["isochrone", "osrm", "offline"]
+    time_bucket: Optional[str] = None  # isochrone only, e.g. "07-11"
+    distance_km: Optional[float] = None  # routed answers only
@@ -1,11 +1,31 @@
-from typing import Any, Literal
+from typing import Any, List, Literal, Optional
 
 from pydantic import BaseModel
 
 
+class RouteStepItem(BaseModel):
+    """OSRM maneuver; cumulative values are from the current position (/route) or route start."""
+
+    lat: float
+    lon: float
+    maneuver: str
+    modifier: Optional[str] = None
+    bearing_before: float = 0.0
+    bearing_after: float = 0.0
+    name: str = ""
+    distance_m: float
+    duration_s: float
+    cumulative_distance_m: float
+    cumulative_duration_s: float
+
+
 class RouteResponse(BaseModel):
     trip_id: str
     distance_km: float
     duration_sec: int
-    polyline_geojson: Any
+    polyline_geojson: Optional[Any] = None  # GeoJSON LineString (geometry=geojson)
+    polyline: Optional[str] = None  # encoded polyline (geometry=polyline|polyline6)
+    polyline_precision: Optional[int] = None
     route_type: Literal["urban", "highway", "mixed"]
+    steps: Optional[List[RouteStepItem]] = None  # steps=true
+    segment_durations_s: Optional[List[float]] = None  # durations=true; one per geometry segment
@@ -37,6 +37,29 @@ class GPSUpdateOut(BaseModel):
     updated_at: datetime
 
 
+class GPSBatchIn(BaseModel):
+    # Fixes may span many trips and arrive out of order (devices flushing a
+    # dead-zone buffer); they are grouped per trip and ordered by timestamp.
+    fixes: List[GPSUpdateIn] = Field(..., min_length=1, max_length=5000)
+
+
+class GPSBatchTripResult(BaseModel):
+    trip_id: str
+    ok: bool = True
+    accepted: int = 0
+    rejected: int = 0
+    status: Optional[TripStatus] = None
+    updated_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class GPSBatchOut(BaseModel):
+    ok: bool = True
+    accepted: int = 0
+    rejected: int = 0
+    trips: List[GPSBatchTripResult] = Field(default_factory=list)
+
+
 class DestinationUpdateIn(BaseModel):
     destination_hospital_id: str
     dest_lat: Optional[float] = None
@@ -105,3 +128,8 @@ class HospitalActiveTripItem(BaseModel):
 class HospitalActiveTripsOut(BaseModel):
     hospital_id: str
     trips: List[HospitalActiveTripItem] = Field(default_factory=list)
+
+    # Pagination (total = all visible trips for the hospital, not just this page)
+    total: int = 0
+    limit: int = 50
+    offset: int = 0
@@ -2,16 +2,20 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from math import atan2, cos, radians, sin, sqrt, degrees
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from app.schemas.corridor import LatLon, CorridorPlanRequest, CorridorPlanResponse, CorridorJunctionOut
+from app.utils.polyline import decode_polyline_arrays
+from app.utils.time_profile import TimeProfile
 
 
-def haversine_m(a: LatLon, b: LatLon) -> float:
+def _haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     # Earth radius (m)
     R = 6371000.0
-    lat1, lon1 = radians(a.lat), radians(a.lon)
-    lat2, lon2 = radians(b.lat), radians(b.lon)
+    lat1, lon1 = radians(lat1), radians(lon1)
+    lat2, lon2 = radians(lat2), radians(lon2)
 
     dlat = lat2 - lat1
     dlon = lon2 - lon1
@@ -20,9 +24,9 @@ def haversine_m(a: LatLon, b: LatLon) -> float:
     return 2 * R * atan2(sqrt(h), sqrt(1 - h))
 
 
-def bearing_deg(a: LatLon, b: LatLon) -> float:
-    lat1, lon1 = radians(a.lat), radians(a.lon)
-    lat2, lon2 = radians(b.lat), radians(b.lon)
+def _bearing(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1 = radians(lat1), radians(lon1)
+    lat2, lon2 = radians(lat2), radians(lon2)
 
     dlon = lon2 - lon1
     x = sin(dlon) * cos(lat2)
@@ -31,26 +35,64 @@ def bearing_deg(a: LatLon, b: LatLon) -> float:
     return (degrees(brng) + 360) % 360
 
 
-def angle_change_deg(p1: LatLon, p2: LatLon, p3: LatLon) -> float:
-    b1 = bearing_deg(p1, p2)
-    b2 = bearing_deg(p2, p3)
+def _angle_change(b1: float, b2: float) -> float:
     diff = abs(b2 - b1)
     return min(diff, 360 - diff)
 
 
+def haversine_m(a: LatLon, b: LatLon) -> float:
+    return _haversine(a.lat, a.lon, b.lat, b.lon)
+
+
+def bearing_deg(a: LatLon, b: LatLon) -> float:
+    return _bearing(a.lat, a.lon, b.lat, b.lon)
+
+
+def angle_change_deg(p1: LatLon, p2: LatLon, p3: LatLon) -> float:
+    return _angle_change(bearing_deg(p1, p2), bearing_deg(p2, p3))
+
+
+def route_arrays(req: CorridorPlanRequest) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (lats, lons) float arrays from whichever route field the request carries.
+    Raises ValueError if none / more than one is set or the route is malformed.
+    """
+    given = [f for f in ("route_geometry", "route_polyline", "route_coords") if getattr(req, f) is not None]
+    if len(given) != 1:
+        raise ValueError("exactly one of route_geometry, route_polyline, route_coords is required")
+
+    if req.route_polyline is not None:
+        lats, lons = decode_polyline_arrays(req.route_polyline, req.route_polyline_precision)
+    elif req.route_coords is not None:
+        if len(req.route_coords) % 2:
+            raise ValueError("route_coords must hold lat, lon pairs")
+        flat = np.asarray(req.route_coords, dtype=float)
+        lats, lons = flat[0::2], flat[1::2]
+    else:
+        lats = np.fromiter((p.lat for p in req.route_geometry), dtype=float, count=len(req.route_geometry))
+        lons = np.fromiter((p.lon for p in req.route_geometry), dtype=float, count=len(req.route_geometry))
+
+    if len(lats) < 2:
+        raise ValueError("route must contain at least 2 points")
+    if not (np.isfinite(lats).all() and np.isfinite(lons).all()):
+        raise ValueError("route contains non-finite coordinates")
+    return lats, lons
+
+
 @dataclass
 class CandidateJunction:
     idx: int
-    point: LatLon
+    lat: float
+    lon: float
     cumulative_m: float
     turn_angle: float
 
 
-def compute_route_distances(route: List[LatLon]) -> Tuple[List[float], float]:
+def compute_route_distances(lats: Sequence[float], lons: Sequence[float]) -> Tuple[List[float], float]:
     cumulative = [0.0]
     total = 0.0
-    for i in range(1, len(route)):
-        seg = haversine_m(route[i - 1], route[i])
+    for i in range(1, len(lats)):
+        seg = _haversine(lats[i - 1], lons[i - 1], lats[i], lons[i])
         total += seg
         cumulative.append(total)
     return cumulative, total
@@ -79,29 +121,271 @@ def classify_priority(turn_angle: float, progress_ratio: float) -> str:
     return "low"
 
 
+def _cumulative_np(lat1, lat2, dlon, cos1, cos2) -> np.ndarray:
+    R = 6371000.0
+    h = np.sin((lat2 - lat1) / 2) ** 2 + cos1 * cos2 * np.sin(dlon / 2) ** 2
+    seg = 2 * R * np.arctan2(np.sqrt(h), np.sqrt(1 - h))
+    cumulative = np.zeros(len(lat1) + 1)
+    np.cumsum(seg, out=cumulative[1:])
+    return cumulative
+
+
+def cumulative_distance_np(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Cumulative haversine distance (m) along the route, as in route_geometry_np."""
+    lat_r = np.radians(lats)
+    lon_r = np.radians(lons)
+    lat1, lat2 = lat_r[:-1], lat_r[1:]
+    return _cumulative_np(lat1, lat2, lon_r[1:] - lon_r[:-1], np.cos(lat1), np.cos(lat2))
+
+
+def route_geometry_np(lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Whole-route arrays: cumulative distance (m, len n), segment bearings (deg, len n-1)
+    and turn angle at each interior vertex (deg, len n-2). Same operation order as
+    _haversine / _bearing / _angle_change; values agree with them to the last bit
+    except where np.arctan2 rounds differently from libm (<= 1 ulp).
+    """
+    lat_r = np.radians(lats)
+    lon_r = np.radians(lons)
+    lat1, lat2 = lat_r[:-1], lat_r[1:]
+    dlon = lon_r[1:] - lon_r[:-1]
+    cos1, cos2 = np.cos(lat1), np.cos(lat2)
+    sin1, sin2 = np.sin(lat1), np.sin(lat2)
+    cumulative = _cumulative_np(lat1, lat2, dlon, cos1, cos2)
+
+    x = np.sin(dlon) * cos2
+    y = cos1 * sin2 - sin1 * cos2 * np.cos(dlon)
+    bearings = (np.degrees(np.arctan2(x, y)) + 360) % 360
+
+    diff = np.abs(bearings[1:] - bearings[:-1])
+    turns = np.minimum(diff, 360 - diff)
+    return cumulative, bearings, turns
+
+
+# Turn angles this close to a comparison threshold are recomputed with the scalar
+# helpers so the candidate / priority decisions match plan_corridor_scalar exactly.
+_TURN_RECHECK_DEG = 1e-9
+
+
+def _exact_turn(lats: np.ndarray, lons: np.ndarray, i: int) -> float:
+    la, lo = lats[i - 1:i + 2].tolist(), lons[i - 1:i + 2].tolist()
+    return _angle_change(_bearing(la[0], lo[0], la[1], lo[1]), _bearing(la[1], lo[1], la[2], lo[2]))
+
+
+def _enforce_spacing(cand_m: np.ndarray, min_spacing_m: float, max_junctions: int) -> List[int]:
+    """
+    Positions in cand_m (sorted ascending) picked greedily: first candidate, then
+    the first one at least min_spacing_m past the previous pick, up to max_junctions.
+    searchsorted jumps; the two while loops settle float rounding at the boundary
+    so the test stays `c - last >= min_spacing_m` exactly as in the scalar planner.
+    """
+    m = len(cand_m)
+    picks: List[int] = []
+    j = 0
+    while j < m and len(picks) < max_junctions:
+        picks.append(j)
+        last = cand_m[j]
+        lo = j + 1
+        j = max(lo, int(np.searchsorted(cand_m, last + min_spacing_m, side="left")))
+        while j > lo and cand_m[j - 1] - last >= min_spacing_m:
+            j -= 1
+        while j < m and cand_m[j] - last < min_spacing_m:
+            j += 1
+    return picks
+
+
+@dataclass
+class CorridorPlan:
+    """Planner output kept by corridor_store for cheap re-timing."""
+
+    lats: np.ndarray
+    lons: np.ndarray
+    cumulative: np.ndarray  # cumulative[i] = metres from the route start to point i
+    total_m: float
+    junctions: List[CandidateJunction]  # chosen, in route order
+    # OSRM time along the route (route_durations or route_steps); None = average speed
+    profile: Optional[TimeProfile] = None
+    from_steps: bool = False
+
+
 def plan_corridor(req: CorridorPlanRequest) -> CorridorPlanResponse:
-    route = req.route_geometry
-    cumulative, total_m = compute_route_distances(route)
+    return plan_response(req, compute_plan(req))
 
-    # Candidate junctions based on turning angle
+
+def plan_response(req: CorridorPlanRequest, plan: CorridorPlan) -> CorridorPlanResponse:
+    return _build_response(req, plan.junctions, plan.total_m, plan.profile, plan.from_steps)
+
+
+def compute_plan(req: CorridorPlanRequest) -> CorridorPlan:
+    if req.route_steps:
+        return _plan_from_steps(req)
+
+    lats, lons = route_arrays(req)
+    n = len(lats)
+    cumulative, _, turns = route_geometry_np(lats, lons)
+    total_m = float(cumulative[-1])
+
+    # Priority thresholds (classify_priority) and the candidate threshold
+    for thr in {req.turn_angle_threshold_deg, 35.0, 60.0}:
+        for k in np.flatnonzero(np.abs(turns - thr) < _TURN_RECHECK_DEG).tolist():
+            turns[k] = _exact_turn(lats, lons, k + 1)
+
+    # Candidate junctions based on turning angle, then the start / middle / end anchors
+    # (turn candidates first so equal-distance ties sort like the scalar planner)
+    turn_idx = np.flatnonzero(turns >= req.turn_angle_threshold_deg) + 1
+    anchor_idxs = list({1, max(1, n // 2), n - 2})
+    cand_idx = np.concatenate([turn_idx, np.asarray(anchor_idxs, dtype=np.intp)])
+    cand_ang = np.concatenate([turns[turn_idx - 1], np.zeros(len(anchor_idxs))])
+
+    # Sort by route order (stable), then enforce spacing + cap junction count
+    order = np.argsort(cumulative[cand_idx], kind="stable")
+    cand_idx, cand_ang = cand_idx[order], cand_ang[order]
+    picks = _enforce_spacing(cumulative[cand_idx], req.min_spacing_m, req.max_junctions)
+
+    chosen = [
+        CandidateJunction(
+            idx=i,
+            lat=float(lats[i]),
+            lon=float(lons[i]),
+            cumulative_m=float(cumulative[i]),
+            turn_angle=float(a),
+        )
+        for i, a in zip(cand_idx[picks].tolist(), cand_ang[picks].tolist())
+    ]
+    return CorridorPlan(
+        lats=lats,
+        lons=lons,
+        cumulative=cumulative,
+        total_m=total_m,
+        junctions=chosen,
+        profile=_durations_profile(req, cumulative),
+    )
+
+
+def _durations_profile(req: CorridorPlanRequest, cumulative: np.ndarray) -> Optional[TimeProfile]:
+    if req.route_durations is None:
+        return None
+    durations = np.asarray(req.route_durations, dtype=float)
+    if len(durations) != len(cumulative) - 1:
+        raise ValueError("route_durations must hold one value per route segment")
+    if not (np.isfinite(durations).all() and (durations >= 0).all()):
+        raise ValueError("route_durations must be finite and non-negative")
+    return TimeProfile.from_segments(cumulative, durations)
+
+
+# OSRM maneuver types that are junctions even when the road carries straight on.
+_JUNCTION_MANEUVERS = {
+    "fork", "merge", "on ramp", "off ramp", "end of road",
+    "roundabout", "rotary", "roundabout turn", "exit roundabout", "exit rotary",
+}
+_SKIP_MANEUVERS = {"depart", "arrive"}
+
+
+def _plan_from_steps(req: CorridorPlanRequest) -> CorridorPlan:
+    """
+    Candidates are the OSRM maneuvers themselves (turns past the angle threshold
+    plus forks, ramps, roundabouts...), so there is no per-vertex turn scan and
+    no anchors. Junctions are timed from the step durations, or from
+    route_durations when the geometry comes with them.
+    """
+    steps = req.route_steps
+    last = steps[-1]
+    total_m = last.cumulative_distance_m + last.distance_m
+    total_s = last.cumulative_duration_s + last.duration_s
+    if total_m <= 0:
+        raise ValueError("route_steps cover no distance")
+
+    candidates: List[CandidateJunction] = []
+    for i, st in enumerate(steps):
+        if st.maneuver in _SKIP_MANEUVERS:
+            continue
+        ang = _angle_change(st.bearing_before, st.bearing_after)
+        if ang >= req.turn_angle_threshold_deg or st.maneuver in _JUNCTION_MANEUVERS:
+            candidates.append(
+                CandidateJunction(
+                    idx=i,
+                    lat=st.lat,
+                    lon=st.lon,
+                    cumulative_m=st.cumulative_distance_m,
+                    turn_angle=ang,
+                )
+            )
+    candidates.sort(key=lambda c: c.cumulative_m)
+    picks = _enforce_spacing(np.array([c.cumulative_m for c in candidates]), req.min_spacing_m, req.max_junctions)
+
+    # Step starts plus both route ends (steps from /route are re-based to the unit,
+    # so the first one is usually some way ahead of 0)
+    knots_m = np.array([0.0] + [st.cumulative_distance_m for st in steps] + [total_m])
+    knots_s = np.array([0.0] + [st.cumulative_duration_s for st in steps] + [total_s])
+
+    # Geometry for progress tracking: the polyline if sent, else the maneuver points.
+    # /route returns both from the ambulance's projected position; they are aligned
+    # at the destination and any geometry before the steps' origin is cut off.
+    # Steps without any duration: no profile, junctions fall back to the average speed.
+    profile = TimeProfile(knots_m, knots_s) if total_s > 0 else None
+    if any(getattr(req, f) is not None for f in ("route_geometry", "route_polyline", "route_coords")):
+        lats, lons = route_arrays(req)
+        cumulative = cumulative_distance_np(lats, lons)
+        cumulative += total_m - cumulative[-1]
+        # Only time differences are read, so the driven part (negative metres) can stay in.
+        profile = _durations_profile(req, cumulative) or profile
+        k = min(len(lats) - 2, max(0, int(np.searchsorted(cumulative, 0.0, side="right")) - 1))
+        lats, lons, cumulative = lats[k:].copy(), lons[k:].copy(), cumulative[k:]
+        if cumulative[0] < 0 < cumulative[1]:
+            f = -cumulative[0] / (cumulative[1] - cumulative[0])
+            lats[0] += f * (lats[1] - lats[0])
+            lons[0] += f * (lons[1] - lons[0])
+            cumulative[0] = 0.0
+    else:
+        lats = np.array([st.lat for st in steps])
+        lons = np.array([st.lon for st in steps])
+        cumulative = knots_m[1:-1].copy()
+        if len(lats) < 2:
+            raise ValueError("route_steps without a route geometry need at least 2 steps")
+
+    return CorridorPlan(
+        lats=lats,
+        lons=lons,
+        cumulative=cumulative,
+        total_m=float(total_m),
+        junctions=[candidates[p] for p in picks],
+        profile=profile,
+        from_steps=True,
+    )
+
+
+def plan_corridor_scalar(req: CorridorPlanRequest) -> CorridorPlanResponse:
+    """
+    Point-at-a-time reference planner. plan_corridor returns exactly the same
+    response for geometry-only requests (route_steps are ignored here); kept for
+    equivalence checks and benchmarks/bench_corridor_planner.py.
+    """
+    lat_arr, lon_arr = route_arrays(req)
+    lats, lons = lat_arr.tolist(), lon_arr.tolist()
+    n = len(lats)
+    cumulative, total_m = compute_route_distances(lats, lons)
+
+    # Candidate junctions based on turning angle (one bearing per segment)
+    bearings = [_bearing(lats[i], lons[i], lats[i + 1], lons[i + 1]) for i in range(n - 1)]
     candidates: List[CandidateJunction] = []
-    for i in range(1, len(route) - 1):
-        ang = angle_change_deg(route[i - 1], route[i], route[i + 1])
+    for i in range(1, n - 1):
+        ang = _angle_change(bearings[i - 1], bearings[i])
         if ang >= req.turn_angle_threshold_deg:
             candidates.append(
                 CandidateJunction(
                     idx=i,
-                    point=route[i],
+                    lat=lats[i],
+                    lon=lons[i],
                     cumulative_m=cumulative[i],
                     turn_angle=ang,
                 )
             )
 
     # Always include a few key anchors: start-ish and near end
-    anchor_idxs = {1, max(1, len(route) // 2), len(route) - 2}
+    anchor_idxs = {1, max(1, n // 2), n - 2}
     for i in anchor_idxs:
         # small angle marker for anchors
-        candidates.append(CandidateJunction(i, route[i], cumulative[i], turn_angle=0.0))
+        candidates.append(CandidateJunction(i, lats[i], lons[i], cumulative[i], turn_angle=0.0))
 
     # Sort by route order
     candidates.sort(key=lambda c: c.cumulative_m)
@@ -116,13 +400,29 @@ def plan_corridor(req: CorridorPlanRequest) -> CorridorPlanResponse:
         if len(chosen) >= req.max_junctions:
             break
 
+    return _build_response(req, chosen, total_m)
+
+
+def _build_response(
+    req: CorridorPlanRequest,
+    chosen: List[CandidateJunction],
+    total_m: float,
+    profile: Optional[TimeProfile] = None,
+    from_steps: bool = False,
+) -> CorridorPlanResponse:
     # Map distance -> time using final ETA
     # (assume average speed across route; simple + explainable)
     avg_speed_mps = total_m / max(1, req.final_eta_seconds)
+    # With an OSRM time profile: its time to each junction, stretched to the final ETA
+    if profile is not None:
+        etas = profile.eta_s(np.array([c.cumulative_m for c in chosen]), final_eta_s=req.final_eta_seconds).tolist()
 
     junctions_out: List[CorridorJunctionOut] = []
     for j_idx, c in enumerate(chosen, start=1):
-        eta_sec = int(c.cumulative_m / max(0.1, avg_speed_mps))
+        if profile is not None:
+            eta_sec = max(0, int(etas[j_idx - 1]))
+        else:
+            eta_sec = int(c.cumulative_m / max(0.1, avg_speed_mps))
         w = req.window_buffer_seconds
         start_w = max(0, eta_sec - w)
         end_w = eta_sec + w
@@ -133,8 +433,8 @@ def plan_corridor(req: CorridorPlanRequest) -> CorridorPlanResponse:
         junctions_out.append(
             CorridorJunctionOut(
                 index=j_idx,
-                lat=c.point.lat,
-                lon=c.point.lon,
+                lat=c.lat,
+                lon=c.lon,
                 cumulative_distance_m=round(c.cumulative_m, 2),
                 eta_seconds_from_now=eta_sec,
                 window_start_seconds_from_now=start_w,
@@ -154,6 +454,20 @@ def plan_corridor(req: CorridorPlanRequest) -> CorridorPlanResponse:
             "min_spacing_m": req.min_spacing_m,
             "max_junctions": req.max_junctions,
             "window_buffer_seconds": req.window_buffer_seconds,
-            "explainability": "distance→time mapping via avg speed; junctions via turn-angle threshold + spacing",
+            "explainability": explainability(profile, from_steps),
         },
     )
+
+
+def explainability(profile: Optional[TimeProfile], from_steps: bool) -> str:
+    """meta["explainability"] of a plan response (POST /plan and the stored plan alike)."""
+    return "; ".join(
+        (
+            "distance→time mapping via avg speed"
+            if profile is None
+            else "distance→time via OSRM duration profile scaled to final ETA",
+            "junctions via OSRM maneuvers (turn-angle threshold or junction type) + spacing"
+            if from_steps
+            else "junctions via turn-angle threshold + spacing",
+        )
+    )
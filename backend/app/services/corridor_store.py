@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import bisect
+import math
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..schemas.corridor import CorridorJunctionOut, CorridorPlanRequest, CorridorPlanResponse, JunctionConflictOut
+from .corridor_planner import CorridorPlan, classify_priority, explainability
+from .junction_conflicts import JunctionClaim, JunctionConflict, JunctionConflictIndex, junction_index
+from .preemption_scheduler import PreemptionScheduler, preemption_scheduler
+from .route_tracker import OFF_ROUTE_THRESHOLD_M, ROUTE_TRACK_SEARCH_AHEAD
+
+CORRIDOR_STORE_MAX_TRIPS = int(os.getenv("CORRIDOR_STORE_MAX_TRIPS", "10000"))
+
+_M_PER_DEG = math.pi * 6371000.0 / 180.0
+
+
+def _now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class StoredCorridor:
+    request: CorridorPlanRequest  # planner knobs (route fields dropped)
+    plan: CorridorPlan
+    junction_m: List[float]  # plan.junctions[k].cumulative_m, for bisect
+    priorities: List[str]  # fixed at plan time (turn angle + position on the full route)
+    final_eta_seconds: int  # latest ETA to the hospital, from updated_at
+    planned_at: datetime
+    updated_at: datetime
+    progress_m: float = 0.0
+    first_remaining: int = 0  # plan.junctions[:first_remaining] are behind the unit
+    seg_hint: int = 0
+    deviation_m: Optional[float] = None
+    updates: int = 0
+
+
+def _epoch_utc(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, timezone.utc)
+
+
+def conflicts_out(conflicts: List[JunctionConflict]) -> List[JunctionConflictOut]:
+    return [
+        JunctionConflictOut(
+            index=c.index,
+            other_trip_id=c.other_trip_id,
+            other_index=c.other_index,
+            distance_m=c.distance_m,
+            overlap_start=_epoch_utc(c.overlap_start),
+            overlap_end=_epoch_utc(c.overlap_end),
+        )
+        for c in conflicts
+    ]
+
+
+def project_progress(
+    lats: np.ndarray,
+    lons: np.ndarray,
+    cumulative: np.ndarray,
+    lat: float,
+    lon: float,
+    *,
+    seg_hint: int = 0,
+    search_ahead: int = ROUTE_TRACK_SEARCH_AHEAD,
+    full_scan_over_m: float = OFF_ROUTE_THRESHOLD_M,
+):
+    """
+    Returns (segment index, deviation_m, progress_m) of (lat, lon) on the route.
+    Same local-frame projection as route_tracker.project_onto_route, over a window
+    of segments after seg_hint (full scan when the window's best match is too far).
+    """
+    n_seg = len(lats) - 1
+    kx = _M_PER_DEG * math.cos(math.radians(lat))
+
+    def scan(lo: int, hi: int):
+        ax, ay = (lons[lo:hi] - lon) * kx, (lats[lo:hi] - lat) * _M_PER_DEG
+        dx = (lons[lo + 1:hi + 1] - lon) * kx - ax
+        dy = (lats[lo + 1:hi + 1] - lat) * _M_PER_DEG - ay
+        seg2 = dx * dx + dy * dy
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(seg2 > 0.0, np.clip(-(ax * dx + ay * dy) / seg2, 0.0, 1.0), 0.0)
+        d2 = (ax + t * dx) ** 2 + (ay + t * dy) ** 2
+        k = int(np.argmin(d2))
+        return lo + k, float(t[k]), float(d2[k])
+
+    lo = max(0, seg_hint - 2)
+    hi = min(n_seg, lo + search_ahead)
+    i, t, d2 = scan(lo, hi)
+    if d2 > full_scan_over_m ** 2 and (lo > 0 or hi < n_seg):
+        i, t, d2 = scan(0, n_seg)
+
+    progress = float(cumulative[i] + t * (cumulative[i + 1] - cumulative[i]))
+    return i, math.sqrt(d2), progress
+
+
+class CorridorPlanStore:
+    """
+    Latest corridor plan per trip, with the route's cumulative distances and the
+    chosen junctions kept so an ETA / position update only re-times what is left:
+    project the fix onto the stored route (windowed), bisect past junctions away,
+    then O(remaining junctions) for the new windows.
+
+    Progress only moves forward, and not at all while the unit is more than
+    off_route_m from the planned route.
+
+    Every plan / update also replaces the trip's windows in the shared junction
+    conflict index (responses carry the overlaps with other trips) and in the
+    signal pre-emption scheduler.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_trips: int = CORRIDOR_STORE_MAX_TRIPS,
+        off_route_m: float = OFF_ROUTE_THRESHOLD_M,
+        conflicts: JunctionConflictIndex = junction_index,
+        scheduler: PreemptionScheduler = preemption_scheduler,
+    ) -> None:
+        self.max_trips = max(1, max_trips)
+        self.off_route_m = off_route_m
+        self.conflicts = conflicts
+        self.scheduler = scheduler
+        self._items: "OrderedDict[str, StoredCorridor]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.plans = 0
+        self.updates = 0
+        self.off_route_updates = 0
+        self.junctions_passed = 0
+
+    def _register(self, trip_id: str, entry: StoredCorridor, resp: CorridorPlanResponse) -> None:
+        t0 = entry.updated_at.timestamp()
+        claims = [
+            JunctionClaim(
+                trip_id=trip_id,
+                index=j.index,
+                lat=j.lat,
+                lon=j.lon,
+                start=t0 + j.window_start_seconds_from_now,
+                end=t0 + j.window_end_seconds_from_now,
+                priority=j.priority,
+            )
+            for j in resp.junctions
+        ]
+        resp.conflicts = conflicts_out(self.conflicts.replace(trip_id, claims))
+        self.scheduler.replace(trip_id, claims)
+
+    def _forget(self, trip_id: str) -> None:
+        self.conflicts.remove(trip_id)
+        self.scheduler.remove(trip_id)
+
+    def put(self, trip_id: str, req: CorridorPlanRequest, plan: CorridorPlan) -> List[JunctionConflictOut]:
+        """Stores the plan; returns its overlaps with other trips' junction windows."""
+        now = _now_utc()
+        total = plan.total_m
+        entry = StoredCorridor(
+            request=req.model_copy(update={"route_geometry": None, "route_polyline": None, "route_coords": None, "route_steps": None, "route_durations": None}),
+            plan=plan,
+            junction_m=[c.cumulative_m for c in plan.junctions],
+            priorities=[classify_priority(c.turn_angle, c.cumulative_m / max(1.0, total)) for c in plan.junctions],
+            final_eta_seconds=req.final_eta_seconds,
+            planned_at=now,
+            updated_at=now,
+        )
+        with self._lock:
+            self._items[trip_id] = entry
+            self._items.move_to_end(trip_id)
+            while len(self._items) > self.max_trips:
+                evicted, _ = self._items.popitem(last=False)
+                self._forget(evicted)
+            self.plans += 1
+            resp = self._response(trip_id, entry)
+            self._register(trip_id, entry, resp)
+            return resp.conflicts
+
+    def remove(self, trip_id: str) -> None:
+        with self._lock:
+            self._items.pop(trip_id, None)
+            self._forget(trip_id)
+
+    def update(
+        self,
+        trip_id: str,
+        final_eta_seconds: int,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+    ) -> Optional[CorridorPlanResponse]:
+        """
+        New ETA (seconds from now) and, optionally, the unit's position.
+        None if the trip has no stored plan.
+        """
+        with self._lock:
+            entry = self._items.get(trip_id)
+            if entry is None:
+                return None
+            self._items.move_to_end(trip_id)
+
+            if lat is not None and lon is not None:
+                plan = entry.plan
+                seg, deviation, progress = project_progress(
+                    plan.lats, plan.lons, plan.cumulative, lat, lon,
+                    seg_hint=entry.seg_hint, full_scan_over_m=self.off_route_m,
+                )
+                entry.deviation_m = deviation
+                if deviation <= self.off_route_m:
+                    entry.seg_hint = seg
+                    entry.progress_m = max(entry.progress_m, progress)
+                else:
+                    self.off_route_updates += 1
+
+                passed = bisect.bisect_right(entry.junction_m, entry.progress_m, lo=entry.first_remaining)
+                self.junctions_passed += passed - entry.first_remaining
+                entry.first_remaining = passed
+
+            entry.final_eta_seconds = int(final_eta_seconds)
+            entry.updated_at = _now_utc()
+            entry.updates += 1
+            self.updates += 1
+            resp = self._response(trip_id, entry)
+            self._register(trip_id, entry, resp)
+            return resp
+
+    def response(self, trip_id: str) -> Optional[CorridorPlanResponse]:
+        with self._lock:
+            entry = self._items.get(trip_id)
+            if entry is None:
+                return None
+            resp = self._response(trip_id, entry)
+            resp.conflicts = conflicts_out(self.conflicts.conflicts(trip_id))
+            return resp
+
+    def dashboard_junctions(self, trip_id: str) -> List[dict]:
+        """
+        Remaining junctions in the shape dashboard.get_latest_corridor_plan returns,
+        with windows as absolute UTC datetimes (anchored at the last update).
+        """
+        with self._lock:
+            entry = self._items.get(trip_id)
+            if entry is None:
+                return []
+            resp = self._response(trip_id, entry)
+            anchor = entry.updated_at
+        return [
+            {
+                "name": f"J{j.index}",
+                "lat": j.lat,
+                "lon": j.lon,
+                "priority": j.priority,
+                "window_start": anchor + timedelta(seconds=j.window_start_seconds_from_now),
+                "window_end": anchor + timedelta(seconds=j.window_end_seconds_from_now),
+            }
+            for j in resp.junctions
+        ]
+
+    def countdown_seconds(
+        self,
+        trip_id: str,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+    ) -> Optional[int]:
+        """
+        Seconds left to the hospital. With a time profile and the unit's latest
+        position, the OSRM time left from that position (projected onto the plan)
+        stretched by the delay of the last update, so the countdown follows the
+        unit along the route. Otherwise the last ETA less the time since that
+        update. None without a stored plan.
+        """
+        with self._lock:
+            entry = self._items.get(trip_id)
+            if entry is None:
+                return None
+            plan = entry.plan
+            if plan.profile is not None and lat is not None and lon is not None:
+                _, deviation, progress = project_progress(
+                    plan.lats, plan.lons, plan.cumulative, lat, lon,
+                    seg_hint=entry.seg_hint, full_scan_over_m=self.off_route_m,
+                )
+                if deviation <= self.off_route_m:
+                    progress = max(entry.progress_m, progress)
+                    delay_ratio = entry.final_eta_seconds / max(1.0, plan.profile.remaining_s(entry.progress_m))
+                    return max(0, int(plan.profile.remaining_s(progress) * delay_ratio))
+            elapsed = (_now_utc() - entry.updated_at).total_seconds()
+            return max(0, int(entry.final_eta_seconds - elapsed))
+
+    @staticmethod
+    def _response(trip_id: str, entry: StoredCorridor) -> CorridorPlanResponse:
+        # Same distance -> time mapping as the planner, over the remaining route only.
+        req = entry.request
+        plan = entry.plan
+        remaining_m = max(0.0, plan.total_m - entry.progress_m)
+        avg_speed_mps = remaining_m / max(1, entry.final_eta_seconds)
+        speed = max(0.1, avg_speed_mps)
+        w = req.window_buffer_seconds
+        if plan.profile is not None:
+            # OSRM time from the projected position to each junction, stretched to the new ETA
+            etas = plan.profile.eta_s(
+                entry.junction_m[entry.first_remaining:], from_m=entry.progress_m, final_eta_s=entry.final_eta_seconds
+            ).tolist()
+
+        junctions_out: List[CorridorJunctionOut] = []
+        for k in range(entry.first_remaining, len(plan.junctions)):
+            c = plan.junctions[k]
+            if plan.profile is not None:
+                eta_sec = max(0, int(etas[k - entry.first_remaining]))
+            else:
+                eta_sec = int((c.cumulative_m - entry.progress_m) / speed)
+            junctions_out.append(
+                CorridorJunctionOut(
+                    index=k + 1,  # stable across updates
+                    lat=c.lat,
+                    lon=c.lon,
+                    cumulative_distance_m=round(c.cumulative_m, 2),
+                    eta_seconds_from_now=eta_sec,
+                    window_start_seconds_from_now=max(0, eta_sec - w),
+                    window_end_seconds_from_now=eta_sec + w,
+                    priority=entry.priorities[k],
+                )
+            )
+
+        return CorridorPlanResponse(
+            trip_id=trip_id,
+            total_distance_m=round(plan.total_m, 2),
+            final_eta_seconds=entry.final_eta_seconds,
+            junctions=junctions_out,
+            meta={
+                "avg_speed_mps": round(avg_speed_mps, 3),
+                "turn_angle_threshold_deg": req.turn_angle_threshold_deg,
+                "min_spacing_m": req.min_spacing_m,
+                "max_junctions": req.max_junctions,
+                "window_buffer_seconds": w,
+                "explainability": explainability(plan.profile, plan.from_steps),
+                "progress_m": round(entry.progress_m, 2),
+                "remaining_distance_m": round(remaining_m, 2),
+                "deviation_m": round(entry.deviation_m, 1) if entry.deviation_m is not None else None,
+                "passed_junctions": entry.first_remaining,
+                "planned_at": entry.planned_at.isoformat(),
+                "updated_at": entry.updated_at.isoformat(),
+                "updates": entry.updates,
+            },
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "trips": len(self._items),
+            "plans": self.plans,
+            "updates": self.updates,
+            "off_route_updates": self.off_route_updates,
+            "junctions_passed": self.junctions_passed,
+        }
+
+
+corridor_store = CorridorPlanStore()
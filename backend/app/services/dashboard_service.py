@@ -36,8 +36,10 @@ def build_hospital_dashboard(
     eta_baseline_sec: Optional[int],
     delay_pred_sec: Optional[int],
     delay_risk: str,
+    countdown_sec: Optional[int] = None,
 ) -> HospitalDashboardResponse:
-    countdown = max(0, int(eta_final_sec))
+    # countdown_sec: live value from the trip's corridor time profile, if it has one
+    countdown = max(0, int(eta_final_sec if countdown_sec is None else countdown_sec))
     return HospitalDashboardResponse(
         trip_id=trip_id,
         eta_final_sec=int(eta_final_sec),
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import List, Optional, Sequence, Tuple
+
+from .osrm_service import get_table_driving
+
+# osrm-routed --max-table-size (default 100): sources + destinations per request.
+OSRM_TABLE_MAX_COORDS = int(os.getenv("OSRM_TABLE_MAX_COORDS", "100"))
+# Table chunks in flight at once (each holds one pooled connection).
+OSRM_TABLE_CONCURRENCY = int(os.getenv("OSRM_TABLE_CONCURRENCY", "4"))
+
+LatLon = Tuple[float, float]
+Matrix = List[List[Optional[float]]]
+
+
+def _chunk_sizes(n_src: int, n_dst: int, max_coords: int) -> Tuple[int, int]:
+    """
+    Block shape (sources, destinations) with src + dst <= max_coords.
+    Keeps all destinations in one block when they fit in half the budget
+    (the usual case: many ambulances, few hospitals).
+    """
+    max_coords = max(2, max_coords)
+    if n_src + n_dst <= max_coords:
+        return n_src, n_dst
+    if n_dst <= max_coords // 2:
+        return max_coords - n_dst, n_dst
+    if n_src <= max_coords // 2:
+        return n_src, max_coords - n_src
+    half = max_coords // 2
+    return half, max_coords - half
+
+
+async def table_matrix(
+    sources: Sequence[LatLon],
+    destinations: Sequence[LatLon],
+    *,
+    max_coords: int = OSRM_TABLE_MAX_COORDS,
+    concurrency: int = OSRM_TABLE_CONCURRENCY,
+) -> Tuple[Matrix, Matrix]:
+    """
+    N x M (durations_s, distances_m) through OSRM's table service, split into
+    blocks that respect the server's table size limit and fetched concurrently.
+    Unreachable pairs are None. Raises OSRMError if any block fails.
+    """
+    n, m = len(sources), len(destinations)
+    durations: Matrix = [[None] * m for _ in range(n)]
+    distances: Matrix = [[None] * m for _ in range(n)]
+    if n == 0 or m == 0:
+        return durations, distances
+
+    src_step, dst_step = _chunk_sizes(n, m, max_coords)
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def block(i0: int, j0: int) -> None:
+        src = list(sources[i0:i0 + src_step])
+        dst = list(destinations[j0:j0 + dst_step])
+        async with sem:
+            data = await get_table_driving(src, dst)
+        dur = data["durations"]
+        dist = data.get("distances") or [[None] * len(dst) for _ in src]
+        for di in range(len(src)):
+            durations[i0 + di][j0:j0 + len(dst)] = dur[di]
+            distances[i0 + di][j0:j0 + len(dst)] = dist[di]
+
+    await asyncio.gather(*(block(i0, j0) for i0 in range(0, n, src_step) for j0 in range(0, m, dst_step)))
+    return durations, distances
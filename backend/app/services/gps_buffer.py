@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models import GPSPoint, Trip
+
+log = logging.getLogger(__name__)
+
+# Write-behind tuning (env overridable). Opt-in: /api/gps/update then answers
+# before the fix is committed, and points still queued are lost if the process dies.
+GPS_WRITE_BEHIND = os.getenv("GPS_WRITE_BEHIND", "0") in ("1", "true", "True")
+GPS_FLUSH_INTERVAL_MS = int(os.getenv("GPS_FLUSH_INTERVAL_MS", "250"))
+GPS_FLUSH_MAX_POINTS = int(os.getenv("GPS_FLUSH_MAX_POINTS", "500"))
+GPS_BUFFER_MAX_POINTS = int(os.getenv("GPS_BUFFER_MAX_POINTS", "20000"))
+GPS_BUFFER_PUT_TIMEOUT_SEC = float(os.getenv("GPS_BUFFER_PUT_TIMEOUT_SEC", "0.5"))
+# Failed flushes of a batch before it is split up to find the rows the DB rejects
+GPS_FLUSH_MAX_RETRIES = int(os.getenv("GPS_FLUSH_MAX_RETRIES", "3"))
+
+# Errors caused by the rows themselves (constraint / bad value), as opposed to
+# the DB being unreachable: only these can be isolated and dead-lettered.
+_ROW_ERRORS = (IntegrityError, DataError)
+
+
+class GPSBufferFull(RuntimeError):
+    pass
+
+
+class GPSWriteBuffer:
+    """
+    In-process write-behind queue for gps_points.
+
+    - put() appends a fix to its trip queue and returns immediately
+    - a background thread drains all queues in one bulk INSERT (+ one bulk
+      UPDATE of trips.updated_at) every flush_interval_ms, or as soon as
+      flush_max_points are pending
+    - the buffer is bounded: put() waits up to put_timeout_sec for room and
+      then raises GPSBufferFull (callers should answer 503 so devices retry)
+    - a batch the DB keeps rejecting (IntegrityError / DataError, max_retries
+      flushes in a row) is bisected; rows that fail on their own are dropped to
+      the dead-letter log so one bad row cannot block the queue. Any other
+      error (DB unreachable) keeps the batch queued.
+    - stop() drains everything that is still pending
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        flush_interval_ms: int = GPS_FLUSH_INTERVAL_MS,
+        flush_max_points: int = GPS_FLUSH_MAX_POINTS,
+        max_points: int = GPS_BUFFER_MAX_POINTS,
+        put_timeout_sec: float = GPS_BUFFER_PUT_TIMEOUT_SEC,
+        max_retries: int = GPS_FLUSH_MAX_RETRIES,
+    ) -> None:
+        self._session_factory = session_factory
+        self.flush_interval_sec = max(1, flush_interval_ms) / 1000.0
+        self.flush_max_points = max(1, flush_max_points)
+        self.max_points = max(self.flush_max_points, max_points)
+        self.put_timeout_sec = put_timeout_sec
+        self.max_retries = max(1, max_retries)
+
+        self._queues: Dict[str, List[Dict[str, Any]]] = {}
+        self._touched: Dict[str, datetime] = {}
+        # pending + in-flight points (space is released only once a flush is committed)
+        self._size = 0
+
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self._flushed_points = 0
+        self._flushes = 0
+        self._rejected_full = 0
+        self._flush_errors = 0
+        self._failed_attempts = 0  # consecutive flushes with rows the DB rejected
+        self._dead_lettered = 0
+        self._last_flush_ms = 0.0
+
+    # ---- lifecycle ----
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="gps-write-behind", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout_sec: float = 10.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout_sec)
+        self._thread = None
+        # Anything left (thread never started / join timed out) is written here.
+        self.flush()
+
+    # ---- ingest ----
+    def put(self, trip_id: str, lat: float, lon: float, speed_mps: Optional[float], recorded_at: datetime,
+            updated_at: datetime) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+
+        deadline = time.monotonic() + self.put_timeout_sec
+        with self._cond:
+            while self._size >= self.max_points:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._rejected_full += 1
+                    raise GPSBufferFull("gps_buffer_full")
+                self._cond.wait(remaining)
+
+            self._queues.setdefault(trip_id, []).append(
+                {
+                    "trip_id": trip_id,
+                    "lat": lat,
+                    "lon": lon,
+                    "speed_mps": speed_mps,
+                    "recorded_at": recorded_at,
+                }
+            )
+            self._touched[trip_id] = updated_at
+            self._size += 1
+            if self._size >= self.flush_max_points:
+                self._cond.notify_all()
+
+    # ---- flush ----
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and self._pending() < self.flush_max_points:
+                    self._cond.wait(self.flush_interval_sec)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def _pending(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def flush(self) -> int:
+        """
+        Drain all queued points into the DB in one transaction.
+        On failure the points are put back at the front of their queues, and the
+        caller backs off for flush_interval_ms (outside the flush lock). When the
+        DB keeps rejecting rows (IntegrityError / DataError, max_retries flushes in
+        a row) the batch is bisected instead; other errors (connection lost,
+        DB down) never drop points.
+        """
+        with self._flush_lock:
+            written, failed = self._flush_batch()
+        if failed:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopping, timeout=self.flush_interval_sec)
+        return written
+
+    def _flush_batch(self) -> Tuple[int, bool]:
+        """Returns (points written, whether anything was put back)."""
+        with self._cond:
+            if not self._queues:
+                return 0, False
+            queues, self._queues = self._queues, {}
+            touched, self._touched = self._touched, {}
+
+        rows = [row for q in queues.values() for row in q]
+        t0 = time.perf_counter()
+        dead: List[Dict[str, Any]] = []
+        left: List[Dict[str, Any]] = []
+        try:
+            self._write(rows, touched)
+        except Exception as e:
+            with self._cond:
+                self._flush_errors += 1
+                self._failed_attempts = self._failed_attempts + 1 if isinstance(e, _ROW_ERRORS) else 0
+                bisect = self._failed_attempts >= self.max_retries
+                if bisect:
+                    self._failed_attempts = 0
+            if not bisect:
+                log.exception("gps write-behind flush failed; %d points re-queued", len(rows))
+                self._requeue(rows, touched)
+                return 0, True
+            dead, left = self._isolate(rows, touched)
+            self._dead_letter(dead)
+            if left:
+                self._requeue(left, touched)
+
+        written = len(rows) - len(dead) - len(left)
+        with self._cond:
+            if not left:
+                self._failed_attempts = 0
+            self._size -= len(rows) - len(left)
+            self._flushed_points += written
+            self._flushes += 1
+            self._last_flush_ms = (time.perf_counter() - t0) * 1000.0
+            self._cond.notify_all()
+        return written, bool(left)
+
+    def _write(self, rows: List[Dict[str, Any]], touched: Dict[str, datetime]) -> None:
+        db = self._session_factory()
+        try:
+            db.execute(insert(GPSPoint), rows)
+            if touched:
+                db.execute(update(Trip), [{"trip_id": tid, "updated_at": ts} for tid, ts in touched.items()])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _isolate(
+        self, rows: List[Dict[str, Any]], touched: Dict[str, datetime]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Writes rows in halves until every row the DB rejects is on its own.
+        Returns (rejected rows, rows left unwritten because of a non-row error).
+        """
+        dead: List[Dict[str, Any]] = []
+        stack = [rows]
+        while stack:
+            chunk = stack.pop()
+            try:
+                self._write(chunk, {r["trip_id"]: touched[r["trip_id"]] for r in chunk if r["trip_id"] in touched})
+            except _ROW_ERRORS:
+                if len(chunk) == 1:
+                    dead.extend(chunk)
+                else:
+                    mid = len(chunk) // 2
+                    stack.append(chunk[mid:])
+                    stack.append(chunk[:mid])
+            except Exception:
+                log.exception("gps write-behind flush failed while isolating rejected points")
+                return dead, chunk + [r for c in reversed(stack) for r in c]
+        return dead, []
+
+    def _dead_letter(self, rows: List[Dict[str, Any]]) -> None:
+        with self._cond:
+            self._dead_lettered += len(rows)
+        for row in rows:
+            log.error("gps write-behind dropped a point the DB rejects: %r", row)
+
+    def _requeue(self, rows: List[Dict[str, Any]], touched: Dict[str, datetime]) -> None:
+        queues: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            queues.setdefault(row["trip_id"], []).append(row)
+        with self._cond:
+            for tid, q in queues.items():
+                self._queues[tid] = q + self._queues.get(tid, [])
+                if tid in touched:
+                    self._touched.setdefault(tid, touched[tid])
+
+    # ---- observability ----
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "enabled": GPS_WRITE_BEHIND,
+                "pending_points": self._pending(),
+                "buffered_points": self._size,
+                "max_points": self.max_points,
+                "flushes": self._flushes,
+                "flushed_points": self._flushed_points,
+                "flush_errors": self._flush_errors,
+                "dead_lettered": self._dead_lettered,
+                "rejected_full": self._rejected_full,
+                "last_flush_ms": round(self._last_flush_ms, 3),
+            }
+
+
+gps_buffer = GPSWriteBuffer(SessionLocal)
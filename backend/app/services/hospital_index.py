@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.db import models
+
+HOSPITAL_INDEX_CELL_KM = float(os.getenv("HOSPITAL_INDEX_CELL_KM", "5"))
+# Hospitals change rarely; the index is rebuilt from the table after this long.
+HOSPITAL_INDEX_TTL_SEC = float(os.getenv("HOSPITAL_INDEX_TTL_SEC", "300"))
+# Rings walked before falling back to a full vectorized scan (sparse areas / far queries).
+HOSPITAL_INDEX_MAX_RINGS = int(os.getenv("HOSPITAL_INDEX_MAX_RINGS", "8"))
+
+_EARTH_R_M = 6371000.0
+
+
+def haversine_m_np(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """geo.haversine_m from one point to many, vectorized."""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlambda = np.radians(lons - lon)
+    a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * _EARTH_R_M * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class HospitalIndex:
+    """
+    In-memory grid index over the Hospital table (lat/lon cells of ~cell_km).
+
+    nearest() walks rings of cells outward from the query cell until it has k
+    hospitals and the next ring cannot contain anything closer; distances are
+    computed in one numpy call per ring. After max_rings it just scans every
+    hospital in one numpy call.
+    """
+
+    def __init__(
+        self,
+        *,
+        cell_km: float = HOSPITAL_INDEX_CELL_KM,
+        ttl_sec: float = HOSPITAL_INDEX_TTL_SEC,
+        max_rings: int = HOSPITAL_INDEX_MAX_RINGS,
+    ) -> None:
+        self.cell_deg = cell_km / 111.32
+        self.cell_m = cell_km * 1000.0
+        self.ttl_sec = ttl_sec
+        self.max_rings = max(0, max_rings)
+
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.lats = np.empty(0)
+        self.lons = np.empty(0)
+        self._cells: Dict[Tuple[int, int], np.ndarray] = {}
+        self._pos: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+        self.loads = 0
+        self.queries = 0
+        self.full_scans = 0
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        # Plain degree cells: longitudes shrink with latitude, which only makes
+        # cells narrower (the ring bound below stays conservative).
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def load(self, db: Session) -> None:
+        rows = db.query(models.Hospital.id, models.Hospital.name, models.Hospital.lat, models.Hospital.lon).all()
+
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, r in enumerate(rows):
+            cells.setdefault(self._cell(r.lat, r.lon), []).append(i)
+
+        with self._lock:
+            self.ids = [r.id for r in rows]
+            self.names = [r.name for r in rows]
+            self.lats = np.array([r.lat for r in rows], dtype=float)
+            self.lons = np.array([r.lon for r in rows], dtype=float)
+            self._cells = {c: np.array(ix, dtype=np.intp) for c, ix in cells.items()}
+            self._pos = {r.id: i for i, r in enumerate(rows)}
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_sec
+
+    def ensure_loaded(self, db: Session) -> None:
+        if self.is_stale():
+            self.load(db)
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def get(self, hospital_id: str) -> Optional[Tuple[str, float, float]]:
+        """(name, lat, lon) or None."""
+        with self._lock:
+            i = self._pos.get(hospital_id)
+            if i is None:
+                return None
+            return self.names[i], float(self.lats[i]), float(self.lons[i])
+
+    @staticmethod
+    def _ring(cells: Dict[Tuple[int, int], np.ndarray], cy: int, cx: int, r: int) -> List[np.ndarray]:
+        if r == 0:
+            hit = cells.get((cy, cx))
+            return [hit] if hit is not None else []
+        out = []
+        for dx in range(-r, r + 1):
+            for dy in (-r, r):
+                hit = cells.get((cy + dy, cx + dx))
+                if hit is not None:
+                    out.append(hit)
+        for dy in range(-r + 1, r):
+            for dx in (-r, r):
+                hit = cells.get((cy + dy, cx + dx))
+                if hit is not None:
+                    out.append(hit)
+        return out
+
+    def nearest(self, lat: float, lon: float, k: int) -> List[Tuple[str, str, float, float, float]]:
+        """
+        Up to k (hospital_id, name, lat, lon, straight-line metres), closest first.
+        """
+        self.queries += 1
+        with self._lock:
+            ids, names, lats, lons, cells = self.ids, self.names, self.lats, self.lons, self._cells
+        n = len(lats)
+        if n == 0 or k <= 0:
+            return []
+
+        cy, cx = self._cell(lat, lon)
+        cos_lat = max(0.01, math.cos(math.radians(lat)))
+        idx_parts: List[np.ndarray] = []
+        dist_parts: List[np.ndarray] = []
+        have = 0
+        done = False
+        for r in range(self.max_rings + 1):
+            found = self._ring(cells, cy, cx, r)
+            if found:
+                ix = np.concatenate(found)
+                idx_parts.append(ix)
+                dist_parts.append(haversine_m_np(lat, lon, lats[ix], lons[ix]))
+                have += len(ix)
+            if have == n:
+                done = True
+                break
+            if have >= k:
+                # Anything in ring r+1 is at least r cells (longitude-shrunk) away.
+                kth = np.partition(np.concatenate(dist_parts), k - 1)[k - 1]
+                if kth <= r * self.cell_m * cos_lat:
+                    done = True
+                    break
+
+        if done:
+            ix = np.concatenate(idx_parts)
+            d = np.concatenate(dist_parts)
+        else:
+            self.full_scans += 1
+            ix = np.arange(n)
+            d = haversine_m_np(lat, lon, lats, lons)
+
+        order = np.argsort(d, kind="stable")[:k]
+        out = []
+        for o in order:
+            i = int(ix[o])
+            out.append((ids[i], names[i], float(lats[i]), float(lons[i]), float(d[o])))
+        return out
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "hospitals": len(self.ids),
+            "cells": len(self._cells),
+            "cell_km": round(self.cell_m / 1000.0, 3),
+            "loads": self.loads,
+            "queries": self.queries,
+            "full_scans": self.full_scans,
+            "stale": self.is_stale(),
+        }
+
+
+hospital_index = HospitalIndex()
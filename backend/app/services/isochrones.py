@@ -0,0 +1,353 @@
+"""
+Precomputed travel-time-to-hospital grids ("isochrones") for instant baseline ETAs.
+
+Offline job (run from backend/):
+    python -m app.services.isochrones --bbox 12.80,77.40,13.15,77.80 --cell-m 500 \\
+        [--source osrm|offline] [--bucket 7-11:1.35 --bucket 17-21:1.4] [--out data/isochrones]
+
+Layout of ISOCHRONE_DIR:
+    meta.json          grid (bbox, cell_m, rows, cols), time buckets, hospital -> file
+    <hospital_id>.npy  float32 [n_buckets, rows, cols], seconds from cell centre; NaN = no route
+Files are memory-mapped by the lookup side, so a lookup is index math + one read.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ISOCHRONE_DIR = os.getenv("ISOCHRONE_DIR", "data/isochrones")
+# How often lookups check meta.json for a newer build.
+ISOCHRONE_RELOAD_CHECK_SEC = float(os.getenv("ISOCHRONE_RELOAD_CHECK_SEC", "30"))
+
+METERS_PER_DEG_LAT = 111_320.0
+
+# (start_hour, end_hour, factor): the bucket's grid is the free-flow grid x factor.
+Bucket = Tuple[int, int, float]
+DEFAULT_BUCKETS: List[Bucket] = [(0, 24, 1.0)]
+
+
+@dataclass
+class GridSpec:
+    min_lat: float
+    min_lon: float
+    max_lat: float
+    max_lon: float
+    cell_m: float
+
+    @property
+    def dlat(self) -> float:
+        return self.cell_m / METERS_PER_DEG_LAT
+
+    @property
+    def dlon(self) -> float:
+        mid = math.radians((self.min_lat + self.max_lat) / 2.0)
+        return self.dlat / max(0.01, math.cos(mid))
+
+    @property
+    def rows(self) -> int:
+        return max(1, int(math.ceil((self.max_lat - self.min_lat) / self.dlat)))
+
+    @property
+    def cols(self) -> int:
+        return max(1, int(math.ceil((self.max_lon - self.min_lon) / self.dlon)))
+
+    def cell_centres(self) -> Tuple[np.ndarray, np.ndarray]:
+        r, c = np.divmod(np.arange(self.rows * self.cols), self.cols)
+        return self.min_lat + (r + 0.5) * self.dlat, self.min_lon + (c + 0.5) * self.dlon
+
+    def cell_of(self, lat: float, lon: float) -> Optional[Tuple[int, int]]:
+        r = int((lat - self.min_lat) / self.dlat)
+        c = int((lon - self.min_lon) / self.dlon)
+        if lat < self.min_lat or lon < self.min_lon or r >= self.rows or c >= self.cols:
+            return None
+        return r, c
+
+
+def _safe_name(hospital_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", hospital_id)
+
+
+def _bucket_index(buckets: Sequence[Bucket], when: datetime) -> int:
+    h = when.hour + when.minute / 60.0
+    for i, (start, end, _) in enumerate(buckets):
+        if start <= h < end:
+            return i
+    return 0
+
+
+# ---- lookup ----
+class IsochroneStore:
+    """
+    Read side: memory-maps the per-hospital grids on first use and answers
+    baseline_eta() with no I/O beyond touching one page.
+    """
+
+    def __init__(self, base_dir: str = ISOCHRONE_DIR) -> None:
+        self.base_dir = Path(base_dir)
+        self._grid: Optional[GridSpec] = None
+        self._buckets: List[Bucket] = []
+        self._files: Dict[str, str] = {}
+        self._maps: Dict[str, np.ndarray] = {}
+        self._meta_mtime: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+
+    def _refresh(self) -> None:
+        meta_path = self.base_dir / "meta.json"
+        try:
+            mtime = meta_path.stat().st_mtime
+        except OSError:
+            self._grid = None
+            return
+        if mtime == self._meta_mtime:
+            return
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        with self._lock:
+            self._grid = GridSpec(**meta["grid"])
+            self._buckets = [tuple(b) for b in meta["buckets"]]
+            self._files = dict(meta["hospitals"])
+            self._maps = {}
+            self._meta_mtime = mtime
+
+    def _maybe_refresh(self) -> None:
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at > ISOCHRONE_RELOAD_CHECK_SEC:
+            self._checked_at = now
+            self._refresh()
+
+    def reload(self) -> None:
+        self._meta_mtime = None
+        self._checked_at = time.monotonic()
+        self._refresh()
+
+    def _map(self, hospital_id: str) -> Optional[np.ndarray]:
+        arr = self._maps.get(hospital_id)
+        if arr is None:
+            name = self._files.get(hospital_id)
+            if name is None:
+                return None
+            arr = np.load(self.base_dir / name, mmap_mode="r").view(np.ndarray)
+            self._maps[hospital_id] = arr
+        return arr
+
+    def has(self, hospital_id: str) -> bool:
+        self._maybe_refresh()
+        return hospital_id in self._files
+
+    def baseline_eta(self, hospital_id: str, lat: float, lon: float, when: Optional[datetime] = None) -> Optional[float]:
+        """
+        Seconds to hospital_id from the grid cell containing (lat, lon), for the
+        time-of-day bucket of `when` (default now). None if not precomputed,
+        outside the grid, or unreachable.
+        """
+        self.lookups += 1
+        self._maybe_refresh()
+        grid = self._grid
+        if grid is None:
+            return None
+        cell = grid.cell_of(lat, lon)
+        if cell is None:
+            return None
+        arr = self._map(hospital_id)
+        if arr is None:
+            return None
+
+        b = _bucket_index(self._buckets, when or datetime.now())
+        v = float(arr[b, cell[0], cell[1]])
+        if math.isnan(v):
+            return None
+        self.hits += 1
+        return v
+
+    def bucket_label(self, when: Optional[datetime] = None) -> Optional[str]:
+        if not self._buckets:
+            return None
+        start, end, _ = self._buckets[_bucket_index(self._buckets, when or datetime.now())]
+        return f"{start:02d}-{end:02d}"
+
+    def stats(self) -> Dict[str, Any]:
+        grid = self._grid
+        return {
+            "dir": str(self.base_dir),
+            "loaded": grid is not None,
+            "hospitals": len(self._files),
+            "grid": f"{grid.rows}x{grid.cols}@{grid.cell_m:g}m" if grid else None,
+            "buckets": len(self._buckets),
+            "lookups": self.lookups,
+            "hits": self.hits,
+        }
+
+
+isochrone_store = IsochroneStore()
+
+
+# ---- offline job ----
+async def _grid_times_osrm(grid: GridSpec, hospitals: Sequence[Tuple[str, float, float]]) -> np.ndarray:
+    from .eta_matrix import table_matrix
+
+    lats, lons = grid.cell_centres()
+    durations, _ = await table_matrix(list(zip(lats.tolist(), lons.tolist())), [(h[1], h[2]) for h in hospitals])
+    out = np.array([[np.nan if v is None else v for v in row] for row in durations], dtype=np.float32)
+    return out.T.reshape(len(hospitals), grid.rows, grid.cols)
+
+
+def _grid_times_offline(grid: GridSpec, hospitals: Sequence[Tuple[str, float, float]]) -> np.ndarray:
+    from .offline_router import OFFLINE_SNAP_SPEED_MPS, OfflineRouteError, offline_router
+
+    if not offline_router.available:
+        raise SystemExit("offline source needs OFFLINE_GRAPH_DIR pointing at a road graph")
+
+    lats, lons = grid.cell_centres()
+    cell_nodes = np.full(len(lats), -1, dtype=np.int64)
+    cell_snap_s = np.zeros(len(lats))
+    for i, (la, lo) in enumerate(zip(lats.tolist(), lons.tolist())):
+        try:
+            node, snap_m = offline_router.snap(la, lo)
+        except OfflineRouteError:
+            continue
+        cell_nodes[i] = node
+        cell_snap_s[i] = snap_m / OFFLINE_SNAP_SPEED_MPS
+
+    snapped = cell_nodes >= 0
+    out = np.full((len(hospitals), len(lats)), np.nan, dtype=np.float32)
+    for k, (_, h_lat, h_lon) in enumerate(hospitals):
+        try:
+            target, target_snap_m = offline_router.snap(h_lat, h_lon)
+        except OfflineRouteError:
+            continue
+        # One reverse Dijkstra per hospital covers every cell.
+        to_target = offline_router.times_to(target)
+        t = np.full(len(lats), np.inf)
+        t[snapped] = to_target[cell_nodes[snapped]] + cell_snap_s[snapped] + target_snap_m / OFFLINE_SNAP_SPEED_MPS
+        t[~np.isfinite(t)] = np.nan
+        out[k] = t
+    return out.reshape(len(hospitals), grid.rows, grid.cols)
+
+
+def write_isochrones(
+    out_dir: str,
+    grid: GridSpec,
+    buckets: Sequence[Bucket],
+    hospital_ids: Sequence[str],
+    free_flow: np.ndarray,
+) -> None:
+    """free_flow: [n_hospitals, rows, cols] seconds."""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    factors = np.array([b[2] for b in buckets], dtype=np.float32)[:, None, None]
+
+    files = {}
+    for k, hid in enumerate(hospital_ids):
+        name = f"{_safe_name(hid)}.npy"
+        # New inode + rename: a running server's maps of the old file stay valid.
+        tmp = out / f"{name}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, (free_flow[k][None, :, :] * factors).astype(np.float32))
+        tmp.replace(out / name)
+        files[hid] = name
+
+    meta = {
+        "grid": {
+            "min_lat": grid.min_lat,
+            "min_lon": grid.min_lon,
+            "max_lat": grid.max_lat,
+            "max_lon": grid.max_lon,
+            "cell_m": grid.cell_m,
+        },
+        "rows": grid.rows,
+        "cols": grid.cols,
+        "buckets": [list(b) for b in buckets],
+        "hospitals": files,
+        "built_at": datetime.utcnow().isoformat(),
+    }
+    # meta.json last: readers only see a new build once every grid is on disk.
+    tmp = out / "meta.json.tmp"
+    tmp.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    tmp.replace(out / "meta.json")
+
+
+def _parse_bucket(spec: str) -> Bucket:
+    # "7-11" or "7-11:1.35"
+    hours, _, factor = spec.partition(":")
+    start, end = (int(x) for x in hours.split("-"))
+    if not (0 <= start < end <= 24):
+        raise argparse.ArgumentTypeError(f"bad bucket hours: {spec}")
+    return start, end, float(factor) if factor else 1.0
+
+
+def _fill_buckets(specs: Sequence[Bucket]) -> List[Bucket]:
+    """Sort and fill uncovered hours with factor-1.0 buckets."""
+    out: List[Bucket] = []
+    h = 0
+    for start, end, f in sorted(specs):
+        if start < h:
+            raise SystemExit(f"overlapping buckets at {start}h")
+        if start > h:
+            out.append((h, start, 1.0))
+        out.append((start, end, f))
+        h = end
+    if h < 24:
+        out.append((h, 24, 1.0))
+    return out
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    p = argparse.ArgumentParser(description="Precompute hospital travel-time grids")
+    p.add_argument("--bbox", required=True, help="min_lat,min_lon,max_lat,max_lon")
+    p.add_argument("--cell-m", type=float, default=500.0)
+    p.add_argument("--source", choices=("osrm", "offline"), default="osrm")
+    p.add_argument("--bucket", type=_parse_bucket, action="append", default=[], help="START-END[:FACTOR], repeatable")
+    p.add_argument("--out", default=ISOCHRONE_DIR)
+    args = p.parse_args(argv)
+
+    min_lat, min_lon, max_lat, max_lon = (float(x) for x in args.bbox.split(","))
+    grid = GridSpec(min_lat, min_lon, max_lat, max_lon, args.cell_m)
+    buckets = _fill_buckets(args.bucket) if args.bucket else list(DEFAULT_BUCKETS)
+
+    from app.db import models
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        hospitals = [(h.id, h.lat, h.lon) for h in db.query(models.Hospital).order_by(models.Hospital.id).all()]
+    if not hospitals:
+        raise SystemExit("no hospitals in the Hospital table")
+
+    t0 = time.perf_counter()
+    if args.source == "osrm":
+        from .osrm_service import osrm_client
+
+        async def run():
+            try:
+                return await _grid_times_osrm(grid, hospitals)
+            finally:
+                await osrm_client.close()
+
+        free_flow = asyncio.run(run())
+    else:
+        free_flow = _grid_times_offline(grid, hospitals)
+
+    write_isochrones(args.out, grid, buckets, [h[0] for h in hospitals], free_flow)
+    print(
+        f"{len(hospitals)} hospitals x {grid.rows}x{grid.cols} cells x {len(buckets)} buckets "
+        f"-> {args.out} in {time.perf_counter() - t0:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import math
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.interval_tree import IntervalTree, Key
+from .geo import haversine_m
+
+# Junction windows of different trips closer than this are treated as the same intersection.
+JUNCTION_MATCH_RADIUS_M = float(os.getenv("JUNCTION_MATCH_RADIUS_M", "40"))
+
+Cell = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class JunctionClaim:
+    trip_id: str
+    index: int  # CorridorJunctionOut.index
+    lat: float
+    lon: float
+    start: float  # window, epoch seconds
+    end: float
+    priority: str = "medium"
+
+
+@dataclass(frozen=True)
+class JunctionConflict:
+    index: int  # junction of the trip asked about
+    other_trip_id: str
+    other_index: int
+    distance_m: float
+    overlap_start: float  # epoch seconds
+    overlap_end: float
+
+
+class JunctionConflictIndex:
+    """
+    Every active corridor's junction windows, shared across trips.
+
+    Claims live in plain degree cells of ~radius_m (as in hospital_index), one
+    interval tree of time windows per cell. claims() looks at the cells the
+    match radius touches, asks each tree for overlapping windows and keeps those
+    within radius_m; a trip's claims are replaced wholesale on every re-plan.
+    """
+
+    def __init__(self, *, radius_m: float = JUNCTION_MATCH_RADIUS_M) -> None:
+        self.radius_m = radius_m
+        self.cell_deg = radius_m / 111_320.0
+        self._cells: Dict[Cell, IntervalTree] = {}
+        self._by_trip: Dict[str, List[Tuple[Cell, Key, JunctionClaim]]] = {}
+        self._lock = threading.Lock()
+
+        self.replaces = 0
+        self.queries = 0
+        self.conflicts_flagged = 0
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def _cells_near(self, lat: float, lon: float) -> List[Cell]:
+        # Longitude degrees per metre grow with latitude, so the radius can span
+        # more than one cell east-west.
+        dlat = self.radius_m / 111_320.0
+        dlon = dlat / max(0.01, math.cos(math.radians(lat)))
+        r0, r1 = self._cell(lat - dlat, lon)[0], self._cell(lat + dlat, lon)[0]
+        c0, c1 = self._cell(lat, lon - dlon)[1], self._cell(lat, lon + dlon)[1]
+        return [(r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+
+    def _remove_locked(self, trip_id: str) -> None:
+        for cell, key, _ in self._by_trip.pop(trip_id, ()):
+            tree = self._cells.get(cell)
+            if tree is not None:
+                tree.remove(key)
+                if not len(tree):
+                    del self._cells[cell]
+
+    def _claims_locked(
+        self, lat: float, lon: float, t1: float, t2: float, exclude_trip: Optional[str]
+    ) -> List[Tuple[JunctionClaim, float]]:
+        out = []
+        for cell in self._cells_near(lat, lon):
+            tree = self._cells.get(cell)
+            if tree is None:
+                continue
+            for _, _, claim in tree.overlap(t1, t2):
+                if claim.trip_id == exclude_trip:
+                    continue
+                d = haversine_m(lat, lon, claim.lat, claim.lon)
+                if d <= self.radius_m:
+                    out.append((claim, d))
+        return out
+
+    def _conflicts_locked(self, trip_id: str) -> List[JunctionConflict]:
+        conflicts = []
+        for _, _, own in self._by_trip.get(trip_id, ()):
+            for other, d in self._claims_locked(own.lat, own.lon, own.start, own.end, trip_id):
+                conflicts.append(
+                    JunctionConflict(
+                        index=own.index,
+                        other_trip_id=other.trip_id,
+                        other_index=other.index,
+                        distance_m=round(d, 1),
+                        overlap_start=max(own.start, other.start),
+                        overlap_end=min(own.end, other.end),
+                    )
+                )
+        return conflicts
+
+    def replace(self, trip_id: str, claims: List[JunctionClaim]) -> List[JunctionConflict]:
+        """
+        Sets the trip's junction windows (dropping its previous ones) and returns
+        where they overlap other trips' windows at the same intersection.
+        """
+        with self._lock:
+            self._remove_locked(trip_id)
+            entries = []
+            for c in claims:
+                cell = self._cell(c.lat, c.lon)
+                tree = self._cells.get(cell)
+                if tree is None:
+                    tree = self._cells[cell] = IntervalTree()
+                entries.append((cell, tree.insert(c.start, c.end, c), c))
+            if entries:
+                self._by_trip[trip_id] = entries
+            self.replaces += 1
+            conflicts = self._conflicts_locked(trip_id)
+            self.conflicts_flagged += len(conflicts)
+            return conflicts
+
+    def remove(self, trip_id: str) -> None:
+        with self._lock:
+            self._remove_locked(trip_id)
+
+    def claims(
+        self, lat: float, lon: float, t1: float, t2: float, *, exclude_trip: Optional[str] = None
+    ) -> List[Tuple[JunctionClaim, float]]:
+        """(claim, distance_m) for every trip window at this junction overlapping [t1, t2]."""
+        with self._lock:
+            self.queries += 1
+            out = self._claims_locked(lat, lon, t1, t2, exclude_trip)
+        out.sort(key=lambda x: x[0].start)
+        return out
+
+    def conflicts(self, trip_id: str) -> List[JunctionConflict]:
+        with self._lock:
+            return self._conflicts_locked(trip_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "trips": len(self._by_trip),
+            "windows": sum(len(t) for t in self._cells.values()),
+            "cells": len(self._cells),
+            "radius_m": self.radius_m,
+            "replaces": self.replaces,
+            "queries": self.queries,
+            "conflicts_flagged": self.conflicts_flagged,
+        }
+
+
+junction_index = JunctionConflictIndex()
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models import GPSPoint, Trip, TripStatus
+
+LATEST_CACHE_MAX_TRIPS = int(os.getenv("LATEST_CACHE_MAX_TRIPS", "10000"))
+
+
+@dataclass
+class LatestState:
+    trip_id: str
+    lat: float
+    lon: float
+    speed_mps: float
+    recorded_at: datetime
+    status: Optional[str] = None
+
+
+class LatestStateCache:
+    """
+    Process-wide "where is this ambulance right now" cache, keyed by trip_id.
+
+    - written on every GPS ingest (so it is ahead of the write-behind buffer)
+    - warmed from the DB at startup for active trips
+    - misses fall back to one DB lookup and populate the entry
+    Bounded LRU so finished trips eventually fall out.
+
+    One cache per process, so it is only authoritative with a single worker.
+    With several workers (REALTIME_BROKER_URL set) a worker hears about fixes
+    ingested elsewhere only through trip-changed events, i.e. for trips it has
+    snapshot subscribers for; its other entries (read by /route, dashboards,
+    hospital lists) can lag the DB. Without a broker, run one worker.
+    """
+
+    def __init__(self, max_trips: int = LATEST_CACHE_MAX_TRIPS) -> None:
+        self.max_trips = max(1, max_trips)
+        self._items: "OrderedDict[str, LatestState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db_loads = 0
+
+    def update(
+        self,
+        trip_id: str,
+        lat: float,
+        lon: float,
+        speed_mps: Optional[float],
+        recorded_at: datetime,
+        status: Optional[str] = None,
+    ) -> LatestState:
+        """Returns the trip's entry after the update. recorded_at is kept as naive UTC."""
+        if recorded_at.tzinfo is not None:
+            recorded_at = recorded_at.astimezone(timezone.utc).replace(tzinfo=None)
+        with self._lock:
+            cur = self._items.get(trip_id)
+            if cur is not None and cur.recorded_at > recorded_at:
+                # Late (out-of-order) fix: position stays, status still moves forward.
+                if status is not None:
+                    cur.status = status
+                self._items.move_to_end(trip_id)
+                return cur
+            st = self._items[trip_id] = LatestState(
+                trip_id=trip_id,
+                lat=float(lat),
+                lon=float(lon),
+                speed_mps=float(speed_mps or 0.0),
+                recorded_at=recorded_at,
+                status=status if status is not None else (cur.status if cur else None),
+            )
+            self._items.move_to_end(trip_id)
+            while len(self._items) > self.max_trips:
+                self._items.popitem(last=False)
+            return st
+
+    def set_status(self, trip_id: str, status: str) -> None:
+        with self._lock:
+            cur = self._items.get(trip_id)
+            if cur is not None:
+                cur.status = status
+
+    def evict(self, trip_id: str) -> None:
+        with self._lock:
+            self._items.pop(trip_id, None)
+
+    def get(self, trip_id: str) -> Optional[LatestState]:
+        with self._lock:
+            st = self._items.get(trip_id)
+            if st is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._items.move_to_end(trip_id)
+            return st
+
+    def get_or_load(self, db: Session, trip_id: str) -> Optional[LatestState]:
+        st = self.get(trip_id)
+        if st is not None:
+            return st
+
+        self.db_loads += 1
+        row = db.execute(
+            select(GPSPoint.lat, GPSPoint.lon, GPSPoint.speed_mps, GPSPoint.recorded_at, Trip.status)
+            .join(Trip, Trip.trip_id == GPSPoint.trip_id)
+            .where(GPSPoint.trip_id == trip_id)
+            .order_by(GPSPoint.recorded_at.desc())
+            .limit(1)
+        ).first()
+        if row is None:
+            return None
+
+        self.update(trip_id, row.lat, row.lon, row.speed_mps, row.recorded_at, _status_value(row.status))
+        with self._lock:
+            return self._items.get(trip_id)
+
+    def warm(self, db: Session) -> int:
+        """
+        Rebuild from the DB: latest fix of every active trip in one query.
+        """
+        ranked = (
+            select(
+                GPSPoint.trip_id,
+                GPSPoint.lat,
+                GPSPoint.lon,
+                GPSPoint.speed_mps,
+                GPSPoint.recorded_at,
+                func.row_number()
+                .over(partition_by=GPSPoint.trip_id, order_by=GPSPoint.recorded_at.desc())
+                .label("rn"),
+            )
+            .join(Trip, Trip.trip_id == GPSPoint.trip_id)
+            .where(Trip.status.in_([TripStatus.EN_ROUTE, TripStatus.NEAR_ARRIVAL]))
+            .subquery()
+        )
+        rows = db.execute(
+            select(ranked, Trip.status)
+            .join(Trip, Trip.trip_id == ranked.c.trip_id)
+            .where(ranked.c.rn == 1)
+        ).all()
+
+        for r in rows:
+            self.update(r.trip_id, r.lat, r.lon, r.speed_mps, r.recorded_at, _status_value(r.status))
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "max_trips": self.max_trips,
+                "hits": self.hits,
+                "misses": self.misses,
+                "db_loads": self.db_loads,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def _status_value(status: Any) -> Optional[str]:
+    if status is None:
+        return None
+    return status.value if isinstance(status, TripStatus) else str(status)
+
+
+latest_cache = LatestStateCache()
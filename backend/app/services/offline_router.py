@@ -0,0 +1,317 @@
+"""
+Offline fallback router on a local road graph, used when OSRM is unreachable.
+
+Graph directory (OFFLINE_GRAPH_DIR), one .npy per array, memory-mapped on load:
+    node_lat.npy, node_lon.npy    float, one entry per node
+    indptr.npy                    int, CSR row pointer (n_nodes + 1)
+    indices.npy                   int, edge target node (CSR order)
+    edge_length_m.npy             float, per edge
+    edge_time_s.npy               float, per edge (free-flow travel time)
+Build one with save_graph().
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .geo import haversine_m
+
+OFFLINE_GRAPH_DIR = os.getenv("OFFLINE_GRAPH_DIR", "")
+OFFLINE_MAX_SNAP_M = float(os.getenv("OFFLINE_MAX_SNAP_M", "2000"))
+# Speed assumed for the straight legs between the query points and the graph.
+OFFLINE_SNAP_SPEED_MPS = float(os.getenv("OFFLINE_SNAP_SPEED_MPS", "5"))
+OFFLINE_SNAP_CELL_M = float(os.getenv("OFFLINE_SNAP_CELL_M", "500"))
+
+_M_PER_DEG = math.pi * 6371000.0 / 180.0
+
+GRAPH_FILES = ("node_lat", "node_lon", "indptr", "indices", "edge_length_m", "edge_time_s")
+
+
+class OfflineRouteError(RuntimeError):
+    pass
+
+
+def save_graph(
+    path: str,
+    node_lat: np.ndarray,
+    node_lon: np.ndarray,
+    edge_src: np.ndarray,
+    edge_dst: np.ndarray,
+    edge_length_m: np.ndarray,
+    edge_time_s: np.ndarray,
+) -> None:
+    """
+    Write a directed edge list as the CSR .npy files OfflineRouter loads.
+    Add both directions for two-way roads.
+    """
+    n = len(node_lat)
+    order = np.argsort(edge_src, kind="stable")
+    counts = np.bincount(np.asarray(edge_src)[order], minlength=n)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+
+    out = Path(path)
+    out.mkdir(parents=True, exist_ok=True)
+    np.save(out / "node_lat.npy", np.asarray(node_lat, dtype=np.float64))
+    np.save(out / "node_lon.npy", np.asarray(node_lon, dtype=np.float64))
+    np.save(out / "indptr.npy", indptr)
+    np.save(out / "indices.npy", np.asarray(edge_dst)[order].astype(np.int32 if n < 2**31 else np.int64))
+    np.save(out / "edge_length_m.npy", np.asarray(edge_length_m, dtype=np.float32)[order])
+    np.save(out / "edge_time_s.npy", np.asarray(edge_time_s, dtype=np.float32)[order])
+
+
+class OfflineRouter:
+    """
+    A* over a memory-mapped CSR road graph, minimising travel time.
+    The heuristic is straight-line distance at the graph's top edge speed, so
+    it never overestimates and routes are optimal for the stored edge times.
+
+    route_driving() returns the same dict shape as osrm_service.get_route_driving.
+    """
+
+    def __init__(self, graph_dir: str = OFFLINE_GRAPH_DIR, *, max_snap_m: float = OFFLINE_MAX_SNAP_M) -> None:
+        self.graph_dir = graph_dir
+        self.max_snap_m = max_snap_m
+        self._loaded = False
+        self._load_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+        self.queries = 0
+        self.failures = 0
+        self.query_ms_total = 0.0
+        self.expanded_total = 0
+
+    # ---- loading ----
+    def load(self) -> None:
+        base = Path(self.graph_dir)
+        # Plain ndarray views of the maps: same pages, without np.memmap's per-index Python overhead.
+        arrays = {name: np.load(base / f"{name}.npy", mmap_mode="r").view(np.ndarray) for name in GRAPH_FILES}
+
+        self.node_lat = arrays["node_lat"]
+        self.node_lon = arrays["node_lon"]
+        self.indptr = arrays["indptr"]
+        self.indices = arrays["indices"]
+        self.edge_length_m = arrays["edge_length_m"]
+        self.edge_time_s = arrays["edge_time_s"]
+        self.n_nodes = len(self.node_lat)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            speeds = np.asarray(self.edge_length_m, dtype=np.float64) / np.asarray(self.edge_time_s, dtype=np.float64)
+        speeds = speeds[np.isfinite(speeds)]
+        self.max_speed_mps = float(speeds.max()) if len(speeds) else 1.0
+
+        # Snap index: node ids sorted by grid cell; a cell's nodes are one searchsorted range.
+        self._cell_deg = OFFLINE_SNAP_CELL_M / _M_PER_DEG
+        keys = self._cell_keys(np.asarray(self.node_lat), np.asarray(self.node_lon))
+        self._snap_order = np.argsort(keys, kind="stable")
+        self._snap_keys = keys[self._snap_order]
+        self._loaded = True
+
+    @property
+    def available(self) -> bool:
+        if self._loaded:
+            return True
+        if not self.graph_dir or self._load_error is not None:
+            return False
+        with self._lock:
+            if not self._loaded and self._load_error is None:
+                try:
+                    self.load()
+                except (OSError, ValueError, KeyError) as e:
+                    self._load_error = str(e)
+        return self._loaded
+
+    # ---- snapping ----
+    _KEY_STRIDE = 1 << 32
+
+    def _cell_keys(self, lat, lon):
+        cy = np.floor(np.asarray(lat) / self._cell_deg).astype(np.int64)
+        cx = np.floor(np.asarray(lon) / self._cell_deg).astype(np.int64)
+        return cy * self._KEY_STRIDE + cx
+
+    def snap(self, lat: float, lon: float) -> Tuple[int, float]:
+        """Nearest graph node within max_snap_m: (node id, metres)."""
+        cy = math.floor(lat / self._cell_deg)
+        cx = math.floor(lon / self._cell_deg)
+        cos_lat = max(0.01, math.cos(math.radians(lat)))
+        rings = int(math.ceil(self.max_snap_m / (OFFLINE_SNAP_CELL_M * cos_lat))) + 1
+
+        best_node, best_d = -1, float("inf")
+        for r in range(rings + 1):
+            if best_node >= 0 and best_d <= (r - 1) * OFFLINE_SNAP_CELL_M * cos_lat:
+                break
+            for dy in range(-r, r + 1):
+                for dx in range(-r, r + 1):
+                    if max(abs(dy), abs(dx)) != r:
+                        continue
+                    key = (cy + dy) * self._KEY_STRIDE + (cx + dx)
+                    lo = np.searchsorted(self._snap_keys, key, side="left")
+                    hi = np.searchsorted(self._snap_keys, key, side="right")
+                    for node in self._snap_order[lo:hi].tolist():
+                        d = haversine_m(lat, lon, float(self.node_lat[node]), float(self.node_lon[node]))
+                        if d < best_d:
+                            best_node, best_d = node, d
+
+        if best_node < 0 or best_d > self.max_snap_m:
+            raise OfflineRouteError(f"No road graph node within {self.max_snap_m:.0f} m of ({lat}, {lon})")
+        return best_node, best_d
+
+    # ---- search ----
+    def shortest_path(self, source: int, target: int) -> Tuple[List[int], float, float, int]:
+        """
+        A* on edge time. Returns (node path, length_m, time_s, nodes expanded).
+        """
+        node_lat, node_lon = self.node_lat, self.node_lon
+        indptr, indices = self.indptr, self.indices
+        edge_len, edge_time = self.edge_length_m, self.edge_time_s
+
+        t_lat = float(node_lat[target])
+        t_lon = float(node_lon[target])
+        kx = _M_PER_DEG * math.cos(math.radians(t_lat))
+        # Equirectangular straight line, shaved slightly so it stays below haversine.
+        h_scale = 0.995 / self.max_speed_mps
+
+        def h(n: int) -> float:
+            dx = (float(node_lon[n]) - t_lon) * kx
+            dy = (float(node_lat[n]) - t_lat) * _M_PER_DEG
+            return math.sqrt(dx * dx + dy * dy) * h_scale
+
+        g: Dict[int, float] = {source: 0.0}
+        dist: Dict[int, float] = {source: 0.0}
+        parent: Dict[int, int] = {source: -1}
+        closed = set()
+        heap = [(h(source), source)]
+        expanded = 0
+
+        while heap:
+            _, u = heapq.heappop(heap)
+            if u in closed:
+                continue
+            if u == target:
+                break
+            closed.add(u)
+            expanded += 1
+
+            gu = g[u]
+            du = dist[u]
+            a, b = int(indptr[u]), int(indptr[u + 1])
+            for v, t, ln in zip(indices[a:b].tolist(), edge_time[a:b].tolist(), edge_len[a:b].tolist()):
+                if v in closed:
+                    continue
+                gv = gu + t
+                if gv < g.get(v, math.inf):
+                    g[v] = gv
+                    dist[v] = du + ln
+                    parent[v] = u
+                    heapq.heappush(heap, (gv + h(v), v))
+        else:
+            raise OfflineRouteError("No path in road graph")
+
+        path = []
+        n = target
+        while n != -1:
+            path.append(n)
+            n = parent[n]
+        path.reverse()
+        return path, dist[target], g[target], expanded
+
+    def times_to(self, target: int) -> np.ndarray:
+        """
+        Travel time (s) from every node to target: one Dijkstra over reversed edges.
+        inf where the target is unreachable. For batch jobs (isochrones).
+        """
+        if getattr(self, "_rev", None) is None:
+            n_edges = len(self.indices)
+            src = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr))
+            order = np.argsort(self.indices, kind="stable")
+            rev_indptr = np.zeros(self.n_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=self.n_nodes), out=rev_indptr[1:])
+            self._rev = (rev_indptr, src[order], np.asarray(self.edge_time_s)[order]) if n_edges else None
+        if self._rev is None:
+            out = np.full(self.n_nodes, np.inf)
+            out[target] = 0.0
+            return out
+
+        rev_indptr, rev_src, rev_time = self._rev
+        best = [math.inf] * self.n_nodes
+        best[target] = 0.0
+        heap = [(0.0, target)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > best[u]:
+                continue
+            a, b = int(rev_indptr[u]), int(rev_indptr[u + 1])
+            for v, t in zip(rev_src[a:b].tolist(), rev_time[a:b].tolist()):
+                nd = d + t
+                if nd < best[v]:
+                    best[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return np.array(best)
+
+    def route_driving(self, start_lat: float, start_lon: float, end_lat: float, end_lon: float) -> Dict[str, Any]:
+        """
+        Same shape as get_route_driving (routes[0].distance / duration / GeoJSON geometry),
+        plus "fallback": "offline". Sync and CPU-bound: call it from the threadpool.
+        """
+        if not self.available:
+            raise OfflineRouteError(f"Offline road graph not available: {self._load_error or 'OFFLINE_GRAPH_DIR not set'}")
+
+        t0 = time.perf_counter()
+        self.queries += 1
+        try:
+            src, src_snap_m = self.snap(start_lat, start_lon)
+            dst, dst_snap_m = self.snap(end_lat, end_lon)
+            path, length_m, time_s, expanded = self.shortest_path(src, dst)
+        except OfflineRouteError:
+            self.failures += 1
+            raise
+        finally:
+            self.query_ms_total += (time.perf_counter() - t0) * 1000.0
+        self.expanded_total += expanded
+
+        coords = [[start_lon, start_lat]]
+        coords += [[float(self.node_lon[n]), float(self.node_lat[n])] for n in path]
+        coords.append([end_lon, end_lat])
+        snap_m = src_snap_m + dst_snap_m
+        distance = length_m + snap_m
+        duration = time_s + snap_m / OFFLINE_SNAP_SPEED_MPS
+
+        return {
+            "code": "Ok",
+            "fallback": "offline",
+            "routes": [
+                {
+                    "distance": distance,
+                    "duration": duration,
+                    "geometry": {"type": "LineString", "coordinates": coords},
+                    "legs": [{"distance": distance, "duration": duration, "steps": []}],
+                }
+            ],
+            "waypoints": [
+                {"location": coords[1], "distance": src_snap_m},
+                {"location": coords[-2], "distance": dst_snap_m},
+            ],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "graph_dir": self.graph_dir,
+            "loaded": self._loaded,
+            "load_error": self._load_error,
+            "nodes": self.n_nodes if self._loaded else 0,
+            "queries": self.queries,
+            "failures": self.failures,
+            "avg_query_ms": round(self.query_ms_total / self.queries, 3) if self.queries else 0.0,
+            "avg_expanded": round(self.expanded_total / self.queries, 1) if self.queries else 0.0,
+        }
+
+
+offline_router = OfflineRouter()
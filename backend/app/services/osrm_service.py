@@ -1,47 +1,319 @@
+import asyncio
 import os
-import requests
-from typing import Any, Dict
+import random
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
 
 DEFAULT_OSRM_BASE_URL = os.getenv("OSRM_BASE_URL", "http://localhost:5000")
 
+# Connection pool (keep-alive)
+OSRM_MAX_CONNECTIONS = int(os.getenv("OSRM_MAX_CONNECTIONS", "20"))
+OSRM_MAX_KEEPALIVE = int(os.getenv("OSRM_MAX_KEEPALIVE", "10"))
+OSRM_KEEPALIVE_EXPIRY_SEC = float(os.getenv("OSRM_KEEPALIVE_EXPIRY_SEC", "30"))
+
+# Deadlines / retries
+OSRM_TIMEOUT_SEC = float(os.getenv("OSRM_TIMEOUT_SEC", "3.5"))  # whole call, retries included
+OSRM_CONNECT_TIMEOUT_SEC = float(os.getenv("OSRM_CONNECT_TIMEOUT_SEC", "1.0"))
+OSRM_RETRIES = int(os.getenv("OSRM_RETRIES", "2"))
+OSRM_RETRY_BACKOFF_MS = float(os.getenv("OSRM_RETRY_BACKOFF_MS", "100"))
+
+# Circuit breaker
+OSRM_BREAKER_THRESHOLD = int(os.getenv("OSRM_BREAKER_THRESHOLD", "5"))
+OSRM_BREAKER_COOLDOWN_SEC = float(os.getenv("OSRM_BREAKER_COOLDOWN_SEC", "10"))
+
 
 class OSRMError(RuntimeError):
     pass
 
 
-def get_route_driving(
+class OSRMUnavailable(OSRMError):
+    """Circuit is open: OSRM failed repeatedly, calls fail fast until the cooldown ends."""
+
+
+class _Retryable(OSRMError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures;
+    open -> half_open after `cooldown_sec` (one probe call allowed);
+    half_open -> closed on success, back to open on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int = OSRM_BREAKER_THRESHOLD, cooldown_sec: float = OSRM_BREAKER_COOLDOWN_SEC) -> None:
+        self.threshold = max(1, threshold)
+        self.cooldown_sec = cooldown_sec
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown_sec:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """The half-open probe ended without an answer (cancelled): let the next call probe."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            if self.state != self.OPEN:
+                self.opens += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "rejected": self.rejected,
+        }
+
+
+class OSRMClient:
+    """
+    Async OSRM client over one pooled httpx.AsyncClient (keep-alive, so
+    consecutive /route calls reuse TCP connections).
+
+    Every call has a single deadline covering all attempts. Transport errors,
+    timeouts and 5xx/429 are retried with jittered exponential backoff;
+    OSRM-level answers (NoRoute, 4xx) are not. A circuit breaker makes calls
+    fail fast while OSRM is down.
+
+    The pool is created lazily on the running loop; call close() on shutdown.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_OSRM_BASE_URL,
+        *,
+        max_connections: int = OSRM_MAX_CONNECTIONS,
+        max_keepalive: int = OSRM_MAX_KEEPALIVE,
+        keepalive_expiry_sec: float = OSRM_KEEPALIVE_EXPIRY_SEC,
+        timeout_sec: float = OSRM_TIMEOUT_SEC,
+        connect_timeout_sec: float = OSRM_CONNECT_TIMEOUT_SEC,
+        retries: int = OSRM_RETRIES,
+        retry_backoff_ms: float = OSRM_RETRY_BACKOFF_MS,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry_sec,
+        )
+        self.timeout_sec = timeout_sec
+        self.connect_timeout_sec = connect_timeout_sec
+        self.retries = max(0, retries)
+        self.retry_backoff_ms = retry_backoff_ms
+        self.breaker = breaker or CircuitBreaker()
+
+        self._client: Optional[httpx.AsyncClient] = None
+
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+        self.latency_ms_total = 0.0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=self.limits,
+                timeout=httpx.Timeout(self.timeout_sec, connect=self.connect_timeout_sec),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _attempt(self, path: str, params: Dict[str, Any], timeout_sec: float) -> Dict[str, Any]:
+        client = self._get_client()
+        try:
+            resp = await client.get(path, params=params, timeout=httpx.Timeout(timeout_sec, connect=min(timeout_sec, self.connect_timeout_sec)))
+        except httpx.HTTPError as e:
+            raise _Retryable(f"OSRM request failed: {e!r}") from e
+
+        if resp.status_code >= 500 or resp.status_code == 429:
+            raise _Retryable(f"OSRM returned HTTP {resp.status_code}: {resp.text}")
+
+        # OSRM answers 400 with a JSON body for NoRoute / InvalidQuery etc.
+        try:
+            data = resp.json()
+        except ValueError as e:
+            raise OSRMError(f"OSRM returned HTTP {resp.status_code}: {resp.text}") from e
+        if resp.status_code != 200 or data.get("code") != "Ok":
+            raise OSRMError(f"OSRM bad response: {data}")
+        return data
+
+    async def get(self, path: str, params: Dict[str, Any], *, timeout_sec: Optional[float] = None) -> Dict[str, Any]:
+        """
+        GET {base_url}{path}; returns the parsed body when OSRM says code == "Ok".
+        Raises OSRMUnavailable (circuit open) or OSRMError.
+        """
+        if not self.breaker.allow():
+            raise OSRMUnavailable("OSRM circuit open; failing fast")
+
+        deadline = time.monotonic() + (timeout_sec if timeout_sec is not None else self.timeout_sec)
+        t0 = time.perf_counter()
+        self.requests += 1
+        attempt = 0
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise _Retryable("OSRM deadline exceeded")
+                try:
+                    data = await self._attempt(path, params, remaining)
+                except _Retryable:
+                    if attempt >= self.retries:
+                        raise
+                    delay = (self.retry_backoff_ms / 1000.0) * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    if time.monotonic() + delay >= deadline:
+                        raise
+                    attempt += 1
+                    self.retried += 1
+                    await asyncio.sleep(delay)
+                    continue
+                self.breaker.record_success()
+                return data
+        except _Retryable as e:
+            # Only infrastructure failures count against the breaker.
+            self.failures += 1
+            self.breaker.record_failure()
+            raise OSRMError(str(e)) from None
+        except OSRMError:
+            self.failures += 1
+            self.breaker.record_success()
+            raise
+        except asyncio.CancelledError:
+            # Caller went away (e.g. client disconnected): no verdict on OSRM.
+            self.breaker.release_probe()
+            raise
+        except BaseException:
+            self.failures += 1
+            self.breaker.record_failure()
+            raise
+        finally:
+            self.latency_ms_total += (time.perf_counter() - t0) * 1000.0
+
+    async def route_driving(
+        self,
+        start_lat: float,
+        start_lon: float,
+        end_lat: float,
+        end_lon: float,
+        *,
+        timeout_sec: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        /route/v1/driving/{lon1},{lat1};{lon2},{lat2}?overview=full&geometries=geojson&steps=true&annotations=duration
+        """
+        data = await self.get(
+            f"/route/v1/driving/{start_lon},{start_lat};{end_lon},{end_lat}",
+            {"overview": "full", "geometries": "geojson", "steps": "true", "annotations": "duration"},
+            timeout_sec=timeout_sec,
+        )
+        if not data.get("routes"):
+            raise OSRMError(f"OSRM bad response: {data}")
+        return data
+
+    async def table_driving(
+        self,
+        sources: Sequence[Tuple[float, float]],
+        destinations: Sequence[Tuple[float, float]],
+        *,
+        timeout_sec: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        /table/v1/driving/{coords}?sources=..&destinations=..&annotations=duration,distance
+        sources / destinations are (lat, lon). Returns the OSRM body with
+        durations[i][j] (s) and distances[i][j] (m); unreachable pairs are null.
+        """
+        coords = ";".join(f"{lon},{lat}" for lat, lon in list(sources) + list(destinations))
+        n = len(sources)
+        data = await self.get(
+            f"/table/v1/driving/{coords}",
+            {
+                "sources": ";".join(str(i) for i in range(n)),
+                "destinations": ";".join(str(n + j) for j in range(len(destinations))),
+                "annotations": "duration,distance",
+            },
+            timeout_sec=timeout_sec,
+        )
+        if "durations" not in data:
+            raise OSRMError(f"OSRM bad response: {data}")
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self.limits
+        return {
+            "base_url": self.base_url,
+            "requests": self.requests,
+            "retried": self.retried,
+            "failures": self.failures,
+            "avg_latency_ms": round(self.latency_ms_total / self.requests, 3) if self.requests else 0.0,
+            "max_connections": pool.max_connections,
+            "max_keepalive": pool.max_keepalive_connections,
+            "breaker": self.breaker.stats(),
+        }
+
+
+osrm_client = OSRMClient()
+
+
+async def get_route_driving(
     start_lat: float,
     start_lon: float,
     end_lat: float,
     end_lon: float,
     *,
-    timeout_sec: float = 3.5,
+    timeout_sec: Optional[float] = None,
 ) -> Dict[str, Any]:
     """
     Calls OSRM:
-    /route/v1/driving/{lon1},{lat1};{lon2},{lat2}?overview=full&geometries=geojson&steps=true
+    /route/v1/driving/{lon1},{lat1};{lon2},{lat2}?overview=full&geometries=geojson&steps=true&annotations=duration
+    Returns parsed OSRM JSON dict, or raises OSRMError.
+    """
+    return await osrm_client.route_driving(start_lat, start_lon, end_lat, end_lon, timeout_sec=timeout_sec)
+
+
+async def get_table_driving(
+    sources: List[Tuple[float, float]],
+    destinations: List[Tuple[float, float]],
+    *,
+    timeout_sec: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Calls OSRM /table/v1/driving for sources x destinations ((lat, lon) pairs).
     Returns parsed OSRM JSON dict, or raises OSRMError.
     """
-    url = (
-        f"{DEFAULT_OSRM_BASE_URL}/route/v1/driving/"
-        f"{start_lon},{start_lat};{end_lon},{end_lat}"
-    )
-    params = {
-        "overview": "full",
-        "geometries": "geojson",
-        "steps": "true",
-    }
-
-    try:
-        resp = requests.get(url, params=params, timeout=timeout_sec)
-    except requests.RequestException as e:
-        raise OSRMError(f"OSRM request failed: {e}") from e
-
-    if resp.status_code != 200:
-        raise OSRMError(f"OSRM returned HTTP {resp.status_code}: {resp.text}")
-
-    data = resp.json()
-    if data.get("code") != "Ok" or not data.get("routes"):
-        raise OSRMError(f"OSRM bad response: {data}")
-
-    return data
+    return await osrm_client.table_driving(sources, destinations, timeout_sec=timeout_sec)
@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Literal, Optional, Protocol, Tuple
+
+import httpx
+
+from ..realtime.publish import publish_preemption_event
+from .junction_conflicts import JunctionClaim
+
+log = logging.getLogger(__name__)
+
+# Outbound signal-controller hook (JSON POST per event); unset = WebSocket + in-memory only.
+PREEMPTION_SINK_URL = os.getenv("PREEMPTION_SINK_URL", "")
+PREEMPTION_SINK_TIMEOUT_SEC = float(os.getenv("PREEMPTION_SINK_TIMEOUT_SEC", "2"))
+PREEMPTION_SINK_CONCURRENCY = int(os.getenv("PREEMPTION_SINK_CONCURRENCY", "8"))
+PREEMPTION_RECENT_EVENTS = int(os.getenv("PREEMPTION_RECENT_EVENTS", "1000"))
+
+EventKind = Literal["activate", "release"]
+# (fire_at epoch s, seq, trip generation, trip_id, junction index, kind)
+_Timer = Tuple[float, int, int, str, int, str]
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class PreemptionSink(Protocol):
+    """Outbound target for pre-emption events. emit() runs on the event loop and must not block."""
+
+    def emit(self, event: Dict[str, Any]) -> None: ...
+
+
+class MemorySink:
+    """Keeps the last maxlen events (GET /api/preemption/events; local stand-in for a controller)."""
+
+    def __init__(self, maxlen: int = PREEMPTION_RECENT_EVENTS) -> None:
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=max(1, maxlen))
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        self.events.append(event)
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        return list(self.events)[-limit:]
+
+
+class HttpSink:
+    """
+    POSTs each event to url. Fire-and-forget with bounded concurrency and no
+    retries: a late activation is worse than a missing one.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        timeout_sec: float = PREEMPTION_SINK_TIMEOUT_SEC,
+        concurrency: int = PREEMPTION_SINK_CONCURRENCY,
+    ) -> None:
+        self.url = url
+        self.timeout_sec = timeout_sec
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._concurrency = max(1, concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        self.sent = 0
+        self.errors = 0
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        asyncio.get_running_loop().create_task(self._post(event))
+
+    async def _post(self, event: Dict[str, Any]) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout_sec)
+            self._sem = asyncio.Semaphore(self._concurrency)
+        async with self._sem:
+            try:
+                r = await self._client.post(self.url, json=event)
+                r.raise_for_status()
+                self.sent += 1
+            except httpx.HTTPError as e:
+                self.errors += 1
+                log.warning("Pre-emption sink %s failed: %s", self.url, e)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+@dataclass
+class _Window:
+    claim: JunctionClaim
+    active: bool = False
+
+
+class PreemptionScheduler:
+    """
+    Fires "activate" at each corridor junction's window start and "release" at its
+    end, to /ws/preemption subscribers and every registered sink.
+
+    One heap of timers for all trips; a single loop.call_at handle is armed for
+    the earliest one. replace() re-plans a trip by bumping its generation (its old
+    timers become stale and are skipped when popped) and pushing the new ones:
+    O(k log n) for k junctions, whatever the number of pending timers. The heap
+    is rebuilt once stale entries outnumber live ones.
+
+    Junctions already active when their window moves keep their state if the new
+    window still covers now, otherwise they are released immediately; junctions
+    dropped from the plan (passed, trip arrived) are released.
+    """
+
+    def __init__(self, sinks: Optional[List[PreemptionSink]] = None, *, compact_min: int = 1024) -> None:
+        self.recent = MemorySink()
+        self.sinks: List[PreemptionSink] = [self.recent] + list(sinks or [])
+        self.compact_min = compact_min
+
+        self._heap: List[_Timer] = []
+        self._seq = itertools.count()
+        self._gens = itertools.count(1)  # never reused, so old timers of a re-added trip stay stale
+        self._gen: Dict[str, int] = {}
+        self._windows: Dict[str, Dict[int, _Window]] = {}
+        self._pending: Dict[str, int] = {}
+        self._stale = 0
+        self._lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._armed_at: Optional[float] = None  # epoch of the armed timer
+
+        self.fired: Dict[str, int] = {"activate": 0, "release": 0}
+        self.reschedules = 0
+        self.compactions = 0
+        self.sink_errors = 0
+        self.lateness_ms_max = 0.0
+        self._lateness_ms_sum = 0.0
+        self._lateness_n = 0
+
+    # -- lifecycle (event loop thread) --
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._arm()
+
+    async def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._loop = None
+        for sink in self.sinks:
+            close = getattr(sink, "close", None)
+            if close is not None:
+                await close()
+
+    def add_sink(self, sink: PreemptionSink) -> None:
+        self.sinks.append(sink)
+
+    # -- scheduling (any thread) --
+
+    def replace(self, trip_id: str, claims: List[JunctionClaim]) -> None:
+        """Sets the trip's junction windows (epoch seconds), superseding the previous ones."""
+        now = time.time()
+        events: List[Dict[str, Any]] = []
+        with self._lock:
+            old = self._windows.pop(trip_id, {})
+            self._stale += self._pending.pop(trip_id, 0)
+            gen = self._gen[trip_id] = next(self._gens)
+            if old:
+                self.reschedules += 1
+
+            windows: Dict[int, _Window] = {}
+            pushed = 0
+            for c in claims:
+                prev = old.pop(c.index, None)
+                active = prev is not None and prev.active
+                if c.end <= now:
+                    if active:
+                        events.append(self._event("release", c, now, "rescheduled"))
+                    continue
+                if active and c.start > now:
+                    events.append(self._event("release", c, now, "rescheduled"))
+                    active = False
+                windows[c.index] = _Window(c, active)
+                if not active:
+                    heapq.heappush(self._heap, (max(c.start, now), next(self._seq), gen, trip_id, c.index, "activate"))
+                    pushed += 1
+                heapq.heappush(self._heap, (c.end, next(self._seq), gen, trip_id, c.index, "release"))
+                pushed += 1
+
+            for prev in old.values():
+                if prev.active:
+                    events.append(self._event("release", prev.claim, now, "cancelled"))
+
+            if windows:
+                self._windows[trip_id] = windows
+                self._pending[trip_id] = pushed
+            else:
+                self._gen.pop(trip_id, None)
+            self._maybe_compact()
+            rearm = bool(self._heap) and (self._armed_at is None or self._heap[0][0] < self._armed_at)
+
+        self._hand_over(events, rearm)
+
+    def remove(self, trip_id: str) -> None:
+        """Trip finished: releases its active junctions and drops its timers."""
+        self.replace(trip_id, [])
+
+    def pending(self, trip_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            trips = [trip_id] if trip_id is not None else list(self._windows)
+            return [
+                {
+                    "trip_id": w.claim.trip_id,
+                    "junction_index": w.claim.index,
+                    "lat": w.claim.lat,
+                    "lon": w.claim.lon,
+                    "priority": w.claim.priority,
+                    "window_start": _iso(w.claim.start),
+                    "window_end": _iso(w.claim.end),
+                    "active": w.active,
+                }
+                for t in trips
+                for w in self._windows.get(t, {}).values()
+            ]
+
+    # -- internals --
+
+    @staticmethod
+    def _event(kind: EventKind, c: JunctionClaim, at: float, reason: str) -> Dict[str, Any]:
+        return {
+            "type": "preemption",
+            "event": kind,
+            "reason": reason,  # window | rescheduled | cancelled
+            "trip_id": c.trip_id,
+            "junction_index": c.index,
+            "lat": c.lat,
+            "lon": c.lon,
+            "priority": c.priority,
+            "window_start": _iso(c.start),
+            "window_end": _iso(c.end),
+            "at": _iso(at),
+        }
+
+    def _maybe_compact(self) -> None:
+        if self._stale > self.compact_min and self._stale > len(self._heap) // 2:
+            self._heap = [t for t in self._heap if self._gen.get(t[3]) == t[2]]
+            heapq.heapify(self._heap)
+            self._stale = 0
+            self.compactions += 1
+
+    def _hand_over(self, events: List[Dict[str, Any]], rearm: bool) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            # Not started (or shut down): timers wait in the heap; events only reach memory.
+            for e in events:
+                self.recent.emit(e)
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._emit(events)
+            if rearm:
+                self._arm()
+        else:
+            loop.call_soon_threadsafe(self._emit_and_arm, events, rearm)
+
+    def _emit_and_arm(self, events: List[Dict[str, Any]], rearm: bool) -> None:
+        self._emit(events)
+        if rearm:
+            self._arm()
+
+    def _emit(self, events: List[Dict[str, Any]]) -> None:
+        for e in events:
+            publish_preemption_event(e)
+            for sink in self.sinks:
+                try:
+                    sink.emit(e)
+                except Exception:
+                    self.sink_errors += 1
+                    log.exception("Pre-emption sink %r failed", sink)
+
+    def _arm(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        loop = self._loop
+        if loop is None:
+            return
+        with self._lock:
+            if not self._heap:
+                self._armed_at = None
+                return
+            when = self._heap[0][0]
+            self._armed_at = when
+        self._handle = loop.call_at(loop.time() + max(0.0, when - time.time()), self._fire_due)
+
+    def _fire_due(self) -> None:
+        self._handle = None
+        now = time.time()
+        events: List[Dict[str, Any]] = []
+        with self._lock:
+            self._armed_at = None
+            while self._heap and self._heap[0][0] <= now:
+                when, _, gen, trip_id, index, kind = heapq.heappop(self._heap)
+                if self._gen.get(trip_id) != gen:
+                    self._stale -= 1
+                    continue
+                self._pending[trip_id] -= 1
+                windows = self._windows[trip_id]
+                w = windows.get(index)
+                if w is None:
+                    continue
+                if kind == "activate" and not w.active:
+                    w.active = True
+                elif kind == "release" and w.active:
+                    w.active = False
+                    del windows[index]
+                else:
+                    continue
+                late_ms = (now - when) * 1000.0
+                self.lateness_ms_max = max(self.lateness_ms_max, late_ms)
+                self._lateness_ms_sum += late_ms
+                self._lateness_n += 1
+                self.fired[kind] += 1
+                events.append(self._event(kind, w.claim, now, "window"))
+
+                if not windows:
+                    del self._windows[trip_id]
+                    self._pending.pop(trip_id, None)
+                    self._gen.pop(trip_id, None)
+        self._emit(events)
+        self._arm()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "trips": len(self._windows),
+            "pending_timers": len(self._heap) - self._stale,
+            "heap_size": len(self._heap),
+            "stale_timers": self._stale,
+            "fired": dict(self.fired),
+            "reschedules": self.reschedules,
+            "compactions": self.compactions,
+            "sink_errors": self.sink_errors,
+            "lateness_ms_avg": round(self._lateness_ms_sum / self._lateness_n, 3) if self._lateness_n else 0.0,
+            "lateness_ms_max": round(self.lateness_ms_max, 3),
+        }
+
+
+preemption_scheduler = PreemptionScheduler([HttpSink(PREEMPTION_SINK_URL)] if PREEMPTION_SINK_URL else None)
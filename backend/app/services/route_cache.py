@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..utils.route_utils import (
+    RouteStep,
+    RouteType,
+    classify_route_type,
+    segment_durations_from_osrm_route,
+    steps_from_osrm_route,
+)
+from .offline_router import OfflineRouteError, offline_router
+from .osrm_service import OSRMError, get_route_driving
+
+ROUTE_CACHE_MAX_ENTRIES = int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "5000"))
+ROUTE_CACHE_TTL_SEC = float(os.getenv("ROUTE_CACHE_TTL_SEC", "120"))
+# Offline-router answers are kept briefly so traffic goes back to OSRM once it recovers.
+ROUTE_CACHE_FALLBACK_TTL_SEC = float(os.getenv("ROUTE_CACHE_FALLBACK_TTL_SEC", "15"))
+ROUTE_CACHE_CELL_M = float(os.getenv("ROUTE_CACHE_CELL_M", "150"))
+# 0 disables the time-of-day component of the key.
+ROUTE_CACHE_TOD_BUCKET_MIN = int(os.getenv("ROUTE_CACHE_TOD_BUCKET_MIN", "0"))
+
+METERS_PER_DEG_LAT = 111_320.0
+
+# (lat cell, lon cell, hospital_id, time-of-day bucket)
+RouteKey = Tuple[int, int, str, int]
+
+
+@dataclass
+class CachedRoute:
+    distance_m: float
+    duration_s: float
+    geometry: Dict[str, Any]  # GeoJSON LineString
+    route_type: RouteType
+    fetched_at: float  # time.monotonic()
+    source: str = "osrm"  # "osrm" | "offline"
+    steps: Tuple[RouteStep, ...] = ()  # OSRM maneuvers (none from the offline router)
+    segment_durations: Tuple[float, ...] = ()  # OSRM seconds per geometry segment (annotations)
+
+
+class RouteCache:
+    """
+    OSRM route cache in front of get_route_driving.
+
+    Origin is snapped to a ~cell_m grid, so an ambulance that moved a few
+    metres since the last call to the same hospital reuses the route instead of
+    hitting OSRM. Entries expire after ttl_sec; bounded LRU.
+    Concurrent misses on the same key share one OSRM call.
+    When OSRM fails and an offline road graph is configured, the miss is
+    answered by the offline router instead (short TTL).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = ROUTE_CACHE_MAX_ENTRIES,
+        ttl_sec: float = ROUTE_CACHE_TTL_SEC,
+        fallback_ttl_sec: float = ROUTE_CACHE_FALLBACK_TTL_SEC,
+        cell_m: float = ROUTE_CACHE_CELL_M,
+        tod_bucket_min: int = ROUTE_CACHE_TOD_BUCKET_MIN,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_sec = ttl_sec
+        self.fallback_ttl_sec = fallback_ttl_sec
+        self.cell_m = cell_m
+        self.tod_bucket_min = tod_bucket_min
+        self._items: "OrderedDict[RouteKey, CachedRoute]" = OrderedDict()
+        self._inflight: Dict[RouteKey, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.coalesced = 0
+        self.fallbacks = 0
+        self.hit_ns_total = 0
+        self.miss_ns_total = 0
+
+    def key(self, lat: float, lon: float, hospital_id: str, now: Optional[datetime] = None) -> RouteKey:
+        lat_step = self.cell_m / METERS_PER_DEG_LAT
+        lat_cell = math.floor(lat / lat_step)
+        # Longitude cells use the cell row's latitude so cells stay ~square.
+        cos_lat = max(0.01, math.cos(math.radians((lat_cell + 0.5) * lat_step)))
+        lon_cell = math.floor(lon / (lat_step / cos_lat))
+
+        bucket = 0
+        if self.tod_bucket_min > 0:
+            now = now or datetime.now()
+            bucket = (now.hour * 60 + now.minute) // self.tod_bucket_min
+        return lat_cell, lon_cell, str(hospital_id), bucket
+
+    def get(self, key: RouteKey) -> Optional[CachedRoute]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.fetched_at > self.ttl_for(entry):
+                del self._items[key]
+                self.expired += 1
+                return None
+            self._items.move_to_end(key)
+            return entry
+
+    def ttl_for(self, entry: CachedRoute) -> float:
+        return self.fallback_ttl_sec if entry.source == "offline" else self.ttl_sec
+
+    def put(self, key: RouteKey, entry: CachedRoute) -> None:
+        with self._lock:
+            self._items[key] = entry
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def invalidate_hospital(self, hospital_id: str) -> int:
+        with self._lock:
+            keys = [k for k in self._items if k[2] == hospital_id]
+            for k in keys:
+                del self._items[k]
+            return len(keys)
+
+    async def get_route(
+        self,
+        start_lat: float,
+        start_lon: float,
+        hospital_id: str,
+        end_lat: float,
+        end_lon: float,
+        *,
+        refresh: bool = False,
+    ) -> CachedRoute:
+        """
+        Cached route from (start_lat, start_lon) to the hospital. Raises OSRMError on a miss
+        that OSRM cannot answer (errors are not cached). refresh=True skips the lookup
+        and replaces the entry.
+        """
+        t0 = time.perf_counter_ns()
+        key = self.key(start_lat, start_lon, hospital_id)
+
+        entry = None if refresh else self.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.hit_ns_total += time.perf_counter_ns() - t0
+            return entry
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        # The fetch is owned by the cache, not by this caller: if the caller is
+        # cancelled (client went away), coalesced waiters still get the route.
+        task = asyncio.get_running_loop().create_task(self._fetch(key, start_lat, start_lon, end_lat, end_lon))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._fetched(key, t))
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self.miss_ns_total += time.perf_counter_ns() - t0
+
+    async def _fetch(
+        self, key: RouteKey, start_lat: float, start_lon: float, end_lat: float, end_lon: float
+    ) -> CachedRoute:
+        try:
+            data = await get_route_driving(start_lat, start_lon, end_lat, end_lon)
+        except OSRMError as e:
+            if not offline_router.available:
+                raise
+            try:
+                data = await run_in_threadpool(offline_router.route_driving, start_lat, start_lon, end_lat, end_lon)
+            except OfflineRouteError as fe:
+                raise OSRMError(f"{e}; offline fallback failed: {fe}") from e
+            self.fallbacks += 1
+        route0 = data["routes"][0]
+        dist_m = float(route0["distance"])
+        dur_s = float(route0["duration"])
+        entry = CachedRoute(
+            distance_m=dist_m,
+            duration_s=dur_s,
+            geometry=route0["geometry"],
+            route_type=classify_route_type(dist_m / 1000.0, dur_s),
+            fetched_at=time.monotonic(),
+            source="offline" if data.get("fallback") else "osrm",
+            steps=tuple(steps_from_osrm_route(route0)),
+            segment_durations=tuple(segment_durations_from_osrm_route(route0)),
+        )
+        self.put(key, entry)
+        return entry
+
+    def _fetched(self, key: RouteKey, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Callers (if any are left) re-raise it; don't warn about an unretrieved exception otherwise.
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_entries": self.max_entries,
+            "ttl_sec": self.ttl_sec,
+            "cell_m": self.cell_m,
+            "tod_bucket_min": self.tod_bucket_min,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "coalesced": self.coalesced,
+            "offline_fallbacks": self.fallbacks,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            # Every hit (and coalesced waiter) is an OSRM call that did not happen.
+            "osrm_calls_saved": self.hits + self.coalesced,
+            "avg_hit_us": round(self.hit_ns_total / self.hits / 1e3, 2) if self.hits else 0.0,
+            "avg_miss_ms": round(self.miss_ns_total / self.misses / 1e6, 3) if self.misses else 0.0,
+        }
+
+
+route_cache = RouteCache()
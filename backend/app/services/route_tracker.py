@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import bisect
+import dataclasses
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.route_utils import RouteStep, RouteType
+from ..utils.time_profile import TimeProfile
+from .geo import haversine_m
+from .route_cache import CachedRoute, route_cache
+
+OFF_ROUTE_THRESHOLD_M = float(os.getenv("OFF_ROUTE_THRESHOLD_M", "60"))
+ROUTE_TRACK_TTL_SEC = float(os.getenv("ROUTE_TRACK_TTL_SEC", "300"))
+ROUTE_TRACK_MAX_TRIPS = int(os.getenv("ROUTE_TRACK_MAX_TRIPS", "10000"))
+# Segments searched ahead of the last matched one before falling back to a full scan.
+ROUTE_TRACK_SEARCH_AHEAD = int(os.getenv("ROUTE_TRACK_SEARCH_AHEAD", "200"))
+
+_M_PER_DEG = math.pi * 6371000.0 / 180.0
+
+
+@dataclass
+class TrackedRoute:
+    hospital_id: str
+    coords: List[Tuple[float, float]]  # (lat, lon) along the route
+    cum_m: List[float]  # cum_m[i] = haversine length from coords[0] to coords[i]
+    distance_m: float  # OSRM totals (cum_m[-1] is the geometry length)
+    duration_s: float
+    route_type: RouteType
+    fetched_at: float  # time.monotonic()
+    ttl_sec: float  # shorter for offline-router fallbacks
+    seg_hint: int = 0  # last matched segment; ambulances mostly move forward
+    steps: Tuple[RouteStep, ...] = ()
+    profile: Optional[TimeProfile] = None  # OSRM time at each coords vertex
+
+
+@dataclass
+class RouteProgress:
+    distance_m: float  # remaining
+    duration_s: float  # remaining, from the time profile at the projected position
+    geometry: Dict[str, Any]  # GeoJSON LineString from the projected position
+    route_type: RouteType
+    deviation_m: float
+    progress_m: float
+    rerouted: bool
+    steps: List[RouteStep]  # maneuvers still ahead, cumulative values from the current position
+    profile: Optional[TimeProfile] = None  # rest of the route, aligned with geometry's vertices
+
+
+def _tracked_from(route: CachedRoute, hospital_id: str) -> TrackedRoute:
+    coords = [(float(lat), float(lon)) for lon, lat in route.geometry.get("coordinates") or []]
+    cum = [0.0]
+    for (a_lat, a_lon), (b_lat, b_lon) in zip(coords, coords[1:]):
+        cum.append(cum[-1] + haversine_m(a_lat, a_lon, b_lat, b_lon))
+    return TrackedRoute(
+        hospital_id=hospital_id,
+        coords=coords,
+        cum_m=cum,
+        distance_m=route.distance_m,
+        duration_s=route.duration_s,
+        route_type=route.route_type,
+        fetched_at=route.fetched_at,  # age of the cache entry, not of this lookup
+        ttl_sec=route_cache.ttl_for(route),
+        steps=route.steps,
+        profile=TimeProfile.from_segments(np.asarray(cum), route.segment_durations, route.duration_s) if coords else None,
+    )
+
+
+def remaining_steps(route: TrackedRoute, progress_m: float) -> List[RouteStep]:
+    """
+    Steps whose maneuver is still ahead, re-based to the current position. progress_m
+    (geometry metres) is scaled to OSRM's step distances; the time already spent is
+    interpolated inside the current step.
+    """
+    steps = route.steps
+    if not steps:
+        return []
+    total = route.cum_m[-1]
+    d = progress_m * route.distance_m / total if total > 0 else 0.0
+    i = max(0, bisect.bisect_right([st.cumulative_distance_m for st in steps], d) - 1)
+    cur = steps[i]
+    frac = min(1.0, (d - cur.cumulative_distance_m) / cur.distance_m) if cur.distance_m > 0 else 0.0
+    t = cur.cumulative_duration_s + frac * cur.duration_s
+    return [
+        dataclasses.replace(
+            st,
+            cumulative_distance_m=st.cumulative_distance_m - d,
+            cumulative_duration_s=max(0.0, st.cumulative_duration_s - t),
+        )
+        for st in steps[i + 1:]
+    ]
+
+
+def _project_segment(
+    lat: float, lon: float, a: Tuple[float, float], b: Tuple[float, float]
+) -> Tuple[float, float, float, float]:
+    """
+    Closest point to (lat, lon) on segment a-b in a local equirectangular frame
+    (exact enough over one road segment). Returns (t, lat, lon, squared planar metres).
+    """
+    kx = _M_PER_DEG * math.cos(math.radians(lat))
+    ax, ay = (a[1] - lon) * kx, (a[0] - lat) * _M_PER_DEG
+    bx, by = (b[1] - lon) * kx, (b[0] - lat) * _M_PER_DEG
+    dx, dy = bx - ax, by - ay
+    seg2 = dx * dx + dy * dy
+    t = 0.0 if seg2 == 0.0 else min(1.0, max(0.0, -(ax * dx + ay * dy) / seg2))
+    px, py = ax + t * dx, ay + t * dy
+    return t, a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1]), px * px + py * py
+
+
+def project_onto_route(
+    route: TrackedRoute,
+    lat: float,
+    lon: float,
+    *,
+    search_ahead: int = ROUTE_TRACK_SEARCH_AHEAD,
+    full_scan_over_m: float = OFF_ROUTE_THRESHOLD_M,
+):
+    """
+    Returns (segment index, t, projected lat, projected lon, deviation_m, progress_m).
+    Searches forward from the last matched segment first; full scan if that
+    window's best match is further than full_scan_over_m.
+    """
+    if not route.coords:
+        # No geometry to project onto: nothing driven yet, the unit is where it is.
+        return 0, 0.0, lat, lon, 0.0, 0.0
+    n_seg = len(route.coords) - 1
+    if n_seg < 1:
+        p = route.coords[0]
+        return 0, 0.0, p[0], p[1], haversine_m(lat, lon, p[0], p[1]), 0.0
+
+    def scan(lo: int, hi: int):
+        best = None
+        for i in range(lo, hi):
+            t, plat, plon, d2 = _project_segment(lat, lon, route.coords[i], route.coords[i + 1])
+            if best is None or d2 < best[4]:
+                best = (i, t, plat, plon, d2)
+        return best
+
+    lo = max(0, route.seg_hint - 2)
+    best = scan(lo, min(n_seg, lo + search_ahead))
+    if best[4] > full_scan_over_m ** 2 and (lo > 0 or lo + search_ahead < n_seg):
+        best = scan(0, n_seg)
+
+    i, t, plat, plon, _ = best
+    seg_len = route.cum_m[i + 1] - route.cum_m[i]
+    return i, t, plat, plon, haversine_m(lat, lon, plat, plon), route.cum_m[i] + t * seg_len
+
+
+class RouteTracker:
+    """
+    Keeps each trip's last OSRM route and projects new fixes onto it.
+
+    OSRM (through route_cache) is only asked again when the unit is more than
+    threshold_m off the stored polyline, the route is older than ttl_sec, or the
+    destination changed. Otherwise remaining distance / duration come from the
+    progress along the stored route.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold_m: float = OFF_ROUTE_THRESHOLD_M,
+        ttl_sec: float = ROUTE_TRACK_TTL_SEC,
+        max_trips: int = ROUTE_TRACK_MAX_TRIPS,
+    ) -> None:
+        self.threshold_m = threshold_m
+        self.ttl_sec = ttl_sec
+        self.max_trips = max(1, max_trips)
+        self._routes: "OrderedDict[str, TrackedRoute]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.on_route = 0
+        self.reroutes: Dict[str, int] = {"new": 0, "off_route": 0, "expired": 0, "destination": 0}
+
+    def evict(self, trip_id: str) -> None:
+        with self._lock:
+            self._routes.pop(trip_id, None)
+
+    def _get(self, trip_id: str) -> Optional[TrackedRoute]:
+        with self._lock:
+            route = self._routes.get(trip_id)
+            if route is not None:
+                self._routes.move_to_end(trip_id)
+            return route
+
+    def _put(self, trip_id: str, route: TrackedRoute) -> None:
+        with self._lock:
+            self._routes[trip_id] = route
+            self._routes.move_to_end(trip_id)
+            while len(self._routes) > self.max_trips:
+                self._routes.popitem(last=False)
+
+    @staticmethod
+    def _progress(route: TrackedRoute, projection, *, rerouted: bool) -> RouteProgress:
+        i, t, plat, plon, deviation_m, progress_m = projection
+        route.seg_hint = i
+
+        total = route.cum_m[-1]
+        # No geometry length to measure progress on: the OSRM totals still stand.
+        share = max(0.0, total - progress_m) / total if total > 0 else 1.0
+        coords = [[plon, plat]] + [[c[1], c[0]] for c in route.coords[i + 1:]]
+        profile = route.profile.tail(i, progress_m) if route.profile is not None else None
+        return RouteProgress(
+            distance_m=route.distance_m * share,
+            duration_s=profile.total_s if profile is not None else route.duration_s * share,
+            geometry={"type": "LineString", "coordinates": coords},
+            route_type=route.route_type,
+            deviation_m=deviation_m,
+            progress_m=progress_m,
+            rerouted=rerouted,
+            steps=remaining_steps(route, progress_m),
+            profile=profile,
+        )
+
+    async def route_for(
+        self,
+        trip_id: str,
+        lat: float,
+        lon: float,
+        hospital_id: str,
+        end_lat: float,
+        end_lon: float,
+    ) -> RouteProgress:
+        """
+        Remaining route for the trip from (lat, lon). Raises OSRMError when a re-route is
+        needed and OSRM cannot answer.
+        """
+        route = self._get(trip_id)
+        if route is None or not route.coords:
+            reason = "new"
+        elif route.hospital_id != hospital_id:
+            reason = "destination"
+        elif time.monotonic() - route.fetched_at > min(self.ttl_sec, route.ttl_sec):
+            reason = "expired"
+        else:
+            projection = project_onto_route(route, lat, lon, full_scan_over_m=self.threshold_m)
+            if projection[4] <= self.threshold_m:
+                self.on_route += 1
+                return self._progress(route, projection, rerouted=False)
+            reason = "off_route"
+
+        self.reroutes[reason] += 1
+        # Off route: the cached route for this cell is the one the unit just left.
+        cached = await route_cache.get_route(lat, lon, hospital_id, end_lat, end_lon, refresh=reason == "off_route")
+        route = _tracked_from(cached, hospital_id)
+        if not route.coords:
+            # Router answered without a geometry: track against the route end alone
+            # (the next call re-routes again unless the unit is there).
+            route.coords = [(end_lat, end_lon)]
+        self._put(trip_id, route)
+        return self._progress(route, project_onto_route(route, lat, lon), rerouted=True)
+
+    def stats(self) -> Dict[str, Any]:
+        rerouted = sum(self.reroutes.values())
+        total = self.on_route + rerouted
+        return {
+            "tracked_trips": len(self._routes),
+            "threshold_m": self.threshold_m,
+            "ttl_sec": self.ttl_sec,
+            "on_route": self.on_route,
+            "reroutes": dict(self.reroutes),
+            # Share of /route calls answered from the stored polyline alone.
+            "on_route_rate": round(self.on_route / total, 4) if total else 0.0,
+        }
+
+
+route_tracker = RouteTracker()
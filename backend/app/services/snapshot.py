@@ -1,25 +1,23 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from sqlalchemy import desc
 from sqlalchemy.orm import Session
 
-from ..models import GPSPoint, Trip, TripAck, TripStatus
+from ..models import Trip, TripAck, TripStatus
+from ..schemas import HospitalActiveTripItem, LatestGPS
+from .latest_cache import LatestState, latest_cache
 
 
 def get_latest_gps(db: Session, trip_id: str) -> Tuple[float, float, datetime, float]:
-    gp = (
-        db.query(GPSPoint)
-        .filter(GPSPoint.trip_id == trip_id)
-        .order_by(desc(GPSPoint.recorded_at))
-        .first()
-    )
-    if not gp:
+    # Served from the in-memory latest-state cache; DB only on a miss.
+    st = latest_cache.get_or_load(db, trip_id)
+    if st is None:
         # Never return nulls: return safe defaults
         return 0.0, 0.0, datetime.utcnow(), 0.0
-    return gp.lat, gp.lon, gp.recorded_at, float(gp.speed_mps or 0.0)
+    return st.lat, st.lon, st.recorded_at, st.speed_mps
 
 
 def get_prediction_stub(db: Session, trip: Trip) -> Tuple[int, str]:
@@ -54,5 +52,29 @@ def get_acks(db: Session, trip_id: str) -> List[Dict[str, Any]]:
     return [{"hospital_id": r.hospital_id, "acked_at": r.acked_at.isoformat()} for r in rows]
 
 
+def hospital_trip_item(db: Session, trip: Trip, latest: Optional[LatestState]) -> HospitalActiveTripItem:
+    """
+    One row of the hospital view (REST active-trips + /ws/hospital events).
+    """
+    if latest is not None:
+        gps = LatestGPS(lat=latest.lat, lon=latest.lon, recorded_at=latest.recorded_at, speed_mps=latest.speed_mps)
+        last_time = latest.recorded_at
+    else:
+        gps = LatestGPS()  # safe defaults
+        last_time = trip.updated_at or datetime.utcnow()
+
+    eta_final, risk = get_prediction_stub(db, trip)
+
+    return HospitalActiveTripItem(
+        trip_id=trip.trip_id,
+        ambulance_id=trip.ambulance_id,
+        status=trip.status.value,
+        latest_gps=gps,
+        last_update_time=last_time,
+        eta_final_seconds=int(eta_final),
+        risk_level=str(risk),
+    )
+
+
 def is_active(trip: Trip) -> bool:
     return trip.status in (TripStatus.EN_ROUTE, TripStatus.NEAR_ARRIVAL)
@@ -0,0 +1,146 @@
+"""
+Dynamic interval tree: a treap ordered by (start, end, seq) where each node also
+keeps the largest end in its subtree. Insert / remove are O(log n) expected and
+overlap(lo, hi) is O(log n + hits). Intervals are closed: [start, end].
+"""
+
+from __future__ import annotations
+
+import itertools
+import random
+from typing import Any, Iterator, List, Optional, Tuple
+
+Key = Tuple[float, float, int]
+
+
+class _Node:
+    __slots__ = ("key", "payload", "prio", "left", "right", "max_end")
+
+    def __init__(self, key: Key, payload: Any, prio: float) -> None:
+        self.key = key
+        self.payload = payload
+        self.prio = prio
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+        self.max_end = key[1]
+
+
+def _fix(n: _Node) -> None:
+    m = n.key[1]
+    if n.left is not None and n.left.max_end > m:
+        m = n.left.max_end
+    if n.right is not None and n.right.max_end > m:
+        m = n.right.max_end
+    n.max_end = m
+
+
+def _rotate_right(n: _Node) -> _Node:
+    l = n.left
+    n.left, l.right = l.right, n
+    _fix(n)
+    _fix(l)
+    return l
+
+
+def _rotate_left(n: _Node) -> _Node:
+    r = n.right
+    n.right, r.left = r.left, n
+    _fix(n)
+    _fix(r)
+    return r
+
+
+def _insert(n: Optional[_Node], node: _Node) -> _Node:
+    if n is None:
+        return node
+    if node.key < n.key:
+        n.left = _insert(n.left, node)
+        if n.left.prio < n.prio:
+            return _rotate_right(n)
+    else:
+        n.right = _insert(n.right, node)
+        if n.right.prio < n.prio:
+            return _rotate_left(n)
+    _fix(n)
+    return n
+
+
+def _remove(n: Optional[_Node], key: Key) -> Tuple[Optional[_Node], bool]:
+    if n is None:
+        return None, False
+    if key < n.key:
+        n.left, found = _remove(n.left, key)
+    elif key > n.key:
+        n.right, found = _remove(n.right, key)
+    else:
+        if n.left is None:
+            return n.right, True
+        if n.right is None:
+            return n.left, True
+        # Rotate the lower-priority child up, then keep deleting below it.
+        if n.left.prio < n.right.prio:
+            n = _rotate_right(n)
+            n.right, found = _remove(n.right, key)
+        else:
+            n = _rotate_left(n)
+            n.left, found = _remove(n.left, key)
+    _fix(n)
+    return n, found
+
+
+class IntervalTree:
+    def __init__(self, seed: Optional[int] = None) -> None:
+        self._root: Optional[_Node] = None
+        self._rng = random.Random(seed)
+        self._seq = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, start: float, end: float, payload: Any = None) -> Key:
+        """Adds [start, end]; returns the key to remove it with."""
+        if end < start:
+            raise ValueError("interval end before start")
+        key = (float(start), float(end), next(self._seq))
+        self._root = _insert(self._root, _Node(key, payload, self._rng.random()))
+        self._size += 1
+        return key
+
+    def remove(self, key: Key) -> bool:
+        self._root, found = _remove(self._root, key)
+        if found:
+            self._size -= 1
+        return found
+
+    def overlap(self, lo: float, hi: float) -> List[Tuple[float, float, Any]]:
+        """(start, end, payload) of every interval intersecting [lo, hi], by start."""
+        out: List[Tuple[float, float, Any]] = []
+        stack: List[_Node] = []
+        n = self._root
+        # In-order walk, pruning subtrees that end before lo or start after hi.
+        while stack or n is not None:
+            while n is not None and n.max_end >= lo:
+                stack.append(n)
+                n = n.left
+            if not stack:
+                break
+            n = stack.pop()
+            start, end, _ = n.key
+            if start > hi:
+                break
+            if end >= lo:
+                out.append((start, end, n.payload))
+            n = n.right
+        return out
+
+    def __iter__(self) -> Iterator[Tuple[float, float, Any]]:
+        stack: List[_Node] = []
+        n = self._root
+        while stack or n is not None:
+            while n is not None:
+                stack.append(n)
+                n = n.left
+            n = stack.pop()
+            yield n.key[0], n.key[1], n.payload
+            n = n.right
@@ -0,0 +1,122 @@
+"""
+Google encoded polyline (precision 5 = OSRM "polyline", 6 = "polyline6") and
+Douglas-Peucker simplification. Points are (lat, lon).
+"""
+
+from __future__ import annotations
+
+import math
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+LatLonPair = Tuple[float, float]
+
+_M_PER_DEG = math.pi * 6371000.0 / 180.0
+
+
+def _encode_value(v: int, out: List[str]) -> None:
+    v = ~(v << 1) if v < 0 else (v << 1)
+    while v >= 0x20:
+        out.append(chr((0x20 | (v & 0x1F)) + 63))
+        v >>= 5
+    out.append(chr(v + 63))
+
+
+def encode_polyline(points: Sequence[LatLonPair], precision: int = 5) -> str:
+    factor = 10 ** precision
+    out: List[str] = []
+    prev_lat = prev_lon = 0
+    for lat, lon in points:
+        ilat = int(round(lat * factor))
+        ilon = int(round(lon * factor))
+        _encode_value(ilat - prev_lat, out)
+        _encode_value(ilon - prev_lon, out)
+        prev_lat, prev_lon = ilat, ilon
+    return "".join(out)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[LatLonPair]:
+    factor = float(10 ** precision)
+    points: List[LatLonPair] = []
+    i = lat = lon = 0
+    n = len(encoded)
+    while i < n:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                if i >= n:
+                    raise ValueError("truncated polyline")
+                b = ord(encoded[i]) - 63
+                i += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / factor, lon / factor))
+    return points
+
+
+def decode_polyline_arrays(encoded: str, precision: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Same result as decode_polyline, as (lats, lons) float arrays, without a Python
+    loop per character: chunks are OR-ed per value with reduceat, then zigzag-decoded
+    and cumulatively summed.
+    """
+    if not encoded:
+        return np.empty(0), np.empty(0)
+    v = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    if v.min() < 0 or v.max() > 0x3F:
+        raise ValueError("invalid polyline character")
+    ends = np.flatnonzero(v < 0x20)
+    if len(ends) == 0 or ends[-1] != len(v) - 1 or len(ends) % 2:
+        raise ValueError("truncated polyline")
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shift = 5 * (np.arange(len(v)) - np.repeat(starts, ends - starts + 1))
+    values = np.add.reduceat((v & 0x1F) << shift, starts)  # disjoint bits: sum == OR
+    values = np.where(values & 1, ~(values >> 1), values >> 1)
+    factor = float(10 ** precision)
+    return np.cumsum(values[0::2]) / factor, np.cumsum(values[1::2]) / factor
+
+
+def simplify_indices(lats: np.ndarray, lons: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """
+    Douglas-Peucker: indices of the points kept so that no dropped point is more
+    than tolerance_m from the simplified line. Iterative; each split is one numpy pass.
+    """
+    n = len(lats)
+    if n <= 2 or tolerance_m <= 0:
+        return np.arange(n)
+
+    # Local equirectangular metres around the route's mean latitude.
+    kx = _M_PER_DEG * math.cos(math.radians(float(np.mean(lats))))
+    x = (np.asarray(lons, dtype=float) - float(lons[0])) * kx
+    y = (np.asarray(lats, dtype=float) - float(lats[0])) * _M_PER_DEG
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    tol2 = tolerance_m * tolerance_m
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        px, py = x[a + 1:b], y[a + 1:b]
+        dx, dy = x[b] - x[a], y[b] - y[a]
+        seg2 = dx * dx + dy * dy
+        if seg2 == 0.0:
+            d2 = (px - x[a]) ** 2 + (py - y[a]) ** 2
+        else:
+            t = np.clip(((px - x[a]) * dx + (py - y[a]) * dy) / seg2, 0.0, 1.0)
+            d2 = (px - x[a] - t * dx) ** 2 + (py - y[a] - t * dy) ** 2
+        i = int(np.argmax(d2))
+        if d2[i] > tol2:
+            m = a + 1 + i
+            keep[m] = True
+            stack.append((a, m))
+            stack.append((m, b))
+    return np.flatnonzero(keep)
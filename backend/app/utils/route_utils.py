@@ -1,4 +1,5 @@
-from typing import Literal
+from dataclasses import dataclass
+from typing import Any, Dict, List, Literal, Optional
 
 RouteType = Literal["urban", "highway", "mixed"]
 
@@ -20,3 +21,64 @@ def classify_route_type(distance_km: float, duration_sec: float) -> RouteType:
     if distance_km > 15.0 and avg_speed_kmh > 60.0:
         return "highway"
     return "mixed"
+
+
+@dataclass(frozen=True)
+class RouteStep:
+    """One OSRM maneuver, with distance / time from the route start to it."""
+
+    lat: float
+    lon: float
+    maneuver: str  # OSRM maneuver type: depart, turn, roundabout, fork, ..., arrive
+    modifier: Optional[str]
+    bearing_before: float
+    bearing_after: float
+    name: str
+    distance_m: float  # length of the step that starts here
+    duration_s: float
+    cumulative_distance_m: float
+    cumulative_duration_s: float
+
+
+def steps_from_osrm_route(route: Dict[str, Any]) -> List[RouteStep]:
+    """
+    Flattens legs[*].steps of an OSRM route (steps=true) into RouteSteps.
+    Empty when the route has no steps (e.g. offline-router answers).
+    """
+    out: List[RouteStep] = []
+    cum_m = cum_s = 0.0
+    for leg in route.get("legs") or []:
+        for step in leg.get("steps") or []:
+            m = step.get("maneuver") or {}
+            lon, lat = m.get("location") or (0.0, 0.0)
+            dist = float(step.get("distance") or 0.0)
+            dur = float(step.get("duration") or 0.0)
+            out.append(
+                RouteStep(
+                    lat=float(lat),
+                    lon=float(lon),
+                    maneuver=str(m.get("type") or ""),
+                    modifier=m.get("modifier"),
+                    bearing_before=float(m.get("bearing_before") or 0.0),
+                    bearing_after=float(m.get("bearing_after") or 0.0),
+                    name=str(step.get("name") or ""),
+                    distance_m=dist,
+                    duration_s=dur,
+                    cumulative_distance_m=cum_m,
+                    cumulative_duration_s=cum_s,
+                )
+            )
+            cum_m += dist
+            cum_s += dur
+    return out
+
+
+def segment_durations_from_osrm_route(route: Dict[str, Any]) -> List[float]:
+    """
+    Per-segment seconds from legs[*].annotation.duration (annotations=duration),
+    one per pair of consecutive overview=full vertices. Empty when absent.
+    """
+    out: List[float] = []
+    for leg in route.get("legs") or []:
+        out.extend(float(d) for d in (leg.get("annotation") or {}).get("duration") or [])
+    return out
@@ -0,0 +1,97 @@
+"""
+Route time profile: distance and OSRM travel time from the route start at every
+vertex, i.e. prefix sums of the per-segment annotation durations. The time to
+any point on the route (a corridor junction, the unit's projected position) is
+then one binary search and an interpolation, O(log n).
+
+Predicted delay is applied at lookup time: the OSRM time still ahead is
+stretched to the final ETA, so a new ETA does not rebuild the arrays.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+ArrayLike = Union[float, np.ndarray]
+
+
+@dataclass(frozen=True)
+class TimeProfile:
+    cum_m: np.ndarray  # metres from the route start at each vertex (non-decreasing)
+    cum_s: np.ndarray  # OSRM seconds from the route start at each vertex
+
+    @property
+    def total_m(self) -> float:
+        return float(self.cum_m[-1])
+
+    @property
+    def total_s(self) -> float:
+        return float(self.cum_s[-1])
+
+    @classmethod
+    def from_segments(
+        cls, cum_m: np.ndarray, durations_s: Sequence[float], total_s: Optional[float] = None
+    ) -> Optional["TimeProfile"]:
+        """
+        cum_m per vertex and one duration per segment (len(cum_m) - 1). Rescaled to
+        total_s when given. Falls back to a constant speed when the durations
+        don't line up with the vertices (offline router, missing annotations).
+        None when there is no time to spread (no usable durations and no
+        positive total_s, or total_s <= 0): callers keep their distance-based
+        timing instead of putting every point at 0 s.
+        """
+        cum_m = np.array(cum_m, dtype=float)
+        durations = np.asarray(durations_s, dtype=float)
+        if total_s is not None and not total_s > 0:
+            return None
+        if len(durations) != len(cum_m) - 1 or not (durations >= 0).all() or not durations.sum() > 0:
+            return cls.uniform(cum_m, total_s) if total_s is not None else None
+        cum_s = np.zeros(len(cum_m))
+        np.cumsum(durations, out=cum_s[1:])
+        if total_s is not None:
+            cum_s *= total_s / cum_s[-1]
+        return cls(cum_m, cum_s)
+
+    @classmethod
+    def uniform(cls, cum_m: np.ndarray, total_s: float) -> "TimeProfile":
+        cum_m = np.array(cum_m, dtype=float)
+        total_m = cum_m[-1] if len(cum_m) else 0.0
+        cum_s = cum_m * (total_s / total_m) if total_m > 0 else np.zeros(len(cum_m))
+        return cls(cum_m, cum_s)
+
+    def time_at(self, d: ArrayLike) -> ArrayLike:
+        """OSRM seconds from the route start to distance d (scalar or array)."""
+        return np.interp(d, self.cum_m, self.cum_s)
+
+    def eta_s(self, d: ArrayLike, *, from_m: float = 0.0, final_eta_s: Optional[float] = None) -> ArrayLike:
+        """
+        Seconds from the point at from_m to the point(s) at d. With final_eta_s
+        (the ETA to the end of the route, delay included) the OSRM time left is
+        scaled so the route end comes out at final_eta_s.
+        """
+        t0 = float(self.time_at(from_m))
+        dt = self.time_at(d) - t0
+        if final_eta_s is None:
+            return dt
+        return dt * (final_eta_s / max(1.0, self.total_s - t0))
+
+    def remaining_s(self, from_m: float) -> float:
+        return self.total_s - float(self.time_at(from_m))
+
+    def tail(self, seg: int, from_m: float) -> "TimeProfile":
+        """
+        Profile of the rest of the route from a point on segment seg at from_m,
+        re-based to 0 there; its vertices are that point and seg+1 onwards.
+        """
+        t0 = float(self.time_at(from_m))
+        cum_m = np.maximum(np.concatenate(([from_m], self.cum_m[seg + 1:])) - from_m, 0.0)
+        cum_s = np.maximum(np.concatenate(([t0], self.cum_s[seg + 1:])) - t0, 0.0)
+        return TimeProfile(cum_m, cum_s)
+
+    def segment_durations(self, keep: Optional[np.ndarray] = None) -> np.ndarray:
+        """Per-segment seconds, between consecutive kept vertices if keep is given."""
+        cum_s = self.cum_s if keep is None else self.cum_s[keep]
+        return np.diff(cum_s)
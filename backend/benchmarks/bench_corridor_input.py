@@ -0,0 +1,74 @@
+"""
+Corridor plan request cost by route encoding: validation (JSON -> CorridorPlanRequest)
+plus plan_corridor, for route_geometry (list of LatLon models), route_coords (flat
+[lat, lon, ...]) and route_polyline (precision 6).
+
+Run from backend/:
+    python -m benchmarks.bench_corridor_input
+"""
+
+import json
+import math
+import random
+import time
+
+from app.schemas.corridor import CorridorPlanRequest
+from app.services.corridor_planner import plan_corridor
+from app.utils.polyline import encode_polyline
+
+REPEAT = 5
+
+
+def synthetic_route(n: int, seed: int = 11):
+    """Random urban-ish walk: 5-40 m segments with an occasional turn."""
+    rng = random.Random(seed)
+    lat, lon, heading = 12.90, 77.50, 0.0
+    pts = []
+    for _ in range(n):
+        if rng.random() < 0.05:
+            heading += rng.choice((-1, 1)) * rng.uniform(20, 100)
+        d = rng.uniform(5, 40) / 111_320.0
+        lat += d * math.cos(math.radians(heading))
+        lon += d * math.sin(math.radians(heading)) / math.cos(math.radians(lat))
+        pts.append((round(lat, 6), round(lon, 6)))
+    return pts
+
+
+def best_ms(body: bytes):
+    validate = plan = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        req = CorridorPlanRequest.model_validate_json(body)
+        t1 = time.perf_counter()
+        out = plan_corridor(req)
+        t2 = time.perf_counter()
+        validate = min(validate, (t1 - t0) * 1000.0)
+        plan = min(plan, (t2 - t1) * 1000.0)
+    return validate, plan, out
+
+
+def run(n: int) -> None:
+    pts = synthetic_route(n)
+    common = {"trip_id": "BENCH", "final_eta_seconds": 1200}
+    bodies = {
+        "geometry": {"route_geometry": [{"lat": a, "lon": b} for a, b in pts]},
+        "coords": {"route_coords": [x for p in pts for x in p]},
+        "polyline6": {"route_polyline": encode_polyline(pts, 6), "route_polyline_precision": 6},
+    }
+
+    ref = None
+    for name, route in bodies.items():
+        body = json.dumps({**common, **route}).encode()
+        validate, plan, out = best_ms(body)
+        if ref is None:
+            ref = out
+        assert out == ref, f"{name}: plan differs from route_geometry input"
+        print(
+            f"n={n:6d}  {name:9s}  body={len(body) / 1024:8.1f} KiB  "
+            f"validate={validate:8.2f} ms  plan={plan:8.2f} ms  total={validate + plan:8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    for n in (1_000, 20_000, 100_000):
+        run(n)
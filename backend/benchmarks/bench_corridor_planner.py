@@ -0,0 +1,47 @@
+"""
+plan_corridor (NumPy) vs plan_corridor_scalar (point-at-a-time reference)
+on synthetic routes of 1k-100k points. Responses must be identical.
+
+Run from backend/:
+    python -m benchmarks.bench_corridor_planner
+"""
+
+import time
+
+from app.schemas.corridor import CorridorPlanRequest
+from app.services.corridor_planner import plan_corridor, plan_corridor_scalar
+from benchmarks.bench_corridor_input import synthetic_route
+
+REPEAT = 5
+
+
+def best_ms(fn, req):
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn(req)
+        best = min(best, (time.perf_counter() - t0) * 1000.0)
+    return best, out
+
+
+def run(n: int) -> None:
+    pts = synthetic_route(n, seed=n)
+    req = CorridorPlanRequest(
+        trip_id="BENCH",
+        route_coords=[x for p in pts for x in p],
+        final_eta_seconds=1200,
+        max_junctions=80,
+        min_spacing_m=50,
+    )
+    scalar_ms, ref = best_ms(plan_corridor_scalar, req)
+    numpy_ms, out = best_ms(plan_corridor, req)
+    assert out == ref, f"n={n}: vectorized plan differs from scalar plan"
+    print(
+        f"n={n:6d}  scalar={scalar_ms:8.2f} ms  numpy={numpy_ms:7.2f} ms  "
+        f"speedup={scalar_ms / numpy_ms:5.1f}x  junctions={len(out.junctions)}"
+    )
+
+
+if __name__ == "__main__":
+    for n in (1_000, 10_000, 50_000, 100_000):
+        run(n)
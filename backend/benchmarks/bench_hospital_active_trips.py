@@ -0,0 +1,84 @@
+"""
+Query-count benchmark for GET /api/hospital/{hospital_id}/active-trips.
+
+Run from backend/:
+    python -m benchmarks.bench_hospital_active_trips
+
+Uses a throwaway in-memory SQLite DB. The statement count per call must stay
+constant as the number of inbound trips grows.
+"""
+
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.hospital import hospital_active_trips
+from app.db import Base
+from app.models import GPSPoint, Trip, TripStatus
+from app.services.latest_cache import latest_cache
+
+HOSPITAL_ID = "HOSP-BENCH"
+FIXES_PER_TRIP = 50
+
+
+def seed(db, n_trips: int) -> None:
+    now = datetime.utcnow()
+    for i in range(n_trips):
+        trip_id = str(uuid.uuid4())
+        db.add(
+            Trip(
+                trip_id=trip_id,
+                ambulance_id=f"AMB-{i:03d}",
+                destination_hospital_id=HOSPITAL_ID,
+                status=TripStatus.EN_ROUTE,
+                started_at=now,
+                updated_at=now + timedelta(seconds=i),
+            )
+        )
+        for k in range(FIXES_PER_TRIP):
+            db.add(
+                GPSPoint(
+                    trip_id=trip_id,
+                    lat=12.9 + k * 1e-4,
+                    lon=77.5 + i * 1e-4,
+                    speed_mps=10.0,
+                    recorded_at=now + timedelta(seconds=k),
+                )
+            )
+    db.commit()
+
+
+def run(n_trips: int, repeats: int = 20) -> None:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False, future=True)
+
+    with Session() as db:
+        seed(db, n_trips)
+
+    statements = {"n": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(*_args, **_kwargs):
+        statements["n"] += 1
+
+    with Session() as db:
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            latest_cache._items.clear()  # cold cache: force the DB path every time
+            out = hospital_active_trips(HOSPITAL_ID, limit=500, offset=0, db=db)
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0 / repeats
+
+    print(
+        f"trips={n_trips:4d}  returned={len(out.trips):4d}  "
+        f"queries/call={statements['n'] / repeats:4.1f}  latency={elapsed_ms:7.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    for n in (1, 10, 40, 200):
+        run(n)
@@ -0,0 +1,107 @@
+"""
+Query latency: offline fallback router vs the OSRM path.
+
+Run from backend/:
+    python -m benchmarks.bench_offline_router
+
+Builds a synthetic grid road graph (~100 m blocks, random edge speeds) in a
+temp dir, memory-maps it and times random A* queries. The same origin /
+destination pairs are then sent through the pooled OSRM client if
+OSRM_BASE_URL answers; otherwise that half is skipped.
+"""
+
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.offline_router import OfflineRouter, save_graph
+from app.services.osrm_service import OSRMError, OSRMClient
+
+ORIGIN = (12.90, 77.50)
+SPACING_M = 100.0
+QUERIES = 50
+
+
+def build_grid(path: str, side: int) -> None:
+    rng = np.random.default_rng(7)
+    dlat = SPACING_M / 111_320.0
+    dlon = dlat / np.cos(np.radians(ORIGIN[0]))
+    r, c = np.divmod(np.arange(side * side), side)
+    node_lat = ORIGIN[0] + r * dlat
+    node_lon = ORIGIN[1] + c * dlon
+
+    ids = np.arange(side * side).reshape(side, side)
+    a = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+    b = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+    src = np.concatenate([a, b])
+    dst = np.concatenate([b, a])
+    length = np.full(len(src), SPACING_M)
+    speed = rng.uniform(5.0, 20.0, len(src) // 2)
+    time_s = length / np.concatenate([speed, speed])
+    save_graph(path, node_lat, node_lon, src, dst, length, time_s)
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100.0 * len(xs)))]
+
+
+async def osrm_latencies(pairs):
+    client = OSRMClient(retries=0)
+    out = []
+    try:
+        for (a, b) in pairs:
+            t0 = time.perf_counter()
+            await client.route_driving(a[0], a[1], b[0], b[1])
+            out.append((time.perf_counter() - t0) * 1000.0)
+    finally:
+        await client.close()
+    return out
+
+
+def run(side: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        build_grid(tmp, side)
+        router = OfflineRouter(tmp)
+        t0 = time.perf_counter()
+        assert router.available
+        load_ms = (time.perf_counter() - t0) * 1000.0
+
+        rng = random.Random(side)
+        span = (side - 1) * SPACING_M / 111_320.0
+        pairs = [
+            (
+                (ORIGIN[0] + rng.random() * span, ORIGIN[1] + rng.random() * span),
+                (ORIGIN[0] + rng.random() * span, ORIGIN[1] + rng.random() * span),
+            )
+            for _ in range(QUERIES)
+        ]
+
+        lat_ms = []
+        for a, b in pairs:
+            t0 = time.perf_counter()
+            router.route_driving(a[0], a[1], b[0], b[1])
+            lat_ms.append((time.perf_counter() - t0) * 1000.0)
+        stats = router.stats()
+
+    print(
+        f"offline  nodes={side * side:7d}  load={load_ms:7.1f} ms  "
+        f"p50={statistics.median(lat_ms):7.2f} ms  p95={pct(lat_ms, 95):7.2f} ms  "
+        f"expanded/query={stats['avg_expanded']:.0f}"
+    )
+
+    try:
+        osrm_ms = asyncio.run(osrm_latencies(pairs))
+    except OSRMError as e:
+        print(f"osrm     skipped ({e})")
+        return
+    print(f"osrm     p50={statistics.median(osrm_ms):7.2f} ms  p95={pct(osrm_ms, 95):7.2f} ms")
+
+
+if __name__ == "__main__":
+    for side in (50, 150, 300):
+        run(side)
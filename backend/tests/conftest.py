@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeOSRM:
+    """
+    Local stand-in for an OSRM server (HTTP/1.1, keep-alive). /route answers a
+    straight two-point route; `fail` makes the next N calls return 503, `down`
+    makes every call fail and `delay` sleeps before answering.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.fail = 0
+        self.down = False
+        self.delay = 0.0
+        self.connections = set()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fake.calls += 1
+                fake.connections.add(self.client_address)
+                if fake.delay:
+                    time.sleep(fake.delay)
+                if fake.down or fake.fail > 0:
+                    fake.fail -= 1
+                    self._send(503, b"unavailable")
+                    return
+                coords = urlsplit(self.path).path.rsplit("/", 1)[-1].split(";")
+                (lon1, lat1), (lon2, lat2) = [tuple(map(float, c.split(","))) for c in coords[:2]]
+                body = {
+                    "code": "Ok",
+                    "routes": [
+                        {
+                            "distance": 1000.0,
+                            "duration": 120.0,
+                            "geometry": {"type": "LineString", "coordinates": [[lon1, lat1], [lon2, lat2]]},
+                            "legs": [{"steps": [], "annotation": {"duration": [120.0]}}],
+                        }
+                    ],
+                }
+                self._send(200, json.dumps(body).encode())
+
+            def _send(self, status, body):
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_osrm():
+    srv = FakeOSRM()
+    yield srv
+    srv.close()
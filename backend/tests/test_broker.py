@@ -0,0 +1,219 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from app.realtime.broker import RedisBroker
+
+
+class FakeRedis:
+    """Just enough of a RESP2 server for RedisBroker: AUTH, PUBLISH, (UN)SUBSCRIBE."""
+
+    def __init__(self, password=None):
+        self.password = password
+        self.server = None
+        self.port = None
+        self.subs = {}  # writer -> set of channels
+        self.writers = set()
+        self.commands = []
+        self.garbage = False
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._client, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.drop_all()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def drop_all(self):
+        for w in list(self.writers):
+            w.close()
+        self.writers.clear()
+        self.subs.clear()
+
+    @staticmethod
+    def _bulk(b):
+        b = b if isinstance(b, bytes) else str(b).encode()
+        return b"$%d\r\n%s\r\n" % (len(b), b)
+
+    def _array(self, *items):
+        out = [b"*%d\r\n" % len(items)]
+        for it in items:
+            out.append(b":%d\r\n" % it if isinstance(it, int) else self._bulk(it))
+        return b"".join(out)
+
+    async def _read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        n = int(line[1:-2])
+        parts = []
+        for _ in range(n):
+            size = int((await reader.readline())[1:-2])
+            parts.append((await reader.readexactly(size + 2))[:-2].decode())
+        return parts
+
+    async def _client(self, reader, writer):
+        self.writers.add(writer)
+        authed = self.password is None
+        try:
+            while True:
+                cmd = await self._read_command(reader)
+                if cmd is None:
+                    break
+                self.commands.append(cmd)
+                name = cmd[0].upper()
+                if name == "AUTH":
+                    authed = cmd[1] == self.password
+                    writer.write(b"+OK\r\n" if authed else b"-WRONGPASS invalid password\r\n")
+                elif not authed:
+                    writer.write(b"-NOAUTH Authentication required.\r\n")
+                elif name == "SUBSCRIBE":
+                    chans = self.subs.setdefault(writer, set())
+                    for ch in cmd[1:]:
+                        chans.add(ch)
+                        writer.write(self._array("subscribe", ch, len(chans)))
+                elif name == "UNSUBSCRIBE":
+                    chans = self.subs.setdefault(writer, set())
+                    for ch in cmd[1:]:
+                        chans.discard(ch)
+                        writer.write(self._array("unsubscribe", ch, len(chans)))
+                elif name == "PUBLISH":
+                    n = 0
+                    for w, chans in list(self.subs.items()):
+                        if cmd[1] in chans:
+                            w.write(b":oops\r\n" if self.garbage else self._array("message", cmd[1], cmd[2]))
+                            n += 1
+                    writer.write(b":%d\r\n" % n)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            self.subs.pop(writer, None)
+            writer.close()
+
+
+async def _wait_for(cond, timeout=3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not cond():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def _run(coro_fn, password=None, url_password=None):
+    async def run():
+        srv = FakeRedis(password)
+        await srv.start()
+        got = []
+        auth = f":{url_password}@" if url_password else ""
+        broker = RedisBroker(f"redis://{auth}127.0.0.1:{srv.port}", lambda ch, data: got.append((ch, data)))
+        await broker.start()
+        try:
+            await coro_fn(srv, broker, got)
+        finally:
+            await broker.close()
+            await srv.stop()
+
+    asyncio.run(run())
+
+
+def test_publish_subscribe():
+    async def scenario(srv, broker, got):
+        await _wait_for(lambda: broker.connected_pub and broker.connected_sub)
+        broker.subscribe("trip:T1")
+        broker.subscribe("trip:T1")  # refcounted: one SUBSCRIBE on the wire
+        await _wait_for(lambda: any(c[0] == "SUBSCRIBE" for c in srv.commands))
+        broker.publish("trip:T1", "hello")
+        broker.publish("trip:T2", "not subscribed")
+        await _wait_for(lambda: got)
+        await asyncio.sleep(0.05)
+        assert got == [("trip:T1", "hello")]
+        assert sum(1 for c in srv.commands if c[0] == "SUBSCRIBE") == 1
+
+        broker.unsubscribe("trip:T1")
+        broker.unsubscribe("trip:T1")
+        await _wait_for(lambda: any(c[0] == "UNSUBSCRIBE" for c in srv.commands))
+        broker.publish("trip:T1", "after unsubscribe")
+        await asyncio.sleep(0.1)
+        assert got == [("trip:T1", "hello")]
+
+    _run(scenario)
+
+
+def test_resubscribes_after_reconnect():
+    async def scenario(srv, broker, got):
+        await _wait_for(lambda: broker.connected_pub and broker.connected_sub)
+        broker.subscribe("hospital:H1")
+        await _wait_for(lambda: srv.subs and any("hospital:H1" in c for c in srv.subs.values()))
+
+        srv.drop_all()  # server restart / network blip
+        await _wait_for(lambda: not broker.connected_sub)
+        await _wait_for(lambda: any("hospital:H1" in c for c in srv.subs.values()) and broker.connected_pub)
+        broker.publish("hospital:H1", "back")
+        await _wait_for(lambda: got == [("hospital:H1", "back")])
+        assert broker.reconnects >= 2
+
+    _run(scenario)
+
+
+def test_auth():
+    async def scenario(srv, broker, got):
+        await _wait_for(lambda: broker.connected_pub and broker.connected_sub)
+        assert ["AUTH", "s3cret"] in srv.commands
+        broker.subscribe("preemption")
+        await _wait_for(lambda: any("preemption" in c for c in srv.subs.values()))
+        broker.publish("preemption", "{}")
+        await _wait_for(lambda: got == [("preemption", "{}")])
+
+    _run(scenario, password="s3cret", url_password="s3cret")
+
+
+def test_wrong_password_keeps_retrying():
+    async def scenario(srv, broker, got):
+        await _wait_for(lambda: sum(1 for c in srv.commands if c[0] == "AUTH") >= 4)
+        assert not broker.connected_pub and not broker.connected_sub
+        assert not srv.subs
+
+    _run(scenario, password="s3cret", url_password="wrong")
+
+
+def test_survives_malformed_reply():
+    async def scenario(srv, broker, got):
+        await _wait_for(lambda: broker.connected_pub and broker.connected_sub)
+        broker.subscribe("trip:T1")
+        await _wait_for(lambda: any("trip:T1" in c for c in srv.subs.values()))
+        srv.garbage = True
+        broker.publish("trip:T1", "x")  # subscriber gets ":oops" -> ValueError while parsing
+        await _wait_for(lambda: not broker.connected_sub)
+        srv.garbage = False
+        await _wait_for(lambda: any("trip:T1" in c for c in srv.subs.values()) and broker.connected_sub)
+        broker.publish("trip:T1", "ok")
+        await _wait_for(lambda: ("trip:T1", "ok") in got)
+
+    _run(scenario)
+
+
+def test_remote_trip_change_refreshes_latest_cache():
+    from app.realtime.publish import _encode_trip_change, _on_broker_message, trip_changes_channel
+    from app.services.latest_cache import LatestState, latest_cache
+
+    latest_cache.update("REMOTE-1", 1.0, 2.0, 3.0, datetime(2026, 1, 1, 12, 0, 0), "en_route")
+    # Another worker took a newer fix; this worker only sees the broker message.
+    newer = LatestState("REMOTE-1", 1.5, 2.5, 4.0, datetime(2026, 1, 1, 12, 0, 5), "near_arrival")
+    _on_broker_message(trip_changes_channel("REMOTE-1"), _encode_trip_change("gps", newer, None))
+    st = latest_cache.get("REMOTE-1")
+    assert (st.lat, st.lon, st.recorded_at, st.status) == (1.5, 2.5, newer.recorded_at, "near_arrival")
+
+    _on_broker_message(trip_changes_channel("REMOTE-1"), json.dumps({"reason": "arrived", "status": "arrived"}))
+    assert latest_cache.get("REMOTE-1").status == "arrived"
+    latest_cache.evict("REMOTE-1")
+
+
+@pytest.mark.parametrize("url", ["redis://127.0.0.1:6379/2", "redis://:pw@127.0.0.1/0"])
+def test_rejects_database_in_url(url):
+    with pytest.raises(ValueError):
+        RedisBroker(url, lambda ch, data: None)
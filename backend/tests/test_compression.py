@@ -0,0 +1,55 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.utils import compression
+from app.utils.compression import CompressionMiddleware, accepts_brotli
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("br", True),
+        ("gzip, deflate, br", True),
+        ("gzip;q=1.0, br;q=0.5", True),
+        ("BR ; Q=0.1", True),
+        ("br;q=0", False),
+        ("gzip, br;q=0.000", False),
+        ("br;q=oops", False),
+        ("x-brand, gzip", False),
+        ("gzip", False),
+        ("", False),
+    ],
+)
+def test_accepts_brotli(header, expected):
+    assert accepts_brotli(header) is expected
+
+
+def _client():
+    async def big(request):
+        return JSONResponse({"coords": [[77.5 + i * 1e-4, 12.9] for i in range(500)]})
+
+    async def small(request):
+        return JSONResponse({"ok": True})
+
+    app = Starlette(routes=[Route("/big", big), Route("/small", small)])
+    return TestClient(CompressionMiddleware(app, minimum_size=1024))
+
+
+def test_gzip_when_brotli_refused():
+    r = _client().get("/big", headers={"Accept-Encoding": "gzip, br;q=0"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert len(r.json()["coords"]) == 500
+
+
+def test_brotli_when_accepted():
+    if compression.brotli is None:
+        pytest.skip("brotli not installed")
+    c = _client()
+    r = c.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "br"
+    assert "accept-encoding" in r.headers["vary"].lower()
+    assert len(r.json()["coords"]) == 500
+    assert "content-encoding" not in c.get("/small", headers={"Accept-Encoding": "br"}).headers
@@ -0,0 +1,76 @@
+import math
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.corridor import CorridorPlanRequest
+from app.services.corridor_planner import compute_plan, plan_response, route_arrays
+from app.utils.polyline import encode_polyline
+
+
+def _route(n=120, seed=6):
+    # Winding road: heading changes every few points so there are turns to pick
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(np.where(rng.random(n) < 0.15, rng.uniform(-90, 90, n), 0.0))
+    lats = 12.9 + np.cumsum(0.0008 * np.cos(np.radians(heading)))
+    lons = 77.5 + np.cumsum(0.0008 * np.sin(np.radians(heading)))
+    # Rounded to polyline6 so every input form describes the exact same points
+    return np.round(lats, 6), np.round(lons, 6)
+
+
+def _requests(lats, lons, **kw):
+    points = list(zip(lats.tolist(), lons.tolist()))
+    common = dict(trip_id="T1", final_eta_seconds=900, min_spacing_m=100, **kw)
+    return [
+        CorridorPlanRequest(route_geometry=[{"lat": la, "lon": lo} for la, lo in points], **common),
+        CorridorPlanRequest(route_polyline=encode_polyline(points, 6), route_polyline_precision=6, **common),
+        CorridorPlanRequest(route_coords=[v for p in points for v in p], **common),
+    ]
+
+
+def test_every_route_form_gives_the_same_plan():
+    lats, lons = _route()
+    responses = [plan_response(r, compute_plan(r)).model_dump() for r in _requests(lats, lons)]
+    assert responses[0]["junctions"]
+    for other in responses[1:]:
+        assert other["junctions"] == responses[0]["junctions"]
+        assert other["total_distance_m"] == responses[0]["total_distance_m"]
+
+
+def test_route_arrays_decode_each_form():
+    lats, lons = _route(30)
+    for req in _requests(lats, lons):
+        got_lats, got_lons = route_arrays(req)
+        np.testing.assert_allclose(got_lats, lats, atol=1e-9)
+        np.testing.assert_allclose(got_lons, lons, atol=1e-9)
+
+
+@pytest.mark.parametrize(
+    "route",
+    [
+        {},
+        {"route_coords": [12.9, 77.5, 12.91, 77.51], "route_polyline": "_p~iF~ps|U_ulLnnqC"},
+        {"route_coords": [12.9, 77.5, 12.91, 77.51, 12.92]},
+        {"route_coords": [12.9, 77.5, math.nan, 77.51]},
+        {"route_polyline": "_p~iF~ps|U_ulLnnq"},
+        {"route_polyline": "_p~iF~ps|U"},
+    ],
+)
+def test_bad_routes_are_rejected(route):
+    req = CorridorPlanRequest(final_eta_seconds=60, **route)
+    with pytest.raises(ValueError):
+        route_arrays(req)
+
+
+@pytest.mark.parametrize(
+    "route",
+    [
+        {"route_geometry": [{"lat": 12.9, "lon": 77.5}]},
+        {"route_coords": [12.9, 77.5]},
+        {"route_polyline": "_"},
+    ],
+)
+def test_too_short_routes_fail_validation(route):
+    with pytest.raises(ValidationError):
+        CorridorPlanRequest(final_eta_seconds=60, **route)
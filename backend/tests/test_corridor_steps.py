@@ -0,0 +1,70 @@
+from app.schemas.corridor import CorridorPlanRequest
+from app.services.corridor_planner import compute_plan, plan_response
+from app.services.corridor_store import CorridorPlanStore
+
+
+def _step(lat, maneuver, bearing_after, distance_m, cumulative_m):
+    # 10 m/s throughout, so OSRM seconds are metres / 10
+    return dict(
+        lat=lat,
+        lon=77.5,
+        maneuver=maneuver,
+        bearing_before=(bearing_after + 90) % 360,
+        bearing_after=bearing_after,
+        distance_m=distance_m,
+        duration_s=distance_m / 10,
+        cumulative_distance_m=cumulative_m,
+        cumulative_duration_s=cumulative_m / 10,
+    )
+
+
+# Re-based to the unit's position as /route?steps=true returns them: the first
+# maneuver is 80 m ahead, not at 0.
+STEPS = [
+    _step(12.9007, "turn", 90, 200, 80),
+    _step(12.9025, "turn", 0, 400, 280),
+    _step(12.9061, "turn", 90, 100, 680),
+    _step(12.9070, "turn", 0, 100, 780),
+    _step(12.9079, "arrive", 0, 0, 880),
+]
+
+
+def _req(**kw):
+    return CorridorPlanRequest(
+        trip_id="T1", route_steps=STEPS, final_eta_seconds=88, min_spacing_m=50, window_buffer_seconds=5, **kw
+    )
+
+
+def test_step_plan_times_junctions_from_step_durations():
+    req = _req()
+    resp = plan_response(req, compute_plan(req))
+    assert [j.cumulative_distance_m for j in resp.junctions] == [80, 280, 680, 780]
+    assert [j.eta_seconds_from_now for j in resp.junctions] == [8, 28, 68, 78]
+
+
+def test_update_without_movement_keeps_step_etas():
+    req = _req()
+    store = CorridorPlanStore()
+    store.put("T1", req, compute_plan(req))
+    resp = store.update("T1", 88)
+    assert [j.eta_seconds_from_now for j in resp.junctions] == [8, 28, 68, 78]
+    store.remove("T1")
+
+
+def test_countdown_follows_position_on_profile():
+    # Second leg crawls: 200 m in 60 s, the rest at 10 m/s. OSRM total 128 s.
+    steps = [dict(s) for s in STEPS]
+    steps[0]["duration_s"] = 60.0
+    for s, cum_s in zip(steps[1:], (68.0, 108.0, 118.0, 128.0)):
+        s["cumulative_duration_s"] = cum_s
+    req = CorridorPlanRequest(trip_id="T1", route_steps=steps, final_eta_seconds=256, min_spacing_m=50)
+    store = CorridorPlanStore()
+    store.put("T1", req, compute_plan(req))
+
+    assert store.countdown_seconds("T1") in (255, 256)  # wall clock since the plan
+    # At the second maneuver (280 m): 60 OSRM seconds left, twice that with the plan's delay.
+    assert store.countdown_seconds("T1", 12.9025, 77.5) == 120
+    # Off the route: back to the last ETA.
+    assert store.countdown_seconds("T1", 13.5, 77.5) in (255, 256)
+    assert store.countdown_seconds("T2", 12.9025, 77.5) is None
+    store.remove("T1")
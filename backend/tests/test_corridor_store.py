@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from app.schemas.corridor import CorridorPlanRequest
+from app.services.corridor_planner import compute_plan, plan_response
+from app.services.corridor_store import CorridorPlanStore, project_progress
+from app.services.geo import haversine_m
+from app.services.junction_conflicts import JunctionConflictIndex
+from app.services.preemption_scheduler import PreemptionScheduler
+
+# ~1.1 km north, then ~1.1 km east: one sharp turn
+ROUTE = [[12.90 + 0.001 * i, 77.50] for i in range(11)] + [[12.91, 77.50 + 0.001 * i] for i in range(1, 11)]
+
+
+def _store():
+    return CorridorPlanStore(conflicts=JunctionConflictIndex(), scheduler=PreemptionScheduler())
+
+
+@pytest.mark.parametrize("durations", [None, [5.0] * (len(ROUTE) - 1)])
+def test_stored_response_has_the_planner_meta(durations):
+    req = CorridorPlanRequest(
+        trip_id="T1", route_coords=[v for p in ROUTE for v in p], route_durations=durations,
+        final_eta_seconds=200, min_spacing_m=50,
+    )
+    plan = compute_plan(req)
+    store = _store()
+    store.put("T1", req, plan)
+
+    posted = plan_response(req, plan).meta
+    stored = store.response("T1").meta
+    assert set(posted) <= set(stored)
+    assert stored["explainability"] == posted["explainability"]
+
+
+def _plan_req(**kw):
+    return CorridorPlanRequest(trip_id="T1", route_coords=[v for p in ROUTE for v in p], final_eta_seconds=200,
+                               min_spacing_m=50, **kw)
+
+
+def test_fresh_plan_is_stored_as_planned():
+    req = _plan_req()
+    plan = compute_plan(req)
+    store = _store()
+    store.put("T1", req, plan)
+    assert store.response("T1").junctions == plan_response(req, plan).junctions
+    assert store.update("T1", 200).junctions == plan_response(req, plan).junctions
+
+
+def test_position_update_drops_passed_junctions_and_retimes_the_rest():
+    req = _plan_req()
+    plan = compute_plan(req)
+    store = _store()
+    store.put("T1", req, plan)
+    cum = [c.cumulative_m for c in plan.junctions]
+
+    # On the route, just past the corner (ROUTE[12] is 2 points after it)
+    lat, lon = ROUTE[12]
+    resp = store.update("T1", 100, lat, lon)
+    progress = resp.meta["progress_m"]
+    assert progress == pytest.approx(plan.cumulative[12], abs=0.5)
+    remaining = [k for k, m in enumerate(cum) if m > progress]
+    assert [j.index for j in resp.junctions] == [k + 1 for k in remaining]
+    assert resp.meta["passed_junctions"] == len(cum) - len(remaining)
+
+    speed = (plan.total_m - progress) / 100
+    for j in resp.junctions:
+        assert abs(j.eta_seconds_from_now - (j.cumulative_distance_m - progress) / speed) <= 1
+        assert j.window_end_seconds_from_now - j.eta_seconds_from_now == req.window_buffer_seconds
+
+
+def test_progress_never_moves_back_and_ignores_off_route_fixes():
+    req = _plan_req()
+    store = _store()
+    store.put("T1", req, compute_plan(req))
+
+    ahead = store.update("T1", 100, *ROUTE[15]).meta["progress_m"]
+    assert store.update("T1", 100, *ROUTE[5]).meta["progress_m"] == ahead
+    off = store.update("T1", 100, 12.95, 77.55)
+    assert off.meta["progress_m"] == ahead
+    assert off.meta["deviation_m"] > store.off_route_m
+    assert store.stats()["off_route_updates"] == 1
+
+
+def test_project_progress_matches_a_full_scan():
+    lats = np.array([p[0] for p in ROUTE])
+    lons = np.array([p[1] for p in ROUTE])
+    cumulative = np.concatenate(([0.0], np.cumsum([haversine_m(*ROUTE[i], *ROUTE[i + 1]) for i in range(len(ROUTE) - 1)])))
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        k = int(rng.integers(len(ROUTE) - 1))
+        t = float(rng.random())
+        lat = lats[k] + t * (lats[k + 1] - lats[k]) + rng.normal(0, 0.00002)
+        lon = lons[k] + t * (lons[k + 1] - lons[k]) + rng.normal(0, 0.00002)
+        full = project_progress(lats, lons, cumulative, lat, lon, search_ahead=len(ROUTE))
+        assert full[2] == pytest.approx(cumulative[k] + t * (cumulative[k + 1] - cumulative[k]), abs=10.0)
+        # Window at the right place, or more than off_route_m behind (falls back to the full scan)
+        for hint in (k, 0) if k >= 6 else (k,):
+            assert project_progress(lats, lons, cumulative, lat, lon, seg_hint=hint, search_ahead=3) == pytest.approx(full)
+
+
+def test_unknown_removed_and_evicted_trips():
+    req = _plan_req()
+    plan = compute_plan(req)
+    store = CorridorPlanStore(max_trips=2, conflicts=JunctionConflictIndex(), scheduler=PreemptionScheduler())
+    assert store.update("T1", 100) is None
+    for tid in ("T1", "T2", "T3"):
+        store.put(tid, req, plan)
+    assert store.response("T1") is None  # least recently used, evicted
+    store.remove("T2")
+    assert store.response("T2") is None
+    assert store.response("T3") is not None
+    assert not store.conflicts.conflicts("T1") and not store.conflicts.conflicts("T2")
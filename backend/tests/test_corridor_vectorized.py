@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from app.schemas.corridor import CorridorPlanRequest
+from app.services.corridor_planner import (
+    _angle_change,
+    _bearing,
+    _haversine,
+    compute_route_distances,
+    plan_corridor,
+    plan_corridor_scalar,
+    route_geometry_np,
+)
+
+
+def _route(rng, n):
+    kind = rng.integers(3)
+    if kind == 0:  # city grid: right-angle turns
+        steps = rng.choice([[1, 0], [0, 1], [-1, 0], [0, -1]], size=n) * 0.0007
+    elif kind == 1:  # winding: any heading change
+        heading = np.cumsum(rng.normal(0, 40, n))
+        steps = 0.0006 * np.column_stack([np.cos(np.radians(heading)), np.sin(np.radians(heading))])
+    else:  # straight with GPS noise and repeated points
+        steps = np.tile([0.0005, 0.0002], (n, 1)) + rng.normal(0, 0.00005, (n, 2))
+        steps[rng.random(n) < 0.1] = 0.0
+    pts = np.array([12.9, 77.5]) + np.cumsum(steps, axis=0)
+    return pts[:, 0], pts[:, 1]
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_vectorized_planner_matches_the_scalar_one(seed):
+    rng = np.random.default_rng(seed)
+    lats, lons = _route(rng, int(rng.integers(3, 400)))
+    req = CorridorPlanRequest(
+        trip_id="T1",
+        route_coords=[v for p in zip(lats.tolist(), lons.tolist()) for v in p],
+        final_eta_seconds=int(rng.integers(60, 3000)),
+        max_junctions=int(rng.integers(5, 81)),
+        min_spacing_m=int(rng.integers(50, 800)),
+        turn_angle_threshold_deg=float(rng.choice([35.0, 60.0, rng.uniform(10, 120)])),
+        window_buffer_seconds=int(rng.integers(5, 181)),
+    )
+    assert plan_corridor(req).model_dump() == plan_corridor_scalar(req).model_dump()
+
+
+def test_route_geometry_matches_the_scalar_helpers():
+    rng = np.random.default_rng(99)
+    lats, lons = _route(rng, 300)
+    cumulative, bearings, turns = route_geometry_np(lats, lons)
+
+    la, lo = lats.tolist(), lons.tolist()
+    want_cum, total = compute_route_distances(la, lo)
+    np.testing.assert_allclose(cumulative, want_cum, rtol=1e-12, atol=1e-9)
+    assert cumulative[-1] == pytest.approx(total)
+    want_b = [_bearing(la[i], lo[i], la[i + 1], lo[i + 1]) for i in range(len(la) - 1)]
+    np.testing.assert_allclose(bearings, want_b, rtol=0, atol=1e-9)
+    want_t = [_angle_change(want_b[i], want_b[i + 1]) for i in range(len(want_b) - 1)]
+    np.testing.assert_allclose(turns, want_t, rtol=0, atol=1e-9)
+    assert _haversine(la[0], lo[0], la[1], lo[1]) == pytest.approx(cumulative[1])
@@ -0,0 +1,73 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from app.realtime import encoding
+from app.realtime.encoding import EncodedFrame, encode_frame, encode_json, encoder_stats
+from app.realtime.ws_manager import TripWSManager
+
+PAYLOAD = {"trip_id": "T1", "at": datetime(2024, 5, 1, 10, 30, 15, 250000), "eta": 42, "ok": True, "name": "Hôpital"}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_both_backends_encode_the_same_document(monkeypatch, use_orjson):
+    if use_orjson and encoding.orjson is None:
+        pytest.skip("orjson not installed")
+    if not use_orjson:
+        monkeypatch.setattr(encoding, "orjson", None)
+    assert json.loads(encode_json(PAYLOAD)) == {**PAYLOAD, "at": "2024-05-01T10:30:15.250000"}
+
+
+def test_encode_frame_passes_frames_through():
+    frame = encode_frame(PAYLOAD)
+    assert encode_frame(frame) is frame
+
+
+class RecordingWS:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        pass
+
+
+def test_broadcast_encodes_once_for_every_client():
+    async def run():
+        mgr = TripWSManager()
+        clients = [RecordingWS() for _ in range(5)]
+        for ws in clients:
+            await mgr.connect("T1", ws)
+        before = encoder_stats()["encodes"]
+        await mgr.broadcast("T1", PAYLOAD)
+        await asyncio.sleep(0.01)
+        return clients, encoder_stats()["encodes"] - before
+
+    clients, encodes = asyncio.run(run())
+    assert encodes == 1
+    first = clients[0].sent[0]
+    assert all(ws.sent[0] is first for ws in clients)
+
+
+def test_pre_encoded_frames_are_not_encoded_again():
+    async def run():
+        mgr = TripWSManager()
+        ws = RecordingWS()
+        await mgr.connect("T1", ws)
+        frame = EncodedFrame('{"v":1}')
+        before = encoder_stats()["encodes"]
+        await mgr.broadcast("T1", frame)
+        await mgr.send("T1", ws, frame)
+        await asyncio.sleep(0.01)
+        return ws, encoder_stats()["encodes"] - before
+
+    ws, encodes = asyncio.run(run())
+    assert encodes == 0
+    assert ws.sent == ['{"v":1}', '{"v":1}']
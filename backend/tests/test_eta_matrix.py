@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.services import eta_matrix as em
+from app.services.osrm_service import OSRMError
+
+
+def _dur(s, d):
+    return round(abs(s[0] - d[0]) * 1000 + abs(s[1] - d[1]) * 10, 3)
+
+
+class FakeTable:
+    """get_table_driving stand-in: duration/distance from the coordinates, None for unreachable pairs."""
+
+    def __init__(self, unreachable=(), fail=False):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.unreachable = set(unreachable)
+        self.fail = fail
+
+    async def __call__(self, src, dst):
+        self.calls.append((len(src), len(dst)))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        if self.fail:
+            raise OSRMError("OSRM down")
+        return {
+            "durations": [[None if (s, d) in self.unreachable else _dur(s, d) for d in dst] for s in src],
+            "distances": [[None if (s, d) in self.unreachable else _dur(s, d) * 10 for d in dst] for s in src],
+        }
+
+
+SOURCES = [(12.0 + i * 0.01, 77.0 + i * 0.02) for i in range(37)]
+DESTS = [(13.0 + j * 0.03, 78.0 - j * 0.01) for j in range(11)]
+
+
+@pytest.mark.parametrize("max_coords", [100, 20, 15, 7, 2])
+def test_chunked_matrix_matches_one_call_per_pair(monkeypatch, max_coords):
+    fake = FakeTable(unreachable={(SOURCES[3], DESTS[5])})
+    monkeypatch.setattr(em, "get_table_driving", fake)
+    durations, distances = asyncio.run(em.table_matrix(SOURCES, DESTS, max_coords=max_coords, concurrency=3))
+
+    for i, s in enumerate(SOURCES):
+        for j, d in enumerate(DESTS):
+            want = None if (i, j) == (3, 5) else _dur(s, d)
+            assert durations[i][j] == want
+            assert distances[i][j] == (None if want is None else want * 10)
+    assert all(ns + nd <= max(2, max_coords) for ns, nd in fake.calls)
+    assert sum(ns * nd for ns, nd in fake.calls) == len(SOURCES) * len(DESTS)
+    assert fake.max_in_flight <= 3
+
+
+def test_small_matrix_is_one_table_call(monkeypatch):
+    fake = FakeTable()
+    monkeypatch.setattr(em, "get_table_driving", fake)
+    asyncio.run(em.table_matrix(SOURCES[:5], DESTS[:3]))
+    assert fake.calls == [(5, 3)]
+
+
+def test_chunk_sizes_keep_few_destinations_together():
+    assert em._chunk_sizes(500, 8, 100) == (92, 8)
+    assert em._chunk_sizes(8, 500, 100) == (8, 92)
+    assert em._chunk_sizes(500, 500, 100) == (50, 50)
+    assert em._chunk_sizes(10, 10, 100) == (10, 10)
+
+
+def test_empty_inputs_make_no_calls(monkeypatch):
+    fake = FakeTable()
+    monkeypatch.setattr(em, "get_table_driving", fake)
+    assert asyncio.run(em.table_matrix([], DESTS)) == ([], [])
+    assert asyncio.run(em.table_matrix(SOURCES[:2], [])) == ([[], []], [[], []])
+    assert fake.calls == []
+
+
+def test_a_failed_block_fails_the_matrix(monkeypatch):
+    monkeypatch.setattr(em, "get_table_driving", FakeTable(fail=True))
+    with pytest.raises(OSRMError):
+        asyncio.run(em.table_matrix(SOURCES, DESTS, max_coords=10))
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.gps import gps_batch
+from app.db import Base
+from app.models import GPSPoint, Trip
+from app.schemas import GPSBatchIn
+from app.services.latest_cache import latest_cache
+
+
+def _session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.utcnow()
+    db.add(Trip(trip_id="GB1", ambulance_id="A", destination_hospital_id="H", started_at=now, updated_at=now))
+    db.commit()
+    return db
+
+
+def test_batch_mixes_aware_and_naive_timestamps():
+    db = _session()
+    t0 = datetime(2026, 1, 1, 10, 0, 0)
+    fixes = [
+        # 10:00:20 UTC, sent with a +05:30 offset
+        {"trip_id": "GB1", "lat": 12.93, "lon": 77.5, "timestamp": "2026-01-01T15:30:20+05:30"},
+        {"trip_id": "GB1", "lat": 12.91, "lon": 77.5, "timestamp": (t0 + timedelta(seconds=10)).isoformat()},
+        {"trip_id": "GB1", "lat": 12.90, "lon": 77.5, "timestamp": "2026-01-01T10:00:00Z"},
+    ]
+    out = gps_batch(GPSBatchIn(fixes=fixes), db)
+    assert out.accepted == 3
+
+    stored = db.execute(select(GPSPoint.lat, GPSPoint.recorded_at).order_by(GPSPoint.id)).all()
+    # Inserted in recorded order, all as naive UTC
+    assert [r.lat for r in stored] == [12.90, 12.91, 12.93]
+    assert [r.recorded_at for r in stored] == [t0, t0 + timedelta(seconds=10), t0 + timedelta(seconds=20)]
+
+    st = latest_cache.get("GB1")
+    assert (st.lat, st.recorded_at) == (12.93, t0 + timedelta(seconds=20))
+    assert st.recorded_at.tzinfo is None
+    latest_cache.evict("GB1")
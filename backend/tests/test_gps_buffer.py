@@ -0,0 +1,151 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import Base
+from app.models import GPSPoint, Trip
+from app.services.gps_buffer import GPSWriteBuffer
+
+
+class _DB:
+    def __init__(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        self.sessions = sessionmaker(bind=engine)
+        self.down = False
+        with self.sessions() as db:
+            now = datetime.utcnow()
+            db.add_all(
+                Trip(trip_id=t, ambulance_id="A", destination_hospital_id="H", started_at=now, updated_at=now)
+                for t in ("T1", "T2")
+            )
+            db.commit()
+
+    def __call__(self):
+        if self.down:
+            raise ConnectionError("db down")
+        return self.sessions()
+
+    def points(self):
+        with self.sessions() as db:
+            return db.scalar(select(func.count()).select_from(GPSPoint))
+
+
+@pytest.fixture
+def db():
+    return _DB()
+
+
+def _buffer(db, **kw):
+    buf = GPSWriteBuffer(db, flush_interval_ms=1, max_retries=3, **kw)
+    buf._thread = threading.current_thread()  # keeps put() from starting the flusher; tests flush by hand
+    return buf
+
+
+def _put(buf, trip_id, lat=12.9):
+    now = datetime.utcnow()
+    buf.put(trip_id, lat, 77.5, 5.0, now, now)
+
+
+def test_flush_writes_batch(db):
+    buf = _buffer(db)
+    for _ in range(5):
+        _put(buf, "T1")
+    _put(buf, "T2")
+    assert buf.flush() == 6
+    assert db.points() == 6
+    assert buf.stats()["buffered_points"] == 0
+
+
+def test_poison_row_is_dead_lettered_after_retries(db):
+    buf = _buffer(db)
+    for k in range(10):
+        _put(buf, "T1" if k % 2 else "T2", lat=None if k == 7 else 12.9)
+
+    assert buf.flush() == 0
+    assert buf.flush() == 0
+    assert db.points() == 0
+    assert buf.stats()["pending_points"] == 10
+
+    # Third failure in a row: the batch is bisected and only the bad row is dropped.
+    assert buf.flush() == 9
+    assert db.points() == 9
+    st = buf.stats()
+    assert st["dead_lettered"] == 1
+    assert st["flush_errors"] == 3
+    assert st["buffered_points"] == 0
+
+    _put(buf, "T1")
+    assert buf.flush() == 1
+    assert db.points() == 10
+
+
+def test_db_outage_keeps_batch_queued(db):
+    buf = _buffer(db)
+    for _ in range(4):
+        _put(buf, "T1")
+
+    db.down = True
+    for _ in range(7):
+        assert buf.flush() == 0
+    st = buf.stats()
+    assert st["dead_lettered"] == 0
+    assert st["pending_points"] == 4
+
+    db.down = False
+    assert buf.flush() == 4
+    assert db.points() == 4
+
+
+def test_outage_during_isolation_requeues_the_rest(db):
+    buf = _buffer(db)
+    for k in range(8):
+        _put(buf, "T1", lat=None if k == 0 else 12.9)
+    buf.flush()
+    buf.flush()
+
+    # Third rejected flush starts bisecting; the DB goes away after the first chunk.
+    real_write = buf._write
+    writes = []
+
+    def write(rows, touched):
+        writes.append(len(rows))
+        if len(writes) > 2:
+            db.down = True
+        return real_write(rows, touched)
+
+    buf._write = write
+    buf.flush()
+    st = buf.stats()
+    assert st["dead_lettered"] == 0
+    assert st["pending_points"] + db.points() == 8
+
+    db.down = False
+    buf._write = real_write
+    for _ in range(3):
+        buf.flush()
+    assert db.points() == 7
+    assert buf.stats()["dead_lettered"] == 1
+
+
+def test_backoff_does_not_hold_the_flush_lock(db):
+    buf = _buffer(db)
+    buf.flush_interval_sec = 0.5
+    _put(buf, "T1")
+    db.down = True
+    t = threading.Thread(target=buf.flush)
+    t.start()
+    time.sleep(0.1)
+    # flush() is backing off; stop() / another flush can take the lock meanwhile.
+    assert buf._flush_lock.acquire(timeout=0.1)
+    buf._flush_lock.release()
+    buf._stopping = True
+    with buf._cond:
+        buf._cond.notify_all()
+    t.join(timeout=1)
+    assert not t.is_alive()
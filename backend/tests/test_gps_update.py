@@ -0,0 +1,80 @@
+import threading
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import gps as gps_api
+from app.db import Base
+from app.models import Trip, TripStatus
+from app.schemas import GPSBatchIn, GPSUpdateIn
+from app.schemas.corridor import CorridorPlanRequest
+from app.services.corridor_planner import compute_plan
+from app.services.corridor_store import corridor_store
+from app.services.gps_buffer import GPSWriteBuffer
+from app.services.latest_cache import latest_cache
+
+DEST = (12.95, 77.6)
+
+
+def _sessions():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    sessions = sessionmaker(bind=engine)
+    with sessions() as db:
+        now = datetime.utcnow()
+        db.add(Trip(trip_id="GU1", ambulance_id="A", destination_hospital_id="H", started_at=now, updated_at=now,
+                    dest_lat=DEST[0], dest_lon=DEST[1]))
+        db.commit()
+    return sessions
+
+
+def _full_buffer(sessions):
+    buf = GPSWriteBuffer(sessions, flush_max_points=1, max_points=1, put_timeout_sec=0.0)
+    buf._thread = threading.current_thread()  # no flusher: the buffer stays full
+    now = datetime.utcnow()
+    buf.put("GU1", 12.9, 77.5, 5.0, now, now)
+    return buf
+
+
+def test_full_buffer_leaves_trip_status_untouched(monkeypatch):
+    sessions = _sessions()
+    monkeypatch.setattr(gps_api, "GPS_WRITE_BEHIND", True)
+    monkeypatch.setattr(gps_api, "gps_buffer", _full_buffer(sessions))
+
+    # At the destination and stopped: would mark the trip ARRIVED.
+    fix = GPSUpdateIn(trip_id="GU1", lat=DEST[0], lon=DEST[1], speed_mps=0.0)
+    with sessions() as db:
+        with pytest.raises(HTTPException) as exc:
+            gps_api.gps_update(fix, db)
+        assert exc.value.status_code == 503
+    with sessions() as db:
+        assert db.get(Trip, "GU1").status == TripStatus.EN_ROUTE
+
+
+def _plan_corridor(trip_id):
+    req = CorridorPlanRequest(
+        trip_id=trip_id, route_coords=[12.9, 77.5, 12.92, 77.5, 12.92, 77.55, DEST[0], DEST[1]], final_eta_seconds=600
+    )
+    corridor_store.put(trip_id, req, compute_plan(req))
+    assert corridor_store.response(trip_id).junctions
+    assert corridor_store.scheduler.pending(trip_id)
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_gps_arrival_tears_down_the_corridor(batch):
+    sessions = _sessions()
+    _plan_corridor("GU1")
+    fix = {"trip_id": "GU1", "lat": DEST[0], "lon": DEST[1], "speed_mps": 0.0}
+    with sessions() as db:
+        if batch:
+            gps_api.gps_batch(GPSBatchIn(fixes=[fix]), db)
+        else:
+            assert gps_api.gps_update(GPSUpdateIn(**fix), db).status == "ARRIVED"
+    assert corridor_store.response("GU1") is None
+    assert corridor_store.scheduler.pending("GU1") == []
+    assert latest_cache.get("GU1").status == "ARRIVED"
+    latest_cache.evict("GU1")
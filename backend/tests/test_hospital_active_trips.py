@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.hospital import list_active_trip_items
+from app.db import Base
+from app.models import Trip, TripStatus
+
+
+def _session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.utcnow()
+    for k in range(3):
+        db.add(Trip(trip_id=f"HA{k}", ambulance_id="A", destination_hospital_id="H1", started_at=now,
+                    updated_at=now - timedelta(seconds=k)))
+    db.add(Trip(trip_id="HA9", ambulance_id="A", destination_hospital_id="H1", status=TripStatus.ARRIVED,
+                started_at=now, updated_at=now))
+    db.commit()
+    return db
+
+
+def test_total_on_pages_within_and_past_the_end():
+    db = _session()
+    items, total = list_active_trip_items(db, "H1", limit=2, offset=0)
+    assert ([i.trip_id for i in items], total) == (["HA0", "HA1"], 3)
+    items, total = list_active_trip_items(db, "H1", limit=2, offset=2)
+    assert ([i.trip_id for i in items], total) == (["HA2"], 3)
+    assert list_active_trip_items(db, "H1", limit=2, offset=3) == ([], 3)
+    assert list_active_trip_items(db, "H1", limit=2, offset=10) == ([], 3)
+    assert list_active_trip_items(db, "H2", limit=2, offset=0) == ([], 0)
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import models
+from app.db.session import Base
+from app.ml.predictor import Predictor
+from app.services.geo import haversine_m
+from app.services.hospital_index import HospitalIndex
+
+
+def _session(points):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    for i, (lat, lon) in enumerate(points):
+        db.add(models.Hospital(id=f"H{i:03d}", name=f"Hospital {i}", lat=lat, lon=lon))
+    db.commit()
+    return db
+
+
+def _hospitals():
+    rng = np.random.default_rng(7)
+    city = np.column_stack([rng.normal(12.97, 0.05, 150), rng.normal(77.59, 0.05, 150)])
+    region = np.column_stack([rng.uniform(8.0, 18.0, 50), rng.uniform(72.0, 82.0, 50)])
+    return [tuple(map(float, p)) for p in np.vstack([city, region])]
+
+
+@pytest.mark.parametrize("cell_km,max_rings", [(5, 8), (1, 2), (50, 8)])
+def test_nearest_matches_brute_force(cell_km, max_rings):
+    points = _hospitals()
+    index = HospitalIndex(cell_km=cell_km, max_rings=max_rings)
+    index.load(_session(points))
+
+    rng = np.random.default_rng(11)
+    queries = [(12.97 + rng.normal(0, 0.05), 77.59 + rng.normal(0, 0.05)) for _ in range(20)]
+    queries += [(float(rng.uniform(8, 18)), float(rng.uniform(72, 82))) for _ in range(20)]
+    for lat, lon in queries:
+        for k in (1, 5, 20):
+            got = index.nearest(lat, lon, k)
+            want = sorted(haversine_m(lat, lon, hl, ho) for hl, ho in points)[:k]
+            assert [d for *_, d in got] == pytest.approx(want, rel=1e-9, abs=1e-6)
+            for hid, _, hl, ho, d in got:
+                assert points[int(hid[1:])] == (hl, ho)
+
+
+def test_k_larger_than_the_table_returns_everything():
+    points = _hospitals()[:10]
+    index = HospitalIndex()
+    index.load(_session(points))
+    assert len(index.nearest(12.9, 77.5, 50)) == 10
+    assert index.nearest(12.9, 77.5, 0) == []
+
+
+def test_empty_table():
+    index = HospitalIndex()
+    index.load(_session([]))
+    assert index.nearest(12.9, 77.5, 3) == []
+
+
+def test_batched_prediction_matches_row_by_row():
+    cols = ["distance_km", "junction_count"]
+    store = SimpleNamespace(
+        is_loaded=lambda: True,
+        schema={"model_features": cols},
+        rf_model=SimpleNamespace(predict=lambda X: X @ np.array([30.0, 12.0]) - 100.0),
+    )
+    predictor = Predictor(store)
+    rows = [{"distance_km": d, "junction_count": j} for d, j in [(0.5, 0), (3.0, 4), (12.0, 20), (40.0, 60)]]
+    assert predictor.predict_delay_sec_batch(rows) == [predictor.predict_delay_sec(r) for r in rows]
+    assert predictor.predict_delay_sec_batch([]) == []
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.services.isochrones import GridSpec, IsochroneStore, _fill_buckets, _parse_bucket, write_isochrones
+
+GRID = GridSpec(12.90, 77.50, 12.95, 77.56, 1000.0)
+BUCKETS = [(0, 7, 1.0), (7, 11, 1.5), (11, 24, 1.0)]
+
+
+def _free_flow(n_hospitals):
+    # seconds = 100 * hospital + 10 * row + col, one unreachable cell per hospital
+    r, c = np.meshgrid(np.arange(GRID.rows), np.arange(GRID.cols), indexing="ij")
+    ff = np.stack([100.0 * k + 10.0 * r + c for k in range(n_hospitals)]).astype(np.float32)
+    ff[:, 0, 1] = np.nan
+    return ff
+
+
+def _store(tmp_path, ids=("H1", "H/2")):
+    write_isochrones(str(tmp_path), GRID, BUCKETS, list(ids), _free_flow(len(ids)))
+    return IsochroneStore(str(tmp_path))
+
+
+def _centre(row, col):
+    return GRID.min_lat + (row + 0.5) * GRID.dlat, GRID.min_lon + (col + 0.5) * GRID.dlon
+
+
+def test_lookup_reads_the_cell_and_time_bucket(tmp_path):
+    store = _store(tmp_path)
+    lat, lon = _centre(3, 2)
+    assert store.baseline_eta("H1", lat, lon, datetime(2024, 1, 1, 5)) == 32.0
+    assert store.baseline_eta("H1", lat, lon, datetime(2024, 1, 1, 8, 30)) == 48.0
+    assert store.baseline_eta("H/2", lat, lon, datetime(2024, 1, 1, 12)) == 132.0
+    assert store.bucket_label(datetime(2024, 1, 1, 8)) == "07-11"
+
+
+def test_cell_centres_match_cell_of():
+    lats, lons = GRID.cell_centres()
+    for k, (la, lo) in enumerate(zip(lats.tolist(), lons.tolist())):
+        assert GRID.cell_of(la, lo) == divmod(k, GRID.cols)
+
+
+def test_misses_are_none(tmp_path):
+    store = _store(tmp_path)
+    when = datetime(2024, 1, 1, 12)
+    assert store.baseline_eta("H1", *_centre(0, 1), when) is None  # unreachable
+    assert store.baseline_eta("H9", *_centre(1, 1), when) is None  # not precomputed
+    assert store.baseline_eta("H1", 12.80, 77.52, when) is None  # outside the grid
+    assert store.baseline_eta("H1", 12.92, 77.70, when) is None
+    assert store.stats()["hits"] == 0
+    assert IsochroneStore(str(tmp_path / "missing")).baseline_eta("H1", *_centre(1, 1), when) is None
+
+
+def test_reload_picks_up_a_new_build(tmp_path):
+    store = _store(tmp_path, ids=("H1",))
+    lat, lon = _centre(2, 2)
+    when = datetime(2024, 1, 1, 12)
+    assert store.baseline_eta("H1", lat, lon, when) == 22.0
+    write_isochrones(str(tmp_path), GRID, [(0, 24, 2.0)], ["H1"], _free_flow(1))
+    store.reload()
+    assert store.baseline_eta("H1", lat, lon, when) == 44.0
+
+
+def test_bucket_specs_fill_the_day():
+    assert _parse_bucket("7-11:1.35") == (7, 11, 1.35)
+    assert _parse_bucket("17-21") == (17, 21, 1.0)
+    assert _fill_buckets([(17, 21, 1.4), (7, 11, 1.35)]) == [
+        (0, 7, 1.0), (7, 11, 1.35), (11, 17, 1.0), (17, 21, 1.4), (21, 24, 1.0),
+    ]
+    with pytest.raises(SystemExit):
+        _fill_buckets([(7, 11, 1.0), (10, 12, 1.0)])
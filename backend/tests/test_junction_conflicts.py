@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from app.services.geo import haversine_m
+from app.services.junction_conflicts import JunctionClaim, JunctionConflictIndex
+from app.utils.interval_tree import IntervalTree
+
+# A few shared intersections (trips cross them with small GPS offsets) plus scattered ones
+HOTSPOTS = [(12.9716, 77.5946), (12.9352, 77.6245), (13.0358, 77.5970), (60.17, 24.94)]
+
+
+def _claims(rng, trip_id, n):
+    out = []
+    for k in range(n):
+        if rng.random() < 0.6:
+            lat, lon = rng.choice(HOTSPOTS)
+            lat, lon = lat + rng.gauss(0, 0.0002), lon + rng.gauss(0, 0.0003)
+        else:
+            lat, lon = 12.8 + rng.random() * 0.4, 77.4 + rng.random() * 0.4
+        start = rng.uniform(0, 600)
+        out.append(JunctionClaim(trip_id, k + 1, lat, lon, start, start + rng.uniform(0, 90)))
+    return out
+
+
+def _brute_conflicts(all_claims, trip_id, radius_m):
+    out = set()
+    for own in all_claims.get(trip_id, []):
+        for other_trip, others in all_claims.items():
+            if other_trip == trip_id:
+                continue
+            for o in others:
+                if o.start <= own.end and own.start <= o.end and haversine_m(own.lat, own.lon, o.lat, o.lon) <= radius_m:
+                    out.add((own.index, o.trip_id, o.index, max(own.start, o.start), min(own.end, o.end)))
+    return out
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_conflicts_match_brute_force(seed):
+    rng = random.Random(seed)
+    index = JunctionConflictIndex(radius_m=40.0)
+    current = {}
+    for step in range(120):
+        trip_id = f"T{rng.randrange(12)}"
+        if rng.random() < 0.15:
+            index.remove(trip_id)
+            current.pop(trip_id, None)
+            continue
+        claims = _claims(rng, trip_id, rng.randrange(0, 12))
+        got = index.replace(trip_id, claims)
+        current[trip_id] = claims
+        want = _brute_conflicts(current, trip_id, 40.0)
+        assert {(c.index, c.other_trip_id, c.other_index, c.overlap_start, c.overlap_end) for c in got} == want
+
+    for trip_id in current:
+        got = index.conflicts(trip_id)
+        assert {(c.index, c.other_trip_id, c.other_index, c.overlap_start, c.overlap_end) for c in got} == \
+            _brute_conflicts(current, trip_id, 40.0)
+    assert index.stats()["windows"] == sum(len(c) for c in current.values())
+
+
+def test_claims_near_the_pole_span_several_cells():
+    index = JunctionConflictIndex(radius_m=40.0)
+    # 35 m apart east-west at 70N: several longitude cells
+    a = JunctionClaim("A", 1, 70.0, 25.0, 0.0, 100.0)
+    b = JunctionClaim("B", 1, 70.0, 25.0 + 35.0 / (111_320.0 * 0.342), 50.0, 150.0)
+    index.replace("A", [a])
+    (c,) = index.replace("B", [b])
+    assert (c.other_trip_id, c.overlap_start, c.overlap_end) == ("A", 50.0, 100.0)
+    assert [cl.trip_id for cl, _ in index.claims(70.0, 25.0, 0.0, 10.0)] == ["A"]
+    assert index.claims(70.0, 25.0, 0.0, 10.0, exclude_trip="A") == []
+
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(42)
+    tree = IntervalTree(seed=1)
+    live = {}
+    for _ in range(2000):
+        if live and rng.random() < 0.35:
+            key = rng.choice(list(live))
+            assert tree.remove(key)
+            del live[key]
+        else:
+            s = rng.uniform(0, 1000)
+            e = s + rng.expovariate(1 / 30)
+            live[tree.insert(s, e, len(live))] = (s, e)
+        if rng.random() < 0.1:
+            lo = rng.uniform(0, 1000)
+            hi = lo + rng.uniform(0, 50)
+            got = sorted((s, e) for s, e, _ in tree.overlap(lo, hi))
+            assert got == sorted((s, e) for s, e in live.values() if s <= hi and lo <= e)
+    assert len(tree) == len(live)
+    assert not tree.remove((0.0, 0.0, -1))
@@ -0,0 +1,16 @@
+from datetime import datetime, timedelta, timezone
+
+from app.services.latest_cache import LatestStateCache
+
+
+def test_update_orders_aware_and_naive_fixes():
+    cache = LatestStateCache()
+    t0 = datetime(2026, 1, 1, 10, 0, 0)
+    cache.update("T1", 12.90, 77.5, 5.0, t0)
+    st = cache.update("T1", 12.91, 77.5, 5.0, datetime(2026, 1, 1, 15, 30, 10, tzinfo=timezone(timedelta(hours=5, minutes=30))))
+    assert (st.lat, st.recorded_at) == (12.91, t0 + timedelta(seconds=10))
+
+    # Late fix (09:59:59 UTC, sent with an offset): position stays, status moves on.
+    st = cache.update("T1", 12.80, 77.5, 5.0, datetime(2026, 1, 1, 9, 59, 59, tzinfo=timezone.utc), "NEAR_ARRIVAL")
+    assert (st.lat, st.status) == (12.91, "NEAR_ARRIVAL")
+    assert cache.get("T1").recorded_at.tzinfo is None
@@ -0,0 +1,117 @@
+import heapq
+import math
+
+import numpy as np
+import pytest
+
+from app.services.geo import haversine_m
+from app.services.offline_router import OfflineRouteError, OfflineRouter, save_graph
+
+SIDE = 14
+
+
+def _grid(tmp_path, seed=3):
+    """SIDE x SIDE street grid (~110 m blocks), random speeds, a few one-way and missing streets."""
+    rng = np.random.default_rng(seed)
+    ii, jj = np.meshgrid(np.arange(SIDE), np.arange(SIDE), indexing="ij")
+    lat = 12.90 + ii.ravel() * 0.001 + rng.normal(0, 0.0001, SIDE * SIDE)
+    lon = 77.50 + jj.ravel() * 0.001 + rng.normal(0, 0.0001, SIDE * SIDE)
+
+    src, dst = [], []
+    for i in range(SIDE):
+        for j in range(SIDE):
+            u = i * SIDE + j
+            for v in ([u + 1] if j + 1 < SIDE else []) + ([u + SIDE] if i + 1 < SIDE else []):
+                r = rng.random()
+                if r < 0.08:
+                    continue  # no street
+                src.append(u), dst.append(v)
+                if r > 0.15:  # two-way
+                    src.append(v), dst.append(u)
+    src, dst = np.array(src), np.array(dst)
+    length = np.array([haversine_m(lat[a], lon[a], lat[b], lon[b]) for a, b in zip(src, dst)])
+    speed = rng.uniform(4.0, 20.0, len(src))
+    save_graph(str(tmp_path), lat, lon, src, dst, length, length / speed)
+    router = OfflineRouter(str(tmp_path))
+    assert router.available
+    return router
+
+
+def _dijkstra(router, source):
+    best = [math.inf] * router.n_nodes
+    best[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > best[u]:
+            continue
+        for e in range(int(router.indptr[u]), int(router.indptr[u + 1])):
+            v, nd = int(router.indices[e]), d + float(router.edge_time_s[e])
+            if nd < best[v]:
+                best[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return best
+
+
+def _edge(router, u, v):
+    for e in range(int(router.indptr[u]), int(router.indptr[u + 1])):
+        if int(router.indices[e]) == v:
+            return e
+    raise AssertionError(f"no edge {u}->{v}")
+
+
+def test_a_star_is_as_fast_as_dijkstra(tmp_path):
+    router = _grid(tmp_path)
+    rng = np.random.default_rng(5)
+    for source in rng.choice(router.n_nodes, 8, replace=False).tolist():
+        best = _dijkstra(router, source)
+        for target in rng.choice(router.n_nodes, 10, replace=False).tolist():
+            if math.isinf(best[target]):
+                with pytest.raises(OfflineRouteError):
+                    router.shortest_path(source, target)
+                continue
+            path, length_m, time_s, _ = router.shortest_path(source, target)
+            assert time_s == pytest.approx(best[target], rel=1e-9)
+            assert path[0] == source and path[-1] == target
+            edges = [_edge(router, u, v) for u, v in zip(path, path[1:])]
+            assert sum(float(router.edge_time_s[e]) for e in edges) == pytest.approx(time_s, rel=1e-9)
+            assert sum(float(router.edge_length_m[e]) for e in edges) == pytest.approx(length_m, rel=1e-9)
+
+
+def test_times_to_matches_dijkstra_from_every_node(tmp_path):
+    router = _grid(tmp_path, seed=9)
+    target = router.n_nodes // 2
+    times = router.times_to(target)
+    for source in range(0, router.n_nodes, 7):
+        want = _dijkstra(router, source)[target]
+        assert times[source] == pytest.approx(want, rel=1e-9) if math.isfinite(want) else math.isinf(times[source])
+
+
+def test_snap_matches_brute_force(tmp_path):
+    router = _grid(tmp_path)
+    rng = np.random.default_rng(1)
+    for _ in range(30):
+        lat, lon = 12.90 + rng.uniform(-0.002, 0.015), 77.50 + rng.uniform(-0.002, 0.015)
+        node, d = router.snap(lat, lon)
+        brute = min(haversine_m(lat, lon, float(a), float(b)) for a, b in zip(router.node_lat, router.node_lon))
+        assert d == pytest.approx(brute)
+    with pytest.raises(OfflineRouteError):
+        router.snap(13.5, 77.5)
+
+
+def test_route_driving_has_the_osrm_shape(tmp_path):
+    router = _grid(tmp_path)
+    data = router.route_driving(12.9001, 77.5001, 12.911, 77.511)
+    route = data["routes"][0]
+    assert data["fallback"] == "offline"
+    coords = route["geometry"]["coordinates"]
+    assert coords[0] == [77.5001, 12.9001] and coords[-1] == [77.511, 12.911]
+    assert route["distance"] > haversine_m(12.9001, 77.5001, 12.911, 77.511)
+    assert route["duration"] > 0
+
+
+def test_missing_graph_is_unavailable(tmp_path):
+    router = OfflineRouter(str(tmp_path / "nope"))
+    assert not router.available
+    with pytest.raises(OfflineRouteError):
+        router.route_driving(12.9, 77.5, 12.91, 77.51)
@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import osrm_service
+from app.services.osrm_service import CircuitBreaker, OSRMClient, OSRMError, OSRMUnavailable
+
+
+def _client(fake, **kw) -> OSRMClient:
+    kw.setdefault("retry_backoff_ms", 10)
+    return OSRMClient(fake.url, **kw)
+
+
+async def _route(client: OSRMClient, **kw):
+    return await client.route_driving(12.9, 77.5, 12.95, 77.6, **kw)
+
+
+def test_keepalive_reuses_connection(fake_osrm):
+    async def run():
+        client = _client(fake_osrm)
+        try:
+            for _ in range(5):
+                data = await _route(client)
+                assert data["routes"][0]["duration"] == 120.0
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+    assert fake_osrm.calls == 5
+    assert len(fake_osrm.connections) == 1
+
+
+def test_deadline_covers_all_attempts(fake_osrm):
+    fake_osrm.delay = 0.5
+
+    async def run():
+        client = _client(fake_osrm, retries=5)
+        try:
+            t0 = time.monotonic()
+            with pytest.raises(OSRMError):
+                await _route(client, timeout_sec=0.3)
+            return time.monotonic() - t0
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) < 0.45
+
+
+def test_retries_with_jittered_backoff(fake_osrm, monkeypatch):
+    fake_osrm.fail = 2
+    jitter = []
+    real_uniform = osrm_service.random.uniform
+
+    def uniform(a, b):
+        jitter.append((a, b))
+        return real_uniform(a, b)
+
+    monkeypatch.setattr(osrm_service.random, "uniform", uniform)
+
+    async def run():
+        client = _client(fake_osrm, retries=2, retry_backoff_ms=20)
+        try:
+            await _route(client)
+            return client.retried
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == 2
+    assert fake_osrm.calls == 3
+    assert jitter == [(0.5, 1.5), (0.5, 1.5)]
+
+
+def test_retries_exhausted_raise(fake_osrm):
+    fake_osrm.down = True
+
+    async def run():
+        client = _client(fake_osrm, retries=1)
+        try:
+            with pytest.raises(OSRMError):
+                await _route(client)
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+    assert fake_osrm.calls == 2
+
+
+def test_breaker_open_half_open_close(fake_osrm):
+    fake_osrm.down = True
+    breaker = CircuitBreaker(threshold=2, cooldown_sec=0.2)
+
+    async def run():
+        client = _client(fake_osrm, retries=0, breaker=breaker)
+        try:
+            for _ in range(2):
+                with pytest.raises(OSRMError):
+                    await _route(client)
+            assert breaker.state == CircuitBreaker.OPEN
+
+            calls = fake_osrm.calls
+            with pytest.raises(OSRMUnavailable):
+                await _route(client)
+            assert fake_osrm.calls == calls  # failed fast
+
+            await asyncio.sleep(0.25)
+            fake_osrm.down = False
+            fake_osrm.delay = 0.2
+            probe = asyncio.create_task(_route(client))
+            await asyncio.sleep(0.05)
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+            with pytest.raises(OSRMUnavailable):
+                await _route(client)  # only one probe at a time
+            await probe
+            assert breaker.state == CircuitBreaker.CLOSED
+
+            fake_osrm.delay = 0.0
+            await _route(client)
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+
+
+def test_failed_probe_reopens(fake_osrm):
+    fake_osrm.down = True
+    breaker = CircuitBreaker(threshold=1, cooldown_sec=0.1)
+
+    async def run():
+        client = _client(fake_osrm, retries=0, breaker=breaker)
+        try:
+            with pytest.raises(OSRMError):
+                await _route(client)
+            await asyncio.sleep(0.15)
+            with pytest.raises(OSRMError):
+                await _route(client)
+            assert breaker.state == CircuitBreaker.OPEN
+            with pytest.raises(OSRMUnavailable):
+                await _route(client)
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+
+
+def test_cancelled_probe_does_not_wedge_breaker(fake_osrm):
+    fake_osrm.down = True
+    breaker = CircuitBreaker(threshold=1, cooldown_sec=0.1)
+
+    async def run():
+        client = _client(fake_osrm, retries=0, breaker=breaker)
+        try:
+            with pytest.raises(OSRMError):
+                await _route(client)
+            await asyncio.sleep(0.15)
+
+            fake_osrm.down = False
+            fake_osrm.delay = 0.5
+            probe = asyncio.create_task(_route(client))
+            await asyncio.sleep(0.05)
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+
+            fake_osrm.delay = 0.0
+            await _route(client)  # next call probes instead of being rejected
+            assert breaker.state == CircuitBreaker.CLOSED
+        finally:
+            await client.close()
+
+    asyncio.run(run())
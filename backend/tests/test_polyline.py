@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.utils.polyline import decode_polyline, decode_polyline_arrays, encode_polyline, simplify_indices
+
+# Example from Google's encoded polyline algorithm format documentation
+GOOGLE = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+GOOGLE_ENCODED = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def _route(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = 12.9 + np.cumsum(rng.normal(0, 0.0005, n))
+    lons = 77.5 + np.cumsum(rng.normal(0, 0.0005, n))
+    return lats, lons
+
+
+def test_google_reference_example():
+    assert encode_polyline(GOOGLE) == GOOGLE_ENCODED
+    assert decode_polyline(GOOGLE_ENCODED) == GOOGLE
+
+
+@pytest.mark.parametrize("precision", [5, 6])
+def test_round_trip_within_precision(precision):
+    lats, lons = _route(500)
+    points = list(zip(lats.tolist(), lons.tolist()))
+    decoded = decode_polyline(encode_polyline(points, precision), precision)
+    assert len(decoded) == len(points)
+    half_unit = 0.5 / 10 ** precision + 1e-12
+    for (la, lo), (dla, dlo) in zip(points, decoded):
+        assert abs(la - dla) <= half_unit and abs(lo - dlo) <= half_unit
+
+
+@pytest.mark.parametrize("precision", [5, 6])
+def test_array_decoder_matches_the_scalar_one(precision):
+    lats, lons = _route(300, seed=4)
+    encoded = encode_polyline(list(zip(lats.tolist(), lons.tolist())), precision)
+    a_lats, a_lons = decode_polyline_arrays(encoded, precision)
+    want = decode_polyline(encoded, precision)
+    np.testing.assert_allclose(a_lats, [p[0] for p in want], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(a_lons, [p[1] for p in want], rtol=0, atol=1e-12)
+
+
+def test_bad_input_raises():
+    for bad in (GOOGLE_ENCODED[:-1], GOOGLE_ENCODED[:3]):
+        with pytest.raises(ValueError):
+            decode_polyline(bad)
+        with pytest.raises(ValueError):
+            decode_polyline_arrays(bad)
+    with pytest.raises(ValueError):
+        decode_polyline_arrays("_p~iF ps|U")
+    assert decode_polyline("") == []
+    assert len(decode_polyline_arrays("")[0]) == 0
+
+
+def _seg_dist_m(p, a, b, kx, ky):
+    px, py = p[1] * kx, p[0] * ky
+    ax, ay, bx, by = a[1] * kx, a[0] * ky, b[1] * kx, b[0] * ky
+    dx, dy = bx - ax, by - ay
+    seg2 = dx * dx + dy * dy
+    t = 0.0 if seg2 == 0 else min(1.0, max(0.0, ((px - ax) * dx + (py - ay) * dy) / seg2))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+@pytest.mark.parametrize("tolerance_m", [1.0, 10.0, 50.0])
+def test_simplified_line_stays_within_tolerance(tolerance_m):
+    lats, lons = _route(400, seed=2)
+    keep = simplify_indices(lats, lons, tolerance_m).tolist()
+    assert keep[0] == 0 and keep[-1] == len(lats) - 1
+    assert keep == sorted(set(keep))
+
+    ky = math.pi * 6371000.0 / 180.0
+    kx = ky * math.cos(math.radians(float(np.mean(lats))))
+    for a, b in zip(keep, keep[1:]):
+        for i in range(a + 1, b):
+            d = _seg_dist_m((lats[i], lons[i]), (lats[a], lons[a]), (lats[b], lons[b]), kx, ky)
+            assert d <= tolerance_m + 1e-6
+
+
+def test_simplify_keeps_short_lines_and_zero_tolerance():
+    lats, lons = _route(20)
+    assert simplify_indices(lats[:2], lons[:2], 10.0).tolist() == [0, 1]
+    assert simplify_indices(lats, lons, 0.0).tolist() == list(range(20))
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+from app.services.junction_conflicts import JunctionClaim
+from app.services.preemption_scheduler import MemorySink, PreemptionScheduler
+
+
+def _claim(trip_id, index, start, end):
+    return JunctionClaim(trip_id, index, 12.9, 77.5, start, end)
+
+
+def _events(sink, trip_id=None):
+    return [(e["event"], e["junction_index"], e["reason"]) for e in sink.events if trip_id in (None, e["trip_id"])]
+
+
+def _run(scenario, **kw):
+    async def run():
+        sink = MemorySink()
+        sched = PreemptionScheduler([sink], **kw)
+        sched.start(asyncio.get_running_loop())
+        try:
+            await scenario(sched, sink)
+        finally:
+            await sched.stop()
+
+    asyncio.run(run())
+
+
+def test_activate_and_release_on_time():
+    async def scenario(sched, sink):
+        now = time.time()
+        sched.replace("T1", [_claim("T1", 1, now + 0.1, now + 0.25), _claim("T1", 2, now + 0.3, now + 0.4)])
+        assert [w["active"] for w in sched.pending("T1")] == [False, False]
+
+        await asyncio.sleep(0.15)
+        assert _events(sink) == [("activate", 1, "window")]
+        await asyncio.sleep(0.35)
+        assert _events(sink) == [
+            ("activate", 1, "window"),
+            ("release", 1, "window"),
+            ("activate", 2, "window"),
+            ("release", 2, "window"),
+        ]
+        assert sched.pending() == []
+        st = sched.stats()
+        assert st["fired"] == {"activate": 2, "release": 2}
+        assert st["lateness_ms_max"] < 50
+
+    _run(scenario)
+
+
+def test_replan_moves_active_window_into_future():
+    async def scenario(sched, sink):
+        now = time.time()
+        sched.replace("T1", [_claim("T1", 1, now, now + 5)])
+        await asyncio.sleep(0.05)
+        assert _events(sink) == [("activate", 1, "window")]
+
+        # ETA slipped: the junction's window now starts later.
+        now = time.time()
+        sched.replace("T1", [_claim("T1", 1, now + 0.1, now + 0.2)])
+        assert _events(sink)[-1] == ("release", 1, "rescheduled")
+        assert sched.pending("T1")[0]["active"] is False
+
+        await asyncio.sleep(0.3)
+        assert _events(sink)[1:] == [
+            ("release", 1, "rescheduled"),
+            ("activate", 1, "window"),
+            ("release", 1, "window"),
+        ]
+
+    _run(scenario)
+
+
+def test_active_window_still_covering_now_stays_active():
+    async def scenario(sched, sink):
+        now = time.time()
+        sched.replace("T1", [_claim("T1", 1, now, now + 5)])
+        await asyncio.sleep(0.05)
+        sched.replace("T1", [_claim("T1", 1, now - 1, now + 0.1)])
+        await asyncio.sleep(0.2)
+        assert _events(sink) == [("activate", 1, "window"), ("release", 1, "window")]
+
+    _run(scenario)
+
+
+def test_dropped_junctions_are_cancelled():
+    async def scenario(sched, sink):
+        now = time.time()
+        sched.replace("T1", [_claim("T1", 1, now, now + 5), _claim("T1", 2, now, now + 5), _claim("T1", 3, now + 5, now + 6)])
+        await asyncio.sleep(0.05)
+        sched.replace("T1", [_claim("T1", 2, now, now + 5)])
+        assert sorted(_events(sink)[2:]) == [("release", 1, "cancelled")]
+        assert [w["junction_index"] for w in sched.pending("T1")] == [2]
+
+        sched.remove("T1")  # trip arrived
+        assert _events(sink)[-1] == ("release", 2, "cancelled")
+        assert sched.pending() == []
+        await asyncio.sleep(0.05)
+        assert sched.stats()["pending_timers"] == 0
+
+    _run(scenario)
+
+
+def test_replace_from_worker_thread():
+    async def scenario(sched, sink):
+        now = time.time()
+        claims = [_claim("T1", 1, now + 0.05, now + 0.1)]
+        t = threading.Thread(target=sched.replace, args=("T1", claims))
+        t.start()
+        await asyncio.get_running_loop().run_in_executor(None, t.join)
+        await asyncio.sleep(0.2)
+        assert _events(sink) == [("activate", 1, "window"), ("release", 1, "window")]
+
+    _run(scenario)
+
+
+def test_compaction_when_stale_entries_dominate():
+    async def scenario(sched, sink):
+        now = time.time()
+        for _ in range(20):
+            sched.replace("T1", [_claim("T1", k, now + 60, now + 61) for k in range(1, 6)])
+        st = sched.stats()
+        assert st["compactions"] >= 1
+        assert st["pending_timers"] == 10
+        assert st["heap_size"] <= 2 * 10 + 16
+        assert len(sched.pending("T1")) == 5
+
+    _run(scenario, compact_min=16)
@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import route_cache as rc
+from app.services.osrm_service import OSRMError
+from app.services.route_cache import RouteCache
+
+ROUTE = {
+    "routes": [
+        {
+            "distance": 1500.0,
+            "duration": 180.0,
+            "geometry": {"type": "LineString", "coordinates": [[77.5, 12.9], [77.51, 12.91]]},
+        }
+    ]
+}
+
+
+@pytest.fixture
+def osrm(monkeypatch):
+    fake = SimpleNamespace(calls=[], result=ROUTE)
+
+    async def get_route_driving(*args):
+        fake.calls.append(args)
+        await asyncio.sleep(0.05)
+        if isinstance(fake.result, Exception):
+            raise fake.result
+        return fake.result
+
+    monkeypatch.setattr(rc, "get_route_driving", get_route_driving)
+    monkeypatch.setattr(rc, "offline_router", SimpleNamespace(available=False))
+    return fake
+
+
+def _get(cache):
+    return cache.get_route(12.9, 77.5, "H1", 12.91, 77.51)
+
+
+def test_concurrent_misses_share_one_fetch(osrm):
+    async def run():
+        cache = RouteCache()
+        return cache, await asyncio.gather(*(_get(cache) for _ in range(5)))
+
+    cache, routes = asyncio.run(run())
+    assert len(osrm.calls) == 1
+    assert all(r is routes[0] for r in routes)
+    assert (cache.misses, cache.coalesced) == (1, 4)
+
+
+def test_cancelled_leader_does_not_cancel_waiters(osrm):
+    async def run():
+        cache = RouteCache()
+        leader = asyncio.create_task(_get(cache))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(_get(cache))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        route = await waiter
+        assert leader.cancelled()
+        # The fetch finished for the waiter and was cached.
+        assert await _get(cache) is route
+        return cache
+
+    cache = asyncio.run(run())
+    assert len(osrm.calls) == 1
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 1, 1)
+    assert cache._inflight == {}
+
+
+def test_errors_reach_every_waiter_and_are_not_cached(osrm):
+    osrm.result = OSRMError("down")
+
+    async def run():
+        cache = RouteCache()
+        results = await asyncio.gather(_get(cache), _get(cache), return_exceptions=True)
+        assert all(isinstance(r, OSRMError) for r in results)
+        osrm.result = ROUTE
+        return await _get(cache)
+
+    assert asyncio.run(run()).distance_m == 1500.0
+    assert len(osrm.calls) == 2
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.services import route_tracker as rt
+from app.services.route_cache import CachedRoute
+from app.services.route_tracker import RouteTracker, TrackedRoute, project_onto_route
+
+
+def _empty_route():
+    return CachedRoute(
+        distance_m=1200.0,
+        duration_s=150.0,
+        geometry={"type": "LineString", "coordinates": []},
+        route_type="urban",
+        fetched_at=time.monotonic(),
+    )
+
+
+def test_project_onto_empty_route():
+    route = TrackedRoute(
+        hospital_id="H1", coords=[], cum_m=[0.0], distance_m=0.0, duration_s=0.0, route_type="urban",
+        fetched_at=time.monotonic(), ttl_sec=60.0,
+    )
+    assert project_onto_route(route, 12.9, 77.5) == (0, 0.0, 12.9, 77.5, 0.0, 0.0)
+
+
+def test_route_without_geometry_tracks_the_route_end(monkeypatch):
+    calls = []
+
+    async def get_route(*args, **kw):
+        calls.append(kw.get("refresh"))
+        return _empty_route()
+
+    monkeypatch.setattr(rt.route_cache, "get_route", get_route)
+    tracker = RouteTracker(threshold_m=50.0)
+
+    p = asyncio.run(tracker.route_for("T1", 12.9, 77.5, "H1", 12.91, 77.5))
+    assert p.rerouted and p.progress_m == 0.0
+    assert (p.distance_m, p.duration_s) == (1200.0, 150.0)
+    assert p.geometry["coordinates"] == [[77.5, 12.91]]
+
+    # Still far from the end: asks the router again instead of failing.
+    p = asyncio.run(tracker.route_for("T1", 12.9, 77.5, "H1", 12.91, 77.5))
+    assert p.rerouted and calls == [False, True]
+
+
+def test_tracked_route_keeps_the_cache_entry_age(monkeypatch):
+    aged = CachedRoute(
+        distance_m=1200.0,
+        duration_s=150.0,
+        geometry={"type": "LineString", "coordinates": [[77.5, 12.9], [77.5, 12.91]]},
+        route_type="urban",
+        fetched_at=time.monotonic() - 50.0,
+    )
+    calls = []
+
+    async def get_route(*args, **kw):
+        calls.append(kw.get("refresh"))
+        return aged
+
+    monkeypatch.setattr(rt.route_cache, "get_route", get_route)
+    monkeypatch.setattr(rt.route_cache, "ttl_for", lambda entry: 60.0)
+    tracker = RouteTracker(threshold_m=50.0, ttl_sec=60.0)
+
+    asyncio.run(tracker.route_for("T1", 12.9, 77.5, "H1", 12.91, 77.5))
+    assert tracker._get("T1").fetched_at == aged.fetched_at
+
+    # 15 s later the route is 65 s old: past the TTL, so the next fix re-routes.
+    now = time.monotonic() + 15.0
+    monkeypatch.setattr(rt, "time", SimpleNamespace(monotonic=lambda: now))
+    p = asyncio.run(tracker.route_for("T1", 12.9, 77.5, "H1", 12.91, 77.5))
+    assert p.rerouted and tracker.reroutes["expired"] == 1
@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+from app.realtime.snapshot_hub import MODE_POLL, MODE_PUSH, SnapshotHub, snapshot_delta
+
+
+class FakeWS:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+
+class Builder:
+    def __init__(self):
+        self.calls = 0
+        self.state = {"trip_id": "T1", "status": "EN_ROUTE", "latest_gps": {"lat": 12.9, "lon": 77.5}}
+
+    def __call__(self, trip_id):
+        self.calls += 1
+        return json.loads(json.dumps(self.state))
+
+
+def test_viewers_of_one_trip_share_one_producer():
+    async def run():
+        build = Builder()
+        hub = SnapshotHub(build, tick_sec=0.05)
+        a, b = FakeWS(), FakeWS()
+        await hub.subscribe("T1", a, MODE_POLL)
+        await hub.subscribe("T1", b, MODE_POLL)
+        await asyncio.sleep(0.22)
+        stats = hub.stats()
+        await hub.unsubscribe("T1", a, MODE_POLL)
+        await hub.unsubscribe("T1", b, MODE_POLL)
+        after = hub.stats()
+        await hub.close()
+        return build, a, b, stats, after
+
+    build, a, b, stats, after = asyncio.run(run())
+    assert stats["producers"] == 1 and stats["poll_subscribers"] == 2
+    # One build per tick for both viewers, not one per viewer
+    assert 2 <= build.calls <= 6
+    assert a.sent and a.sent == b.sent[-len(a.sent):]
+    assert a.sent[0]["status"] == "EN_ROUTE"
+    assert after["producers"] == 0
+
+
+def test_late_joiner_gets_the_last_snapshot_without_a_rebuild():
+    async def run():
+        build = Builder()
+        hub = SnapshotHub(build, tick_sec=10.0)
+        a, b = FakeWS(), FakeWS()
+        await hub.subscribe("T1", a, MODE_POLL)
+        await asyncio.sleep(0.05)
+        await hub.subscribe("T1", b, MODE_POLL)
+        await asyncio.sleep(0.05)
+        await hub.close()
+        return build, b
+
+    build, b = asyncio.run(run())
+    assert build.calls == 1
+    assert b.sent == [{"trip_id": "T1", "status": "EN_ROUTE", "latest_gps": {"lat": 12.9, "lon": 77.5}}]
+
+
+def test_snapshot_delta_flattens_nested_fields():
+    old = {"status": "EN_ROUTE", "latest_gps": {"lat": 1.0, "lon": 2.0}, "acks": [1], "risk": "LOW"}
+    new = {"status": "EN_ROUTE", "latest_gps": {"lat": 1.5, "lon": 2.0}, "acks": [1, 2], "eta": 30}
+    assert snapshot_delta(old, new) == {"latest_gps.lat": 1.5, "acks": [1, 2], "eta": 30, "risk": None}
+    assert snapshot_delta(new, new) == {}
+
+
+def test_push_viewers_get_a_snapshot_then_deltas_on_change():
+    async def run():
+        build = Builder()
+        hub = SnapshotHub(build, tick_sec=0.05)
+        ws = FakeWS()
+        await hub.subscribe("T1", ws, MODE_PUSH)
+        await asyncio.sleep(0.2)
+        idle_calls = build.calls  # push-only: no rebuild without a change event
+
+        build.state["latest_gps"]["lat"] = 13.0
+        hub.notify_changed("T1", "gps")
+        await asyncio.sleep(0.05)
+        hub.notify_changed("T1", "gps")  # nothing changed: no frame
+        await asyncio.sleep(0.05)
+        await hub.close()
+        return idle_calls, ws
+
+    idle_calls, ws = asyncio.run(run())
+    assert idle_calls == 1
+    snap, delta = ws.sent
+    assert snap["type"] == "snapshot" and snap["version"] == 1 and snap["data"]["status"] == "EN_ROUTE"
+    assert delta == {"type": "delta", "trip_id": "T1", "version": 2, "changes": {"latest_gps.lat": 13.0}}
+
+
+def test_late_push_joiner_resyncs_from_the_current_version():
+    async def run():
+        build = Builder()
+        hub = SnapshotHub(build, tick_sec=0.05)
+        a, b = FakeWS(), FakeWS()
+        await hub.subscribe("T1", a, MODE_PUSH)
+        await asyncio.sleep(0.05)
+        build.state["status"] = "NEAR_ARRIVAL"
+        hub.notify_changed("T1")
+        await asyncio.sleep(0.05)
+        await hub.subscribe("T1", b, MODE_PUSH)
+        await asyncio.sleep(0.01)
+        await hub.close()
+        return b
+
+    (snap,) = asyncio.run(run()).sent
+    assert snap["version"] == 2 and snap["data"]["status"] == "NEAR_ARRIVAL"
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from app.schemas.corridor import CorridorPlanRequest
+from app.services.corridor_planner import compute_plan, plan_response
+from app.utils.time_profile import TimeProfile
+
+CUM_M = np.array([0.0, 100.0, 300.0, 600.0])
+
+
+def test_degenerate_durations_give_no_profile():
+    assert TimeProfile.from_segments(CUM_M, [0.0, 0.0, 0.0]) is None
+    assert TimeProfile.from_segments(CUM_M, [0.0, 0.0, 0.0], total_s=0.0) is None
+    assert TimeProfile.from_segments(CUM_M, [10.0, 20.0, 30.0], total_s=0.0) is None
+    assert TimeProfile.from_segments(CUM_M, [1.0, 2.0]) is None  # misaligned, no total to spread
+    # Misaligned or zero durations with a real total: constant speed.
+    p = TimeProfile.from_segments(CUM_M, [0.0, 0.0, 0.0], total_s=60.0)
+    assert np.allclose(p.cum_s, [0.0, 10.0, 30.0, 60.0])
+
+
+def test_zero_route_durations_fall_back_to_average_speed():
+    coords = [12.9, 77.5, 12.92, 77.5, 12.92, 77.52, 12.94, 77.52]
+    base = dict(trip_id="T1", route_coords=coords, final_eta_seconds=600, min_spacing_m=50)
+    expected = plan_response(CorridorPlanRequest(**base), compute_plan(CorridorPlanRequest(**base)))
+    req = CorridorPlanRequest(**base, route_durations=[0.0, 0.0, 0.0])
+    resp = plan_response(req, compute_plan(req))
+    assert [j.eta_seconds_from_now for j in resp.junctions] == [j.eta_seconds_from_now for j in expected.junctions]
+    assert all(j.eta_seconds_from_now > 0 for j in resp.junctions)
+
+
+def test_steps_without_durations_fall_back_to_average_speed():
+    steps = [
+        dict(lat=12.9 + 0.002 * k, lon=77.5, maneuver="turn", bearing_before=(90 * k + 90) % 360,
+             bearing_after=(90 * k) % 360, distance_m=200.0, duration_s=0.0,
+             cumulative_distance_m=200.0 * k, cumulative_duration_s=0.0)
+        for k in range(1, 4)
+    ]
+    req = CorridorPlanRequest(trip_id="T1", route_steps=steps, final_eta_seconds=80, min_spacing_m=50)
+    resp = plan_response(req, compute_plan(req))
+    # 800 m in 80 s: 10 m/s
+    assert [j.eta_seconds_from_now for j in resp.junctions] == [20, 40, 60]
+
+
+DURATIONS = [20.0, 10.0, 60.0]  # 5, 20 and 5 m/s
+
+
+def test_time_at_interpolates_within_segments():
+    p = TimeProfile.from_segments(CUM_M, DURATIONS)
+    assert np.allclose(p.cum_s, [0.0, 20.0, 30.0, 90.0])
+    assert p.time_at(50.0) == pytest.approx(10.0)
+    assert p.time_at(200.0) == pytest.approx(25.0)
+    assert np.allclose(p.time_at(np.array([0.0, 100.0, 450.0, 600.0])), [0.0, 20.0, 60.0, 90.0])
+    # clamped outside the route
+    assert p.time_at(-10.0) == 0.0 and p.time_at(700.0) == 90.0
+
+
+def test_total_s_rescales_every_vertex():
+    p = TimeProfile.from_segments(CUM_M, DURATIONS, total_s=45.0)
+    assert np.allclose(p.cum_s, [0.0, 10.0, 15.0, 45.0])
+
+
+def test_eta_s_from_a_point_scaled_to_the_final_eta():
+    p = TimeProfile.from_segments(CUM_M, DURATIONS)
+    d = np.array([100.0, 300.0, 600.0])
+    assert np.allclose(p.eta_s(d), [20.0, 30.0, 90.0])
+    assert np.allclose(p.eta_s(d, from_m=50.0), [10.0, 20.0, 80.0])
+    # 80 s of OSRM time left, ETA says 160 s: everything ahead takes twice as long
+    assert np.allclose(p.eta_s(d, from_m=50.0, final_eta_s=160.0), [20.0, 40.0, 160.0])
+    assert p.remaining_s(50.0) == pytest.approx(80.0)
+    assert p.remaining_s(600.0) == 0.0
+
+
+def test_tail_is_rebased_at_the_point():
+    p = TimeProfile.from_segments(CUM_M, DURATIONS)
+    t = p.tail(1, 200.0)
+    assert np.allclose(t.cum_m, [0.0, 100.0, 400.0])
+    assert np.allclose(t.cum_s, [0.0, 5.0, 65.0])
+    for d in (0.0, 50.0, 100.0, 250.0, 400.0):
+        assert t.time_at(d) == pytest.approx(p.time_at(200.0 + d) - p.time_at(200.0))
+
+
+def test_segment_durations_sum_over_dropped_vertices():
+    p = TimeProfile.from_segments(CUM_M, DURATIONS)
+    assert np.allclose(p.segment_durations(), DURATIONS)
+    assert np.allclose(p.segment_durations(np.array([0, 2, 3])), [30.0, 60.0])
+
+
+def test_matches_a_scalar_walk_on_random_routes():
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        n = int(rng.integers(2, 200))
+        seg_m = rng.uniform(1, 300, n - 1)
+        seg_s = rng.uniform(0.5, 60, n - 1)
+        p = TimeProfile.from_segments(np.concatenate(([0.0], np.cumsum(seg_m))), seg_s)
+        for d in rng.uniform(0, seg_m.sum(), 10).tolist():
+            left, want = d, 0.0
+            for m, sec in zip(seg_m.tolist(), seg_s.tolist()):
+                if left <= m:
+                    want += sec * left / m
+                    break
+                left -= m
+                want += sec
+            assert p.time_at(d) == pytest.approx(want, rel=1e-9, abs=1e-9)
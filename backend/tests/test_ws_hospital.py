@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.trip import arrive_trip, start_trip, update_destination
+from app.db import Base
+from app.realtime.publish import publish_hospital_event
+from app.realtime.ws_manager import TripWSManager, hospital_ws_manager
+from app.schemas import DestinationUpdateIn, TripStartIn
+
+
+class FakeWS:
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+def _types(ws):
+    return [(m["type"], m.get("trip_id")) for m in ws.sent]
+
+
+def test_events_during_snapshot_load_follow_the_snapshot():
+    async def run():
+        mgr = TripWSManager()
+        ws = FakeWS()
+        await mgr.connect("H1", ws, hold=True)
+        # Published while the snapshot query runs: must not be overwritten by it.
+        await mgr.broadcast("H1", {"type": "trip_added", "trip_id": "T2"})
+        await mgr.broadcast("H1", {"type": "trip_removed", "trip_id": "T1"})
+        await asyncio.sleep(0.01)
+        assert ws.sent == []
+
+        assert mgr.release(ws, {"type": "snapshot", "trips": [{"trip_id": "T1"}]})
+        await mgr.broadcast("H1", {"type": "trip_updated", "trip_id": "T2"})
+        await asyncio.sleep(0.01)
+        return ws
+
+    ws = asyncio.run(run())
+    assert _types(ws) == [("snapshot", None), ("trip_added", "T2"), ("trip_removed", "T1"), ("trip_updated", "T2")]
+
+
+def test_held_overflow_asks_for_a_fresh_snapshot():
+    async def run():
+        mgr = TripWSManager(queue_size=2)
+        ws = FakeWS()
+        await mgr.connect("H1", ws, hold=True)
+        for k in range(3):
+            await mgr.broadcast("H1", {"type": "trip_updated", "trip_id": f"T{k}"})
+        assert not mgr.release(ws, {"type": "snapshot", "trips": []})
+        await mgr.broadcast("H1", {"type": "trip_removed", "trip_id": "T0"})
+        assert mgr.release(ws, {"type": "snapshot", "trips": [{"trip_id": "T1"}]})
+        await asyncio.sleep(0.01)
+        return ws
+
+    assert _types(asyncio.run(run())) == [("snapshot", None), ("trip_removed", "T0")]
+
+
+def _session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_trip_lifecycle_reaches_the_hospital_feeds():
+    db = _session()
+
+    async def run():
+        h1, h2 = FakeWS(), FakeWS()
+        await hospital_ws_manager.connect("H1", h1)
+        await hospital_ws_manager.connect("H2", h2)
+        try:
+            trip_id = start_trip(TripStartIn(ambulance_id="A1", destination_hospital_id="H1", start_lat=12.9,
+                                             start_lon=77.5), db).trip_id
+            await asyncio.sleep(0.01)
+            update_destination(trip_id, DestinationUpdateIn(destination_hospital_id="H2"), db)
+            await asyncio.sleep(0.01)
+            arrive_trip(trip_id, db)
+            await asyncio.sleep(0.01)
+        finally:
+            await hospital_ws_manager.disconnect("H1", h1)
+            await hospital_ws_manager.disconnect("H2", h2)
+        return trip_id, h1, h2
+
+    trip_id, h1, h2 = asyncio.run(run())
+    assert _types(h1) == [("trip_added", trip_id), ("trip_removed", trip_id)]
+    assert _types(h2) == [("trip_added", trip_id), ("trip_removed", trip_id)]
+    added = h1.sent[0]
+    assert added["hospital_id"] == "H1"
+    assert added["trip"]["trip_id"] == trip_id and added["trip"]["status"] == "EN_ROUTE"
+    assert "trip" not in h1.sent[1]
+
+
+def test_hospital_feeds_only_hear_their_own_trips():
+    async def run():
+        h1 = FakeWS()
+        await hospital_ws_manager.connect("H1", h1)
+        try:
+            publish_hospital_event("H2", "trip_updated", "T9", {"trip_id": "T9"})
+            publish_hospital_event("H1", "trip_updated", "T1", {"trip_id": "T1"})
+            await asyncio.sleep(0.01)
+        finally:
+            await hospital_ws_manager.disconnect("H1", h1)
+        return h1
+
+    assert _types(asyncio.run(run())) == [("trip_updated", "T1")]
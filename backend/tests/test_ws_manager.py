@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+from app.realtime.ws_manager import WS_CLOSE_SLOW_CONSUMER, SlowConsumerPolicy, TripWSManager
+
+
+class StalledWS:
+    """Accepts, then never finishes a send (until release is set)."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+        self.release = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.release.wait()
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+def test_disconnect_keeps_the_close_task_until_done():
+    async def run():
+        mgr = TripWSManager(queue_size=2, policy=SlowConsumerPolicy.DISCONNECT)
+        ws = StalledWS()
+        await mgr.connect("T1", ws)
+        await mgr.broadcast("T1", {"n": 0})
+        await asyncio.sleep(0.01)  # writer is now stuck sending n=0
+        for n in range(1, 4):
+            await mgr.broadcast("T1", {"n": n})
+
+        assert mgr.client_count("T1") == 0
+        assert len(mgr._closing) == 1
+        await asyncio.sleep(0.01)
+        return mgr, ws
+
+    mgr, ws = asyncio.run(run())
+    assert ws.closed == WS_CLOSE_SLOW_CONSUMER
+    assert not mgr._closing
+    assert mgr.stats()["slow_disconnects"] == 1
+
+
+def _stalled_after(policy, n_msgs, queue_size=3):
+    """Broadcast n_msgs to a client stuck on its first send, then let it drain."""
+
+    async def run():
+        mgr = TripWSManager(queue_size=queue_size, policy=policy)
+        ws = StalledWS()
+        await mgr.connect("T1", ws)
+        await mgr.broadcast("T1", {"n": 0})
+        await asyncio.sleep(0.01)
+        for n in range(1, n_msgs):
+            await mgr.broadcast("T1", {"n": n})
+        ws.release.set()
+        await asyncio.sleep(0.01)
+        return mgr, ws
+
+    return asyncio.run(run())
+
+
+def test_drop_oldest_keeps_the_newest_queue_size_frames():
+    mgr, ws = _stalled_after(SlowConsumerPolicy.DROP_OLDEST, 7)
+    assert [m["n"] for m in ws.sent] == [0, 4, 5, 6]
+    assert mgr.stats()["messages_dropped"] == 3
+    assert ws.closed is None
+
+
+def test_coalesce_keeps_only_the_newest_frame():
+    mgr, ws = _stalled_after(SlowConsumerPolicy.COALESCE, 6)
+    # 1..3 fill the queue, 4 replaces them, 5 queues behind it
+    assert [m["n"] for m in ws.sent] == [0, 4, 5]
+    assert mgr.stats()["messages_dropped"] == 3
+
+
+def test_a_stalled_client_does_not_delay_the_others():
+    async def run():
+        mgr = TripWSManager()
+        slow, fast = StalledWS(), StalledWS()
+        fast.release.set()
+        await mgr.connect("T1", slow)
+        await mgr.connect("T1", fast)
+        for n in range(5):
+            await mgr.broadcast("T1", {"n": n})
+        await asyncio.sleep(0.01)
+        return slow, fast
+
+    slow, fast = asyncio.run(run())
+    assert [m["n"] for m in fast.sent] == [0, 1, 2, 3, 4]
+    assert slow.sent == []
+
+
+def test_send_timeout_drops_the_client():
+    async def run():
+        mgr = TripWSManager(send_timeout_sec=0.02)
+        ws = StalledWS()
+        await mgr.connect("T1", ws)
+        await mgr.broadcast("T1", {"n": 0})
+        await asyncio.sleep(0.1)
+        return mgr, ws
+
+    mgr, ws = asyncio.run(run())
+    assert mgr.client_count() == 0
+    assert mgr.stats()["send_errors"] == 1
+    assert ws.closed == WS_CLOSE_SLOW_CONSUMER